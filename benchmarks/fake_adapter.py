@@ -0,0 +1,57 @@
+"""
+Stand-in model adapter for benchmarks: no network, configurable latency and failures.
+"""
+
+import math
+import time
+import random
+from typing import Dict, Any
+
+from services.employees.common.adapter import BaseAdapter
+
+
+class FakeAdapter(BaseAdapter):
+    """
+    Latency is log-normal around `median_s` (spread `sigma`), which gives the long
+    tail real model calls have. `failure_rate` of calls raise a timeout, the way a
+    backend error surfaces from a real adapter; the Manager treats it as
+    transient, so failed jobs go through retry with backoff and dead-lettering.
+    """
+
+    def __init__(
+        self,
+        median_s: float = 0.5,
+        sigma: float = 0.5,
+        failure_rate: float = 0.0,
+        output_chars: int = 800,
+        seed: int = None,
+    ):
+        self.median_s = median_s
+        self.sigma = sigma
+        self.failure_rate = failure_rate
+        self.output_chars = output_chars
+        self.rng = random.Random(seed)
+
+    def sample_latency(self) -> float:
+        if self.median_s <= 0:
+            return 0.0
+        return self.rng.lognormvariate(math.log(self.median_s), self.sigma)
+
+    def generate(self, prompt: str, context: Dict[str, Any]) -> Dict[str, Any]:
+        time.sleep(self.sample_latency())
+        if self.rng.random() < self.failure_rate:
+            raise TimeoutError("fake adapter: simulated backend timeout")
+
+        job = context.get("job") or {}
+        lines = [f"# generated for job {job.get('id', '?')}", "def solve(x):"]
+        while sum(len(l) + 1 for l in lines) < self.output_chars:
+            n = self.rng.randint(0, 9999)
+            lines.append(f"    x = x * {n} % 9973  # step {len(lines)}")
+        lines.append("    return x")
+        return {
+            "output": "\n".join(lines),
+            "patch": None,
+            "explanation": "benchmark output",
+            "self_confidence": round(self.rng.uniform(0.5, 1.0), 2),
+            "artifacts": {},
+        }
@@ -0,0 +1,429 @@
+"""
+End-to-end throughput benchmark:
+
+    intake (/prds or MCP /mcp/command) -> Scheduler -> Worker -> Accountant -> Validator
+
+It runs against a local Postgres that already has the migrations applied. The
+Manager (and the MCP bridge, with --via mcp) run in-process under uvicorn. The
+accountant and router are stub HTTP services. Workers are simulated: they speak
+the same HTTP protocol as services/worker/app/main.py, but use FakeAdapter
+instead of a model. The Validator runs in-process with --validator.
+
+    DATABASE_URL=postgres://... python -m benchmarks.pipeline --rate 20 --duration 30 \
+        --tasks 3 --workers 4 --latency 0.2 --failure-rate 0.02 --validator
+    python -m benchmarks.pipeline ... --compare benchmarks/results/<previous>.json
+
+Stage timings come from job_events and model_runs timestamps, so they measure
+the pipeline itself and not the load generator. DB query counts are deltas
+of pg_stat_statements (when installed) and pg_stat_database.
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import importlib
+from pathlib import Path
+from datetime import datetime, timezone
+
+import asyncpg
+import httpx
+import uvicorn
+
+from benchmarks.fake_adapter import FakeAdapter
+from benchmarks.stubs import accountant_stub, router_stub
+
+RESULTS_DIR = Path(__file__).parent / "results"
+TRACE_HEADER = "X-Aura-Trace-Id"
+
+STAGES_SQL = """
+    WITH run_jobs AS (
+        SELECT job_id, created_at FROM job_events
+        WHERE event_type = 'created' AND details->>'title' = $1
+    )
+    SELECT r.job_id, r.created_at AS created,
+           (SELECT MIN(created_at) FROM job_events e
+             WHERE e.job_id = r.job_id AND e.event_type = 'assigned') AS assigned,
+           (SELECT MIN(created_at) FROM job_events e
+             WHERE e.job_id = r.job_id AND e.event_type = 'claimed') AS claimed,
+           (SELECT MIN(created_at) FROM job_events e
+             WHERE e.job_id = r.job_id AND e.event_type = 'completed') AS completed,
+           (SELECT MIN(created_at) FROM model_runs mr WHERE mr.job_id = r.job_id) AS scored
+    FROM run_jobs r
+"""
+
+PG_STAT_DATABASE = (
+    "xact_commit",
+    "xact_rollback",
+    "tup_returned",
+    "tup_fetched",
+    "tup_inserted",
+    "tup_updated",
+    "tup_deleted",
+    "blks_read",
+    "blks_hit",
+)
+
+
+def percentiles(values, points=(50, 95, 99)):
+    if not values:
+        return {f"p{p}": None for p in points} | {"n": 0}
+    ordered = sorted(values)
+    out = {"n": len(ordered), "mean": round(sum(ordered) / len(ordered), 4)}
+    for p in points:
+        idx = min(len(ordered) - 1, max(0, int(round(p / 100 * len(ordered) + 0.5)) - 1))
+        out[f"p{p}"] = round(ordered[idx], 4)
+    return out
+
+
+async def db_counters(conn) -> dict:
+    # stats are flushed asynchronously; give the backends a moment and drop our snapshot
+    await asyncio.sleep(1.0)
+    await conn.execute("SELECT pg_stat_clear_snapshot()")
+    row = await conn.fetchrow(
+        f"SELECT {', '.join(PG_STAT_DATABASE)} FROM pg_stat_database WHERE datname = current_database()"
+    )
+    counters = {k: int(row[k]) for k in PG_STAT_DATABASE}
+    try:
+        counters["statements"] = int(
+            await conn.fetchval("SELECT COALESCE(SUM(calls), 0) FROM pg_stat_statements")
+        )
+    except asyncpg.PostgresError:
+        counters["statements"] = None
+    return counters
+
+
+async def serve(app, port: int) -> uvicorn.Server:
+    server = uvicorn.Server(
+        uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", lifespan="on")
+    )
+    asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+    return server
+
+
+class BenchWorker:
+    """Mirror of the worker loop: poll ASSIGNED, claim, generate, upload artifact, report."""
+
+    def __init__(self, client, manager_url, worker_id, adapter, stats):
+        self.client = client
+        self.manager_url = manager_url
+        self.worker_id = worker_id
+        self.adapter = adapter
+        self.stats = stats
+        self.running = True
+
+    async def run(self):
+        while self.running:
+            try:
+                if not await self.step():
+                    await asyncio.sleep(0.2)
+            except Exception:
+                self.stats["worker_errors"] += 1
+                await asyncio.sleep(0.5)
+
+    async def step(self) -> bool:
+        r = await self.client.get(f"{self.manager_url}/jobs", params={"status": "ASSIGNED"})
+        mine = [j for j in r.json() if j.get("assigned_model") == self.worker_id]
+        if not mine:
+            return False
+        job = mine[0]
+        job_id = job["id"]
+        headers = {TRACE_HEADER: job["trace_id"]} if job.get("trace_id") else {}
+
+        claim = await self.client.post(
+            f"{self.manager_url}/jobs/{job_id}/claim",
+            params={"worker_id": self.worker_id},
+            headers=headers,
+        )
+        if claim.status_code != 200:
+            self.stats["claim_conflicts"] += 1
+            return True
+
+        started_at = datetime.now(timezone.utc)
+        t0 = time.perf_counter()
+        try:
+            out = await asyncio.to_thread(
+                self.adapter.generate, f"Implement task for job {job_id}", {"job": job}
+            )
+        except Exception as e:
+            # reported like the real worker does; the Manager retries or fails the job
+            self.stats["adapter_failures"] += 1
+            await self.client.post(
+                f"{self.manager_url}/jobs/{job_id}/complete",
+                json={
+                    "success": False,
+                    "details": {
+                        "worker": self.worker_id,
+                        "error": str(e),
+                        "error_type": type(e).__name__,
+                    },
+                    "spans": [],
+                },
+                headers=headers,
+            )
+            return True
+
+        await self.client.post(
+            f"{self.manager_url}/models/{self.worker_id}/artifact",
+            json={
+                "job_id": job_id,
+                "artifact_type": "result",
+                "artifact": {"output": out["output"], "explanation": out.get("explanation")},
+            },
+            headers=headers,
+        )
+        adapter_span = {
+            "stage": "adapter",
+            "started_at": started_at.isoformat(),
+            "duration_ms": (time.perf_counter() - t0) * 1000,
+        }
+        await self.client.post(
+            f"{self.manager_url}/jobs/{job_id}/complete",
+            json={"success": True, "details": {"worker": self.worker_id}, "spans": [adapter_span]},
+            headers=headers,
+        )
+        self.stats["completed"] += 1
+        return True
+
+
+async def firehose(client, url, run_tag, args):
+    """Open-loop PRD generator: sends at a fixed rate regardless of how fast intake answers."""
+    sem = asyncio.Semaphore(args.concurrency)
+    latencies, statuses = [], {}
+    total = int(args.rate * args.duration)
+
+    async def send(i):
+        payload = {
+            "project_id": i % args.projects + 1,
+            "title": run_tag,
+            "tasks": [
+                {"role": "Employee", "title": f"task {i}.{k}", "min_length": 20}
+                for k in range(args.tasks)
+            ],
+        }
+        async with sem:
+            t0 = time.perf_counter()
+            try:
+                r = await client.post(url, json=payload)
+                ok = r.status_code < 300 and "error" not in r.json()
+                key = str(r.status_code) if ok else f"{r.status_code}:error"
+            except httpx.HTTPError as e:
+                key = type(e).__name__
+            latencies.append(time.perf_counter() - t0)
+            statuses[key] = statuses.get(key, 0) + 1
+
+    start = time.perf_counter()
+    tasks = []
+    for i in range(total):
+        delay = start + i / args.rate - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(send(i)))
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - start
+
+    accepted = sum(v for k, v in statuses.items() if k.startswith("2") and "error" not in k)
+    return {
+        "prds_sent": total,
+        "prds_accepted": accepted,
+        "jobs_submitted": accepted * args.tasks,
+        "elapsed_s": round(elapsed, 3),
+        "prds_per_s": round(accepted / elapsed, 2) if elapsed else None,
+        "jobs_per_s": round(accepted * args.tasks / elapsed, 2) if elapsed else None,
+        "request_latency_s": percentiles(latencies),
+        "statuses": statuses,
+    }
+
+
+async def drain(conn, run_tag, expected, timeout):
+    deadline = time.monotonic() + timeout
+    done = 0
+    while time.monotonic() < deadline:
+        done = await conn.fetchval(
+            """
+            SELECT COUNT(DISTINCT job_id) FROM job_events
+            WHERE event_type IN ('completed', 'failed', 'dead_lettered') AND job_id IN (
+                SELECT job_id FROM job_events WHERE event_type = 'created' AND details->>'title' = $1
+            )
+        """,
+            run_tag,
+        )
+        if done >= expected:
+            return True
+        await asyncio.sleep(0.5)
+    return False
+
+
+async def stage_metrics(conn, run_tag, wait_scored: float):
+    rows = await conn.fetch(STAGES_SQL, run_tag)
+    deadline = time.monotonic() + wait_scored
+    while wait_scored and time.monotonic() < deadline:
+        pending = sum(1 for r in rows if r["completed"] and not r["scored"])
+        if not pending:
+            break
+        await asyncio.sleep(0.5)
+        rows = await conn.fetch(STAGES_SQL, run_tag)
+
+    def span(a, b):
+        return [(r[b] - r[a]).total_seconds() for r in rows if r[a] and r[b]]
+
+    return {
+        "jobs": len(rows),
+        "time_to_assignment_s": percentiles(span("created", "assigned")),
+        "claim_latency_s": percentiles(span("assigned", "claimed")),
+        "execution_s": percentiles(span("claimed", "completed")),
+        "end_to_end_completed_s": percentiles(span("created", "completed")),
+        "end_to_end_scored_s": percentiles(span("created", "scored")),
+        "completed": sum(1 for r in rows if r["completed"]),
+        "scored": sum(1 for r in rows if r["scored"]),
+    }
+
+
+def compare(current: dict, previous: dict):
+    """Print p50/p95/p99 and rate deltas against a previous result file."""
+
+    def walk(cur, prev, path=""):
+        for k, v in cur.items():
+            p = prev.get(k) if isinstance(prev, dict) else None
+            key = f"{path}.{k}" if path else k
+            if isinstance(v, dict):
+                walk(v, p or {}, key)
+            elif isinstance(v, (int, float)) and isinstance(p, (int, float)) and p:
+                print(f"  {key:55s} {p:>12} -> {v:>12} ({(v - p) / p:+.1%})")
+
+    print(f"Compared with {previous.get('run_id')}:")
+    for section in ("intake", "stages", "db"):
+        walk(current.get(section, {}), previous.get(section, {}), section)
+
+
+async def run(args):
+    run_tag = f"bench-{time.strftime('%Y%m%d-%H%M%S')}-{random.randint(0, 9999):04d}"
+    workers = [f"bench_worker_{i}" for i in range(args.workers)]
+
+    accountant = accountant_stub(args.accountant_latency).start()
+    router = router_stub(workers, args.router_latency).start()
+    manager_url = f"http://127.0.0.1:{args.port}"
+    os.environ["ACCOUNTANT_URL"] = accountant.url
+    os.environ["ROUTER_URL"] = router.url
+    os.environ["MANAGER_URL"] = manager_url
+    # keep retries of simulated failures within the drain timeout
+    os.environ.setdefault("RETRY_BASE_DELAY_SECONDS", "1")
+    os.environ.setdefault("RETRY_MAX_DELAY_SECONDS", "10")
+
+    servers = [await serve(importlib.import_module("services.manager.app.main").app, args.port)]
+    intake_url = f"{manager_url}/prds"
+    if args.via == "mcp":
+        mcp = importlib.import_module("services.mcp.app.main").app
+        servers.append(await serve(mcp, args.port + 1))
+        intake_url = f"http://127.0.0.1:{args.port + 1}/mcp/command"
+
+    background = []
+    if args.validator:
+        validator = importlib.import_module("services.validator.main")
+        background.append(asyncio.create_task(validator.validate_loop()))
+
+    conn = await asyncpg.connect(os.environ["DATABASE_URL"])
+    stats = {"completed": 0, "claim_conflicts": 0, "adapter_failures": 0, "worker_errors": 0}
+    limits = httpx.Limits(max_connections=args.concurrency + 4 * args.workers)
+    async with httpx.AsyncClient(timeout=30, limits=limits) as client:
+        for w in workers:
+            await client.post(f"{manager_url}/models/{w}/register", json={"kind": "bench"})
+
+        bench_workers = [
+            BenchWorker(
+                client,
+                manager_url,
+                w,
+                FakeAdapter(args.latency, args.latency_sigma, args.failure_rate, seed=i),
+                stats,
+            )
+            for i, w in enumerate(workers)
+        ]
+        before = await db_counters(conn)
+        background += [asyncio.create_task(w.run()) for w in bench_workers]
+
+        intake = await firehose(client, intake_url, run_tag, args)
+        drained = await drain(conn, run_tag, intake["jobs_submitted"], args.drain_timeout)
+        stages = await stage_metrics(conn, run_tag, args.drain_timeout if args.validator else 0)
+        after = await db_counters(conn)
+
+        for w in bench_workers:
+            w.running = False
+        for t in background:
+            t.cancel()
+        await asyncio.gather(*background, return_exceptions=True)
+
+    db = {
+        k: (after[k] - before[k]) if after[k] is not None and before[k] is not None else None
+        for k in after
+    }
+    if stages["jobs"]:
+        db["statements_per_job"] = (
+            round(db["statements"] / stages["jobs"], 2) if db["statements"] else None
+        )
+        db["xacts_per_job"] = round(
+            (db["xact_commit"] + db["xact_rollback"]) / stages["jobs"], 2
+        )
+
+    await conn.close()
+    for s in servers:
+        s.should_exit = True
+    accountant.stop()
+    router.stop()
+
+    return {
+        "run_id": run_tag,
+        "config": {k: v for k, v in vars(args).items() if k not in ("compare", "out")},
+        "drained": drained,
+        "intake": intake,
+        "stages": stages,
+        "workers": stats,
+        "db": db,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Aura pipeline throughput benchmark")
+    parser.add_argument("--via", choices=("manager", "mcp"), default="manager")
+    parser.add_argument("--rate", type=float, default=10, help="PRDs per second")
+    parser.add_argument("--duration", type=float, default=30, help="seconds of intake")
+    parser.add_argument("--tasks", type=int, default=3, help="tasks per PRD")
+    parser.add_argument("--projects", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, default=64, help="in-flight intake requests")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.2, help="median adapter latency (s)")
+    parser.add_argument("--latency-sigma", type=float, default=0.5)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--accountant-latency", type=float, default=0.0)
+    parser.add_argument("--router-latency", type=float, default=0.0)
+    parser.add_argument("--validator", action="store_true", help="run the validator in-process")
+    parser.add_argument("--drain-timeout", type=float, default=120)
+    parser.add_argument("--port", type=int, default=18000)
+    parser.add_argument("--out", type=Path, default=None)
+    parser.add_argument("--compare", type=Path, default=None)
+    args = parser.parse_args(argv)
+
+    if not os.getenv("DATABASE_URL"):
+        print("DATABASE_URL must point at a migrated local Postgres", file=sys.stderr)
+        return 2
+
+    result = asyncio.run(run(args))
+
+    out = args.out or RESULTS_DIR / f"{result['run_id']}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(result, indent=2, default=str))
+    print(json.dumps({k: result[k] for k in ("intake", "stages", "db")}, indent=2))
+    print(f"Saved {out}")
+
+    if args.compare:
+        compare(result, json.loads(args.compare.read_text()))
+    return 0 if result["drained"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+"""
+Stand-in HTTP services for the accountant and router, on plain http.server threads.
+"""
+
+import json
+import time
+import threading
+import itertools
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _Handler(BaseHTTPRequestHandler):
+    routes = {}
+    latency_s = 0.0
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length) or b"{}")
+        handler = self.routes.get(self.path)
+        if handler is None:
+            self.send_error(404)
+            return
+        if self.latency_s:
+            time.sleep(self.latency_s)
+        data = json.dumps(handler(body)).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path == "/health":
+            data = b'{"status": "ok"}'
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        else:
+            self.send_error(404)
+
+    def log_message(self, *args):
+        pass
+
+
+class StubServer:
+    def __init__(self, routes, latency_s: float = 0.0, host: str = "127.0.0.1"):
+        handler = type(
+            "StubHandler", (_Handler,), {"routes": routes, "latency_s": latency_s}
+        )
+        self.httpd = ThreadingHTTPServer((host, 0), handler)
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def accountant_stub(latency_s: float = 0.0) -> StubServer:
+    def evaluate(body):
+        return {"model": body.get("model_name"), "score": 1.0, "action": "none"}
+
+    return StubServer({"/evaluate": evaluate}, latency_s)
+
+
+def router_stub(models, latency_s: float = 0.0) -> StubServer:
+    """Round-robins over `models`, which is what spreads jobs across the bench workers."""
+    cycle = itertools.cycle(models)
+    lock = threading.Lock()
+
+    def route(body):
+        with lock:
+            model = next(cycle)
+        return {
+            "model": model,
+            "reason": "benchmark round-robin",
+            "capabilities": body.get("requirements", []),
+            "cost_tier": "free",
+        }
+
+    return StubServer({"/route": route}, latency_s)
@@ -0,0 +1,37 @@
+-- 006_validation_queue.sql
+-- Event-driven validation: completed jobs are enqueued and announced via NOTIFY
+
+CREATE TABLE IF NOT EXISTS validation_queue (
+  job_id UUID PRIMARY KEY REFERENCES jobs(id) ON DELETE CASCADE,
+  enqueued_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+  claimed_by TEXT,
+  claimed_at TIMESTAMPTZ,
+  attempts INT NOT NULL DEFAULT 0
+);
+
+CREATE INDEX IF NOT EXISTS idx_validation_queue_claim ON validation_queue(claimed_at, enqueued_at);
+CREATE INDEX IF NOT EXISTS idx_model_runs_job_id ON model_runs(job_id);
+CREATE INDEX IF NOT EXISTS idx_model_artifacts_job_id ON model_artifacts(job_id);
+
+-- Enqueue on transition to COMPLETED and wake any listening validator
+CREATE OR REPLACE FUNCTION enqueue_validation() RETURNS trigger AS $$
+BEGIN
+  IF NEW.status = 'COMPLETED' AND (TG_OP = 'INSERT' OR OLD.status IS DISTINCT FROM 'COMPLETED') THEN
+    INSERT INTO validation_queue (job_id) VALUES (NEW.id) ON CONFLICT DO NOTHING;
+    PERFORM pg_notify('job_completed', NEW.id::text);
+  END IF;
+  RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_jobs_enqueue_validation ON jobs;
+CREATE TRIGGER trg_jobs_enqueue_validation
+  AFTER INSERT OR UPDATE OF status ON jobs
+  FOR EACH ROW EXECUTE FUNCTION enqueue_validation();
+
+-- Backfill completed jobs that were never scored
+INSERT INTO validation_queue (job_id)
+SELECT j.id FROM jobs j
+WHERE j.status = 'COMPLETED'
+AND NOT EXISTS (SELECT 1 FROM model_runs mr WHERE mr.job_id = j.id)
+ON CONFLICT DO NOTHING;
@@ -0,0 +1,13 @@
+-- 007_artifact_signatures.sql
+-- MinHash signatures of result artifacts for cross-model agreement scoring
+
+CREATE TABLE IF NOT EXISTS artifact_signatures (
+  artifact_id BIGINT PRIMARY KEY REFERENCES model_artifacts(id) ON DELETE CASCADE,
+  job_id UUID,
+  model_id INT REFERENCES models(id),
+  family TEXT NOT NULL,              -- md5 of the task payload, falls back to job id
+  signature BYTEA NOT NULL,          -- 128 x uint32 little-endian
+  created_at TIMESTAMPTZ DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS idx_artifact_signatures_family ON artifact_signatures(family, artifact_id);
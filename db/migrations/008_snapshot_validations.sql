@@ -0,0 +1,8 @@
+-- 008_snapshot_validations.sql
+-- Test-execution results keyed by snapshot content hash
+
+CREATE TABLE IF NOT EXISTS snapshot_validations (
+  content_hash TEXT PRIMARY KEY,     -- sha256 of the snapshot tarball
+  signals JSONB NOT NULL,
+  created_at TIMESTAMPTZ DEFAULT now()
+);
@@ -0,0 +1,25 @@
+-- 009_scoring_weight_sets.sql
+-- Versioned validator weights; every model_run records the version that scored it
+
+CREATE TABLE IF NOT EXISTS scoring_weight_sets (
+  version INT PRIMARY KEY,
+  weights JSONB NOT NULL,
+  note TEXT,
+  is_active BOOLEAN NOT NULL DEFAULT FALSE,
+  created_at TIMESTAMPTZ DEFAULT now()
+);
+
+-- at most one active weight set
+CREATE UNIQUE INDEX IF NOT EXISTS idx_scoring_weight_sets_active ON scoring_weight_sets(is_active) WHERE is_active;
+
+INSERT INTO scoring_weight_sets (version, weights, note, is_active)
+VALUES (
+  1,
+  '{"tests": 0.40, "cross_agreement": 0.30, "docs_quality": 0.10, "performance": 0.10, "penalties": -0.25}',
+  'initial weights',
+  TRUE
+)
+ON CONFLICT DO NOTHING;
+
+ALTER TABLE model_runs ADD COLUMN IF NOT EXISTS weights_version INT;
+UPDATE model_runs SET weights_version = 1 WHERE weights_version IS NULL AND score IS NOT NULL;
@@ -0,0 +1,78 @@
+-- 010_model_score_rollups.sql
+-- Hourly per-model score buckets in model_scores, maintained as model_runs change.
+-- HR windows are then a sum over at most 24 * HR_WINDOW_DAYS bucket rows per model.
+
+ALTER TABLE model_scores ADD COLUMN IF NOT EXISTS score_sum NUMERIC NOT NULL DEFAULT 0;
+-- tasks_completed is the number of scored runs in the bucket
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_model_scores_bucket ON model_scores(model_id, window_start);
+CREATE INDEX IF NOT EXISTS idx_model_scores_window_start ON model_scores(window_start);
+CREATE INDEX IF NOT EXISTS idx_promotions_model ON promotions(model_id, performed_at DESC);
+
+-- Statement-level so batch inserts and bulk re-scores touch each bucket once
+CREATE OR REPLACE FUNCTION rollup_model_runs() RETURNS trigger AS $$
+BEGIN
+  IF TG_OP = 'INSERT' THEN
+    INSERT INTO model_scores (model_id, window_start, window_end, avg_score, tasks_completed, score_sum)
+    SELECT model_id, date_trunc('hour', created_at), date_trunc('hour', created_at) + interval '1 hour',
+           SUM(score) / COUNT(*), COUNT(*), SUM(score)
+    FROM new_rows
+    WHERE score IS NOT NULL AND model_id IS NOT NULL
+    GROUP BY 1, 2
+    ON CONFLICT (model_id, window_start) DO UPDATE SET
+      score_sum = model_scores.score_sum + EXCLUDED.score_sum,
+      tasks_completed = model_scores.tasks_completed + EXCLUDED.tasks_completed,
+      avg_score = (model_scores.score_sum + EXCLUDED.score_sum)
+                  / NULLIF(model_scores.tasks_completed + EXCLUDED.tasks_completed, 0);
+  ELSE
+    WITH changed AS (
+      SELECT o.model_id AS old_model, o.score AS old_score, o.created_at AS old_created,
+             n.model_id AS new_model, n.score AS new_score, n.created_at AS new_created
+      FROM old_rows o JOIN new_rows n ON n.id = o.id
+      WHERE o.score IS DISTINCT FROM n.score
+         OR o.model_id IS DISTINCT FROM n.model_id
+         OR o.created_at IS DISTINCT FROM n.created_at
+    ), deltas AS (
+      SELECT old_model AS model_id, date_trunc('hour', old_created) AS ws, -old_score AS ds, -1 AS dn
+      FROM changed WHERE old_score IS NOT NULL AND old_model IS NOT NULL
+      UNION ALL
+      SELECT new_model, date_trunc('hour', new_created), new_score, 1
+      FROM changed WHERE new_score IS NOT NULL AND new_model IS NOT NULL
+    )
+    INSERT INTO model_scores (model_id, window_start, window_end, avg_score, tasks_completed, score_sum)
+    SELECT model_id, ws, ws + interval '1 hour', SUM(ds) / NULLIF(SUM(dn), 0), SUM(dn), SUM(ds)
+    FROM deltas
+    GROUP BY model_id, ws
+    ON CONFLICT (model_id, window_start) DO UPDATE SET
+      score_sum = model_scores.score_sum + EXCLUDED.score_sum,
+      tasks_completed = model_scores.tasks_completed + EXCLUDED.tasks_completed,
+      avg_score = (model_scores.score_sum + EXCLUDED.score_sum)
+                  / NULLIF(model_scores.tasks_completed + EXCLUDED.tasks_completed, 0);
+  END IF;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_model_runs_rollup_insert ON model_runs;
+CREATE TRIGGER trg_model_runs_rollup_insert
+  AFTER INSERT ON model_runs
+  REFERENCING NEW TABLE AS new_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION rollup_model_runs();
+
+DROP TRIGGER IF EXISTS trg_model_runs_rollup_update ON model_runs;
+CREATE TRIGGER trg_model_runs_rollup_update
+  AFTER UPDATE ON model_runs
+  REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION rollup_model_runs();
+
+-- Backfill buckets from existing runs (absolute values, safe to re-run)
+INSERT INTO model_scores (model_id, window_start, window_end, avg_score, tasks_completed, score_sum)
+SELECT model_id, date_trunc('hour', created_at), date_trunc('hour', created_at) + interval '1 hour',
+       AVG(score), COUNT(*), SUM(score)
+FROM model_runs
+WHERE score IS NOT NULL AND model_id IS NOT NULL
+GROUP BY 1, 2
+ON CONFLICT (model_id, window_start) DO UPDATE SET
+  score_sum = EXCLUDED.score_sum,
+  tasks_completed = EXCLUDED.tasks_completed,
+  avg_score = EXCLUDED.avg_score;
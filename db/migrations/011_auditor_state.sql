@@ -0,0 +1,21 @@
+-- 011_auditor_state.sql
+-- Auditor scan state: per-rule high-water marks and an alert dedup/cooldown index
+
+CREATE TABLE IF NOT EXISTS auditor_watermarks (
+  rule TEXT PRIMARY KEY,
+  last_id BIGINT NOT NULL DEFAULT 0,
+  updated_at TIMESTAMPTZ DEFAULT now()
+);
+
+CREATE TABLE IF NOT EXISTS alert_state (
+  rule TEXT NOT NULL,
+  subject TEXT NOT NULL,            -- job id, model name, ...
+  first_alert_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+  last_alert_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+  alert_count INT NOT NULL DEFAULT 1,
+  PRIMARY KEY (rule, subject)
+);
+
+-- State-based rules only look at the rows they care about
+CREATE INDEX IF NOT EXISTS idx_jobs_in_progress_created ON jobs(created_at) WHERE status = 'IN_PROGRESS';
+CREATE INDEX IF NOT EXISTS idx_jobs_failed_completed ON jobs(completed_at) WHERE status = 'FAILED';
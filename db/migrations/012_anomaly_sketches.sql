@@ -0,0 +1,10 @@
+-- 012_anomaly_sketches.sql
+-- Snapshots of the auditor's per-model quantile sketches (DDSketch) and stream watermarks
+
+CREATE TABLE IF NOT EXISTS anomaly_sketches (
+  model TEXT PRIMARY KEY,           -- '__watermarks__' holds the stream positions
+  state JSONB NOT NULL,
+  updated_at TIMESTAMPTZ DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS idx_job_events_type_id ON job_events(event_type, id);
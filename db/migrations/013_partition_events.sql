@@ -0,0 +1,143 @@
+-- 013_partition_events.sql
+-- Monthly range partitioning for job_events and audit_log, plus cold archive tables.
+-- Partitions are named <table>_YYYYMM and created ahead of time by the archiver.
+
+CREATE OR REPLACE FUNCTION ensure_monthly_partitions(parent TEXT, from_ts TIMESTAMPTZ, months_ahead INT DEFAULT 3)
+RETURNS INT AS $$
+DECLARE
+  m DATE := date_trunc('month', COALESCE(from_ts, now()))::date;
+  last_month DATE := (date_trunc('month', now()) + make_interval(months => months_ahead))::date;
+  part TEXT;
+  created INT := 0;
+BEGIN
+  WHILE m <= last_month LOOP
+    part := parent || '_' || to_char(m, 'YYYYMM');
+    IF to_regclass(part) IS NULL THEN
+      EXECUTE format(
+        'CREATE TABLE %I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)',
+        part, parent, m, (m + interval '1 month')::date
+      );
+      created := created + 1;
+    END IF;
+    m := (m + interval '1 month')::date;
+  END LOOP;
+  RETURN created;
+END;
+$$ LANGUAGE plpgsql;
+
+-- job_events -> partitioned by created_at
+DO $$
+DECLARE
+  oldest TIMESTAMPTZ;
+BEGIN
+  IF NOT EXISTS (
+    SELECT 1 FROM pg_partitioned_table pt JOIN pg_class c ON c.oid = pt.partrelid
+    WHERE c.relname = 'job_events'
+  ) THEN
+    ALTER TABLE job_events RENAME TO job_events_unpartitioned;
+    ALTER INDEX job_events_pkey RENAME TO job_events_unpartitioned_pkey;
+    CREATE TABLE job_events (
+      id BIGINT NOT NULL DEFAULT nextval('job_events_id_seq'),
+      job_id UUID REFERENCES jobs(id),
+      event_type TEXT NOT NULL,
+      details JSONB,
+      created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+      PRIMARY KEY (id, created_at)
+    ) PARTITION BY RANGE (created_at);
+    ALTER SEQUENCE job_events_id_seq OWNED BY job_events.id;
+
+    SELECT MIN(created_at) INTO oldest FROM job_events_unpartitioned;
+    PERFORM ensure_monthly_partitions('job_events', oldest, 3);
+    INSERT INTO job_events (id, job_id, event_type, details, created_at)
+    SELECT id, job_id, event_type, details, COALESCE(created_at, NOW()) FROM job_events_unpartitioned;
+    DROP TABLE job_events_unpartitioned;
+  END IF;
+END $$;
+
+CREATE INDEX IF NOT EXISTS idx_job_events_job_id ON job_events(job_id);
+CREATE INDEX IF NOT EXISTS idx_job_events_created_at ON job_events(created_at);
+CREATE INDEX IF NOT EXISTS idx_job_events_type_id ON job_events(event_type, id);
+
+-- audit_log -> partitioned by created_at
+DO $$
+DECLARE
+  oldest TIMESTAMPTZ;
+BEGIN
+  IF NOT EXISTS (
+    SELECT 1 FROM pg_partitioned_table pt JOIN pg_class c ON c.oid = pt.partrelid
+    WHERE c.relname = 'audit_log'
+  ) THEN
+    ALTER TABLE audit_log RENAME TO audit_log_unpartitioned;
+    ALTER INDEX audit_log_pkey RENAME TO audit_log_unpartitioned_pkey;
+    CREATE TABLE audit_log (
+      id INT NOT NULL DEFAULT nextval('audit_log_id_seq'),
+      actor TEXT NOT NULL,
+      action TEXT NOT NULL,
+      details JSONB,
+      created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+      PRIMARY KEY (id, created_at)
+    ) PARTITION BY RANGE (created_at);
+    ALTER SEQUENCE audit_log_id_seq OWNED BY audit_log.id;
+
+    SELECT MIN(created_at) INTO oldest FROM audit_log_unpartitioned;
+    PERFORM ensure_monthly_partitions('audit_log', oldest, 3);
+    INSERT INTO audit_log (id, actor, action, details, created_at)
+    SELECT id, actor, action, details, COALESCE(created_at, NOW()) FROM audit_log_unpartitioned;
+    DROP TABLE audit_log_unpartitioned;
+  END IF;
+END $$;
+
+CREATE INDEX IF NOT EXISTS idx_audit_log_created_at ON audit_log(created_at);
+
+-- Cold storage: full job rows and their events, lz4-compressed, partitioned by archive month
+ALTER TABLE archived_jobs ADD COLUMN IF NOT EXISTS job JSONB COMPRESSION lz4;
+CREATE INDEX IF NOT EXISTS idx_archived_jobs_retention ON archived_jobs(retention_until);
+
+CREATE TABLE IF NOT EXISTS archived_job_events (
+  id BIGINT NOT NULL,
+  job_id UUID NOT NULL,
+  event_type TEXT NOT NULL,
+  details JSONB COMPRESSION lz4,
+  created_at TIMESTAMPTZ NOT NULL,
+  archived_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+  PRIMARY KEY (id, archived_at)
+) PARTITION BY RANGE (archived_at);
+
+CREATE INDEX IF NOT EXISTS idx_archived_job_events_job_id ON archived_job_events(job_id);
+
+SELECT ensure_monthly_partitions('archived_job_events', NOW(), 3);
+
+CREATE INDEX IF NOT EXISTS idx_jobs_completed_at ON jobs(completed_at);
+
+-- Move a batch of terminal jobs (and their events) into cold storage
+CREATE OR REPLACE FUNCTION archive_terminal_jobs(
+  terminal TEXT[], older_than INTERVAL, retention INTERVAL, batch INT
+) RETURNS INT AS $$
+DECLARE
+  ids UUID[];
+BEGIN
+  SELECT array_agg(id) INTO ids FROM (
+    SELECT id FROM jobs
+    WHERE status = ANY(terminal) AND completed_at < NOW() - older_than
+    ORDER BY completed_at
+    LIMIT batch
+    FOR UPDATE SKIP LOCKED
+  ) v;
+  IF ids IS NULL THEN
+    RETURN 0;
+  END IF;
+
+  INSERT INTO archived_jobs (id, project_id, final_status, archived_at, retention_until, job)
+  SELECT j.id, j.project_id, j.status, NOW(), NOW() + retention, to_jsonb(j)
+  FROM jobs j WHERE j.id = ANY(ids)
+  ON CONFLICT (id) DO NOTHING;
+
+  INSERT INTO archived_job_events (id, job_id, event_type, details, created_at)
+  SELECT id, job_id, event_type, details, created_at FROM job_events WHERE job_id = ANY(ids);
+
+  DELETE FROM job_validation_ticks WHERE job_id = ANY(ids);
+  DELETE FROM job_events WHERE job_id = ANY(ids);
+  DELETE FROM jobs WHERE id = ANY(ids);
+  RETURN array_length(ids, 1);
+END;
+$$ LANGUAGE plpgsql;
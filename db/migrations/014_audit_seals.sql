@@ -0,0 +1,32 @@
+-- 014_audit_seals.sql
+-- Batched Merkle seals over audit_log and job_events, chained by seal_hash.
+-- leaf_ids holds the sealed row ids (big-endian int64, ascending); tree holds every
+-- node hash (32 bytes each), level by level from the leaves up, for inclusion proofs.
+
+CREATE TABLE IF NOT EXISTS audit_seals (
+  id BIGSERIAL PRIMARY KEY,
+  source TEXT NOT NULL,
+  first_id BIGINT NOT NULL,
+  last_id BIGINT NOT NULL,
+  leaf_count INT NOT NULL,
+  leaf_ids BYTEA NOT NULL,
+  tree BYTEA NOT NULL,
+  merkle_root BYTEA NOT NULL,
+  prev_seal_hash BYTEA,
+  seal_hash BYTEA NOT NULL,
+  created_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_audit_seals_source_last ON audit_seals(source, last_id);
+
+-- Seals are append-only
+CREATE OR REPLACE FUNCTION audit_seals_immutable() RETURNS TRIGGER AS $$
+BEGIN
+  RAISE EXCEPTION 'audit_seals is append-only';
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_audit_seals_immutable ON audit_seals;
+CREATE TRIGGER trg_audit_seals_immutable
+BEFORE UPDATE OR DELETE ON audit_seals
+FOR EACH ROW EXECUTE FUNCTION audit_seals_immutable();
@@ -0,0 +1,20 @@
+-- 015_job_spans.sql
+-- Per-stage trace spans. One trace id per PRD intake, propagated as X-Aura-Trace-Id.
+-- job_id is a loose reference so spans outlive archived jobs; intake spans have no job_id.
+
+ALTER TABLE jobs ADD COLUMN IF NOT EXISTS trace_id TEXT;
+
+CREATE TABLE IF NOT EXISTS job_spans (
+  id BIGSERIAL PRIMARY KEY,
+  trace_id TEXT NOT NULL,
+  job_id UUID,
+  stage TEXT NOT NULL,
+  service TEXT NOT NULL,
+  started_at TIMESTAMPTZ NOT NULL,
+  duration_ms REAL NOT NULL,
+  attrs JSONB
+);
+
+CREATE INDEX IF NOT EXISTS idx_job_spans_job_id ON job_spans(job_id);
+CREATE INDEX IF NOT EXISTS idx_job_spans_trace_id ON job_spans(trace_id) WHERE job_id IS NULL;
+CREATE INDEX IF NOT EXISTS idx_job_spans_started_at ON job_spans USING BRIN (started_at);
@@ -0,0 +1,5 @@
+-- 016_jobs_prd_id.sql
+-- Group jobs by the PRD intake that created them (the root_job_id returned by /prds)
+
+ALTER TABLE jobs ADD COLUMN IF NOT EXISTS prd_id UUID;
+CREATE INDEX IF NOT EXISTS idx_jobs_prd_id ON jobs(prd_id) WHERE prd_id IS NOT NULL;
@@ -0,0 +1,37 @@
+-- 017_fair_queue.sql
+-- Weighted fair queuing: per-project weights, per-job priority, and real project ids on jobs.
+
+ALTER TABLE projects ADD COLUMN IF NOT EXISTS external_ref TEXT;  -- PRD project_id as submitted
+ALTER TABLE projects ADD COLUMN IF NOT EXISTS weight REAL NOT NULL DEFAULT 1.0;
+
+-- intake used to insert a fresh 'project-N' row per PRD; keep the oldest as the canonical one
+UPDATE projects p SET external_ref = substring(p.name FROM '^project-(.+)$')
+WHERE p.external_ref IS NULL
+  AND p.id IN (
+    SELECT DISTINCT ON (name) id FROM projects WHERE name ~ '^project-' ORDER BY name, created_at
+  );
+CREATE UNIQUE INDEX IF NOT EXISTS idx_projects_external_ref ON projects(external_ref);
+
+-- queued jobs from before this migration have no project; give them one tenant of their own
+INSERT INTO projects (name, external_ref) VALUES ('unassigned', '__unassigned__')
+ON CONFLICT (external_ref) DO NOTHING;
+UPDATE jobs SET project_id = (SELECT id FROM projects WHERE external_ref = '__unassigned__')
+WHERE project_id IS NULL AND status = 'QUEUED';
+
+ALTER TABLE jobs ADD COLUMN IF NOT EXISTS priority INT NOT NULL DEFAULT 0;
+
+CREATE INDEX IF NOT EXISTS idx_jobs_status_priority_created ON jobs(status, priority DESC, created_at);
+-- per-tenant queue heads for the scheduler
+CREATE INDEX IF NOT EXISTS idx_jobs_queued_project ON jobs(project_id, priority DESC, created_at)
+  WHERE status = 'QUEUED';
+
+-- model_runs.project_id was INT while jobs.project_id is a UUID
+DO $$
+BEGIN
+  IF EXISTS (
+    SELECT 1 FROM information_schema.columns
+    WHERE table_name = 'model_runs' AND column_name = 'project_id' AND data_type = 'integer'
+  ) THEN
+    ALTER TABLE model_runs ALTER COLUMN project_id TYPE UUID USING NULL;
+  END IF;
+END $$;
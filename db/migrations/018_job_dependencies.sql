@@ -0,0 +1,20 @@
+-- 018_job_dependencies.sql
+-- PRD task DAG: jobs wait as BLOCKED until pending_deps reaches zero, then move to QUEUED.
+-- critical_path is the longest estimate-weighted chain from the job to the end of its PRD.
+
+CREATE TABLE IF NOT EXISTS job_dependencies (
+  job_id UUID NOT NULL REFERENCES jobs(id) ON DELETE CASCADE,
+  depends_on UUID NOT NULL REFERENCES jobs(id) ON DELETE CASCADE,
+  PRIMARY KEY (job_id, depends_on)
+);
+
+CREATE INDEX IF NOT EXISTS idx_job_dependencies_depends_on ON job_dependencies(depends_on);
+
+ALTER TABLE jobs ADD COLUMN IF NOT EXISTS pending_deps INT NOT NULL DEFAULT 0;
+ALTER TABLE jobs ADD COLUMN IF NOT EXISTS critical_path REAL NOT NULL DEFAULT 0;
+
+-- queue heads: priority first, then the longest remaining chain, then age
+DROP INDEX IF EXISTS idx_jobs_queued_project;
+CREATE INDEX IF NOT EXISTS idx_jobs_queued_project
+  ON jobs(project_id, priority DESC, critical_path DESC, created_at)
+  WHERE status = 'QUEUED';
@@ -0,0 +1,18 @@
+-- 019_hedging.sql
+-- Opt-in hedged execution: a straggling job gets a duplicate on a second model;
+-- the first result wins and the other is CANCELLED. Hedge cost is capped per project.
+
+ALTER TABLE jobs ADD COLUMN IF NOT EXISTS hedge BOOLEAN NOT NULL DEFAULT FALSE;   -- opted in
+ALTER TABLE jobs ADD COLUMN IF NOT EXISTS hedge_of UUID REFERENCES jobs(id) ON DELETE SET NULL;
+ALTER TABLE jobs ADD COLUMN IF NOT EXISTS hedge_cost_usd NUMERIC(10,4);            -- reserved for the duplicate
+ALTER TABLE jobs ADD COLUMN IF NOT EXISTS started_at TIMESTAMPTZ;                  -- set on claim
+
+ALTER TABLE projects ADD COLUMN IF NOT EXISTS hedge_budget_usd NUMERIC(10,4) NOT NULL DEFAULT 1.00;
+ALTER TABLE projects ADD COLUMN IF NOT EXISTS hedge_spent_usd NUMERIC(10,4) NOT NULL DEFAULT 0;
+
+CREATE INDEX IF NOT EXISTS idx_jobs_hedge_of ON jobs(hedge_of) WHERE hedge_of IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_jobs_hedge_candidates ON jobs(started_at)
+  WHERE status = 'IN_PROGRESS' AND hedge AND hedge_of IS NULL;
+
+-- per-model generation latency percentiles
+CREATE INDEX IF NOT EXISTS idx_job_spans_stage_started ON job_spans(stage, started_at);
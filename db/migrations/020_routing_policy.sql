@@ -0,0 +1,10 @@
+-- 020_routing_policy.sql
+-- Checkpoints of the router's online routing policy: one row per (role, capability-set)
+-- context holding each model's Beta posterior. '__meta__' holds the model_runs
+-- watermark and the operator's quality/latency/cost weights.
+
+CREATE TABLE IF NOT EXISTS routing_policy_state (
+  context TEXT PRIMARY KEY,
+  state JSONB NOT NULL,
+  updated_at TIMESTAMPTZ DEFAULT now()
+);
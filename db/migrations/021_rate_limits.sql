@@ -0,0 +1,19 @@
+-- 021_rate_limits.sql
+-- Shared token buckets for provider rate limits. Every worker replica of a backend
+-- draws from the same row (the manager serialises access with a row lock).
+-- Limits are the provider's published/observed limits; the manager keeps a headroom below them.
+
+CREATE TABLE IF NOT EXISTS rate_limit_buckets (
+  backend TEXT PRIMARY KEY,             -- MODEL_BACKEND of the workers: openai | gemini
+  rpm_limit DOUBLE PRECISION NOT NULL,
+  tpm_limit DOUBLE PRECISION NOT NULL,
+  requests_available DOUBLE PRECISION NOT NULL,
+  tokens_available DOUBLE PRECISION NOT NULL,
+  paused_until TIMESTAMPTZ,             -- set from Retry-After after a 429
+  updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+INSERT INTO rate_limit_buckets (backend, rpm_limit, tpm_limit, requests_available, tokens_available)
+VALUES ('openai', 500, 200000, 0, 0),
+       ('gemini', 360, 1000000, 0, 0)
+ON CONFLICT (backend) DO NOTHING;
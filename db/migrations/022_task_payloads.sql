@@ -0,0 +1,26 @@
+-- 022_task_payloads.sql
+-- Task payloads as a first-class column, and one row per PRD intake, so a job's
+-- context (task, PRD title, prior artifacts) is an indexed lookup instead of an
+-- event scan. The 'created' event keeps its copy as the audit record.
+-- jobs.prd_id stays a loose reference: PRDs outlive their archived jobs.
+
+CREATE TABLE IF NOT EXISTS prds (
+  id UUID PRIMARY KEY,                 -- the root_job_id returned by POST /prds
+  project_id UUID REFERENCES projects(id) ON DELETE CASCADE,
+  title TEXT NOT NULL,
+  created_at TIMESTAMPTZ DEFAULT now()
+);
+
+ALTER TABLE jobs ADD COLUMN IF NOT EXISTS task_payload JSONB;
+
+UPDATE jobs j SET task_payload = e.details->'task_payload'
+FROM job_events e
+WHERE e.job_id = j.id AND e.event_type = 'created' AND j.task_payload IS NULL;
+
+INSERT INTO prds (id, project_id, title, created_at)
+SELECT DISTINCT ON (j.prd_id) j.prd_id, j.project_id, COALESCE(e.details->>'title', ''), j.created_at
+FROM jobs j
+JOIN job_events e ON e.job_id = j.id AND e.event_type = 'created'
+WHERE j.prd_id IS NOT NULL
+ORDER BY j.prd_id, j.created_at
+ON CONFLICT (id) DO NOTHING;
@@ -0,0 +1,13 @@
+-- 023_artifact_blobs.sql
+-- Artifact bodies move to the content-addressed blob store (BLOB_ROOT, see
+-- services/manager/app/blobstore.py). The row keeps the address, size and media
+-- type; `artifact` keeps only the small structured fields. Older rows still carry
+-- their output inline and readers fall back to it.
+
+ALTER TABLE model_artifacts ADD COLUMN IF NOT EXISTS blob_sha256 TEXT;
+ALTER TABLE model_artifacts ADD COLUMN IF NOT EXISTS blob_size BIGINT;
+ALTER TABLE model_artifacts ADD COLUMN IF NOT EXISTS media_type TEXT;
+
+-- blob GC looks up which hashes are still referenced
+CREATE INDEX IF NOT EXISTS idx_model_artifacts_blob_sha256
+  ON model_artifacts(blob_sha256) WHERE blob_sha256 IS NOT NULL;
@@ -0,0 +1,8 @@
+-- 024_project_quotas.sql
+-- Per-project admission quota: the most unfinished jobs (BLOCKED through IN_PROGRESS)
+-- a project may have. NULL = no quota; the global backpressure still applies.
+
+ALTER TABLE projects ADD COLUMN IF NOT EXISTS max_pending INT;
+
+-- project quota checks count a project's unfinished jobs
+CREATE INDEX IF NOT EXISTS idx_jobs_project_status ON jobs(project_id, status);
@@ -0,0 +1,22 @@
+-- 025_models_changed.sql
+-- Model registry caches (manager, validator) stay in memory and reload a model when
+-- this channel names it: registration, HR activation/retirement and suspensions all
+-- go through these columns. Counters such as warnings_count don't notify.
+
+ALTER TABLE models ADD COLUMN IF NOT EXISTS capabilities TEXT[] NOT NULL DEFAULT '{}';
+
+CREATE OR REPLACE FUNCTION notify_models_changed() RETURNS trigger AS $$
+BEGIN
+  IF TG_OP = 'UPDATE' AND NEW.name IS DISTINCT FROM OLD.name THEN
+    PERFORM pg_notify('models_changed', '');  -- renamed: listeners reload everything
+  ELSE
+    PERFORM pg_notify('models_changed', COALESCE(NEW.name, OLD.name));
+  END IF;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_models_changed ON models;
+CREATE TRIGGER trg_models_changed
+  AFTER INSERT OR DELETE OR UPDATE OF name, kind, endpoint, is_active, suspended, capabilities ON models
+  FOR EACH ROW EXECUTE FUNCTION notify_models_changed();
@@ -0,0 +1,17 @@
+-- 026_idempotency_keys.sql
+-- Idempotency-Key support for PRD intake, job completion and artifact upload.
+-- One row per (endpoint scope, client key), addressed by sha256(scope || key) so the
+-- primary key stays a fixed 32 bytes whatever the client sends. The first request
+-- inserts the row with a NULL status_code; its 2xx response is stored and replayed
+-- to retries until expires_at, after which the manager purges the row.
+
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+  key_hash BYTEA PRIMARY KEY,           -- sha256(scope || 0x00 || Idempotency-Key)
+  request_hash BYTEA,                   -- sha256 of the request body; a reused key with another body is refused
+  status_code SMALLINT,                 -- NULL while the first request is still running
+  response BYTEA,                       -- stored JSON body
+  created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+  expires_at TIMESTAMPTZ NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_idempotency_keys_expires_at ON idempotency_keys (expires_at);
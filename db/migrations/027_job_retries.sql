@@ -0,0 +1,15 @@
+-- 027_job_retries.sql
+-- Retry engine: a failed attempt classified as transient goes back to QUEUED with
+-- retry_count + 1 and not_before set by exponential backoff; the scheduler skips it
+-- until then. Permanent failures end as FAILED, exhausted retries as DEAD_LETTER.
+
+ALTER TABLE jobs ADD COLUMN IF NOT EXISTS not_before TIMESTAMPTZ;
+UPDATE jobs SET retry_count = 0 WHERE retry_count IS NULL;
+ALTER TABLE jobs ALTER COLUMN retry_count SET NOT NULL;
+
+-- queue heads per project, skipping jobs still backing off
+CREATE INDEX IF NOT EXISTS idx_jobs_queued_not_before ON jobs(project_id, not_before)
+  WHERE status = 'QUEUED';
+
+-- dead-letter queue listing
+CREATE INDEX IF NOT EXISTS idx_jobs_dead_letter ON jobs(completed_at) WHERE status = 'DEAD_LETTER';
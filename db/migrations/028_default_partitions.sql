@@ -0,0 +1,56 @@
+-- 028_default_partitions.sql
+-- DEFAULT partitions for job_events and audit_log: if the archiver falls behind
+-- and no monthly partition covers a row's created_at, the insert lands here
+-- instead of failing (and with it the transition that wrote the event).
+--
+-- A monthly partition can't be created over rows already sitting in the default
+-- partition, so ensure_monthly_partitions now moves them into the new partition
+-- as it creates it.
+
+CREATE OR REPLACE FUNCTION ensure_monthly_partitions(parent TEXT, from_ts TIMESTAMPTZ, months_ahead INT DEFAULT 3)
+RETURNS INT AS $$
+DECLARE
+  m DATE := date_trunc('month', COALESCE(from_ts, now()))::date;
+  last_month DATE := (date_trunc('month', now()) + make_interval(months => months_ahead))::date;
+  part TEXT;
+  fallback TEXT := parent || '_default';
+  key_col TEXT;
+  created INT := 0;
+BEGIN
+  IF to_regclass(fallback) IS NOT NULL THEN
+    SELECT a.attname INTO key_col
+    FROM pg_partitioned_table pt
+    JOIN pg_attribute a ON a.attrelid = pt.partrelid AND a.attnum = pt.partattrs[0]
+    WHERE pt.partrelid = parent::regclass;
+  END IF;
+
+  WHILE m <= last_month LOOP
+    part := parent || '_' || to_char(m, 'YYYYMM');
+    IF to_regclass(part) IS NULL THEN
+      IF key_col IS NULL THEN
+        EXECUTE format(
+          'CREATE TABLE %I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)',
+          part, parent, m, (m + interval '1 month')::date
+        );
+      ELSE
+        -- build the month standalone, move its rows out of the default partition, then attach
+        EXECUTE format('CREATE TABLE %I (LIKE %I INCLUDING DEFAULTS INCLUDING CONSTRAINTS)', part, parent);
+        EXECUTE format(
+          'WITH moved AS (DELETE FROM %I WHERE %I >= %L AND %I < %L RETURNING *) INSERT INTO %I SELECT * FROM moved',
+          fallback, key_col, m, key_col, (m + interval '1 month')::date, part
+        );
+        EXECUTE format(
+          'ALTER TABLE %I ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+          parent, part, m, (m + interval '1 month')::date
+        );
+      END IF;
+      created := created + 1;
+    END IF;
+    m := (m + interval '1 month')::date;
+  END LOOP;
+  RETURN created;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TABLE IF NOT EXISTS job_events_default PARTITION OF job_events DEFAULT;
+CREATE TABLE IF NOT EXISTS audit_log_default PARTITION OF audit_log DEFAULT;
@@ -0,0 +1,19 @@
+-- 029_audit_seal_gaps.sql
+-- Ids a seal batch skipped. job_events/audit_log ids are assigned before commit,
+-- so a row may become visible after higher ids were sealed. The sealer seals
+-- such late rows in a batch of their own (sealed_in) and forgets a gap once no
+-- transaction that was running when it was recorded (xmax, a snapshot bound as
+-- bigint) can still fill it.
+
+CREATE TABLE IF NOT EXISTS audit_seal_gaps (
+  source TEXT NOT NULL,
+  id BIGINT NOT NULL,
+  xmax BIGINT NOT NULL,
+  sealed_in BIGINT REFERENCES audit_seals(id),
+  PRIMARY KEY (source, id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_audit_seal_gaps_open ON audit_seal_gaps(source) WHERE sealed_in IS NULL;
+-- late seals, skipped when looking up a row's seal by id range
+CREATE INDEX IF NOT EXISTS idx_audit_seal_gaps_sealed_in ON audit_seal_gaps(sealed_in)
+  WHERE sealed_in IS NOT NULL;
@@ -0,0 +1,170 @@
+"""
+Archiver: partition maintenance and cold storage for job history.
+
+Each pass:
+  1. creates monthly partitions ahead of time for job_events, audit_log and
+     archived_job_events (ensure_monthly_partitions), moving rows that landed in
+     a DEFAULT partition into the month they belong to
+  2. moves terminal jobs older than ARCHIVE_AFTER_DAYS, with their events, into
+     archived_jobs / archived_job_events (lz4-compressed) in small batches
+  3. drops cold partitions and archived_jobs rows whose retention_until has passed
+  4. drops job_events partitions that archiving has emptied, and detaches
+     audit_log partitions older than AUDIT_RETENTION_DAYS (kept as standalone tables)
+"""
+
+import os
+import asyncio
+import logging
+from datetime import datetime, timezone
+
+import asyncpg
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s"
+)
+logger = logging.getLogger("archiver")
+
+DATABASE_URL = os.getenv("DATABASE_URL")
+INTERVAL_SECONDS = float(os.getenv("ARCHIVER_INTERVAL_SECONDS", "3600"))
+MONTHS_AHEAD = int(os.getenv("ARCHIVER_MONTHS_AHEAD", "3"))
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "30"))
+RETENTION_DAYS = int(os.getenv("ARCHIVE_RETENTION_DAYS", "365"))
+AUDIT_RETENTION_DAYS = int(os.getenv("AUDIT_RETENTION_DAYS", "730"))
+BATCH_SIZE = int(os.getenv("ARCHIVER_BATCH_SIZE", "500"))
+
+PARTITIONED_TABLES = ("job_events", "audit_log", "archived_job_events")
+TERMINAL_STATUSES = ["COMPLETED", "FAILED", "CANCELLED", "DEAD_LETTER"]
+
+
+def partition_month(name: str, parent: str):
+    """job_events_202601 -> first day of that month (UTC), else None."""
+    suffix = name[len(parent) + 1 :]
+    if len(suffix) != 6 or not suffix.isdigit():
+        return None
+    return datetime(int(suffix[:4]), int(suffix[4:]), 1, tzinfo=timezone.utc)
+
+
+def month_end(start: datetime) -> datetime:
+    if start.month == 12:
+        return start.replace(year=start.year + 1, month=1)
+    return start.replace(month=start.month + 1)
+
+
+async def partitions(conn, parent: str):
+    rows = await conn.fetch(
+        """
+        SELECT c.relname FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        JOIN pg_class p ON p.oid = i.inhparent
+        WHERE p.relname = $1
+        ORDER BY c.relname
+    """,
+        parent,
+    )
+    out = []
+    for r in rows:
+        start = partition_month(r["relname"], parent)
+        if start:
+            out.append((r["relname"], start, month_end(start)))
+    return out
+
+
+async def ensure_partitions(conn):
+    for table in PARTITIONED_TABLES:
+        created = await conn.fetchval(
+            "SELECT ensure_monthly_partitions($1, now(), $2)", table, MONTHS_AHEAD
+        )
+        if created:
+            logger.info(f"Created {created} partition(s) for {table}")
+
+
+async def archive_jobs(conn) -> int:
+    total = 0
+    while True:
+        async with conn.transaction():
+            moved = await conn.fetchval(
+                "SELECT archive_terminal_jobs($1, make_interval(days => $2), make_interval(days => $3), $4)",
+                TERMINAL_STATUSES,
+                ARCHIVE_AFTER_DAYS,
+                RETENTION_DAYS,
+                BATCH_SIZE,
+            )
+        total += moved
+        if moved < BATCH_SIZE:
+            return total
+
+
+async def purge_expired(conn, now: datetime):
+    # cold event partitions: every job archived in that month is past retention
+    for name, start, end in await partitions(conn, "archived_job_events"):
+        if end > now:
+            continue
+        still_retained = await conn.fetchval(
+            """
+            SELECT EXISTS(SELECT 1 FROM archived_jobs
+                          WHERE archived_at >= $1 AND archived_at < $2 AND retention_until >= now())
+        """,
+            start,
+            end,
+        )
+        if not still_retained:
+            async with conn.transaction():
+                await conn.execute(f'ALTER TABLE archived_job_events DETACH PARTITION "{name}"')
+                await conn.execute(f'DROP TABLE "{name}"')
+            logger.info(f"Dropped expired cold partition {name}")
+
+    deleted = await conn.execute("DELETE FROM archived_jobs WHERE retention_until < now()")
+    logger.info(f"Expired archived jobs: {deleted}")
+
+
+async def retire_hot_partitions(conn, now: datetime):
+    current_month = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+    # job_events: once archiving has moved everything out of an old month, drop it
+    for name, start, end in await partitions(conn, "job_events"):
+        if end >= current_month or (now - end).days < ARCHIVE_AFTER_DAYS:
+            continue
+        empty = not await conn.fetchval(f'SELECT EXISTS(SELECT 1 FROM "{name}")')
+        if empty:
+            async with conn.transaction():
+                await conn.execute(f'ALTER TABLE job_events DETACH PARTITION "{name}"')
+                await conn.execute(f'DROP TABLE "{name}"')
+            logger.info(f"Dropped empty job_events partition {name}")
+
+    # audit_log: governance history is never deleted, only detached from the hot table
+    for name, start, end in await partitions(conn, "audit_log"):
+        if (now - end).days < AUDIT_RETENTION_DAYS:
+            continue
+        await conn.execute(f'ALTER TABLE audit_log DETACH PARTITION "{name}"')
+        await conn.execute(f'ALTER TABLE "{name}" RENAME TO "{name}_detached"')
+        logger.info(f"Detached audit_log partition {name}")
+
+
+async def run_once(pool):
+    now = datetime.now(timezone.utc)
+    async with pool.acquire() as conn:
+        await ensure_partitions(conn)
+        moved = await archive_jobs(conn)
+        if moved:
+            logger.info(f"Archived {moved} terminal jobs")
+        await purge_expired(conn, now)
+        await retire_hot_partitions(conn, now)
+
+
+async def main():
+    if not DATABASE_URL:
+        logger.error("DATABASE_URL missing")
+        return
+
+    pool = await asyncpg.create_pool(DATABASE_URL, min_size=1, max_size=2)
+    logger.info("Archiver started")
+    while True:
+        try:
+            await run_once(pool)
+        except Exception as e:
+            logger.error(f"Archiver pass failed: {e}")
+        await asyncio.sleep(INTERVAL_SECONDS)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
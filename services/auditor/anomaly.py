@@ -0,0 +1,250 @@
+"""
+Streaming per-model anomaly detection for the auditor.
+
+Consumes job completion events (job_events 'completed', woken by the
+job_completed NOTIFY channel), failed attempts (the retry engine's
+retry_scheduled / failed / dead_lettered events) and new model_runs from their
+own watermarks.
+Each model keeps a baseline and a recent DDSketch per metric, plus
+success/failure counters. When the recent window fills up, it is compared with
+the baseline and then folded into it. Memory per model is bounded by the
+sketch bin cap, no matter how many jobs the model has run.
+
+State and watermarks are snapshotted to anomaly_sketches together, so a
+restart resumes from the last snapshot without rescanning history.
+"""
+
+import os
+import json
+import asyncio
+import logging
+
+import asyncpg
+
+from services.auditor.sketch import DDSketch
+
+logger = logging.getLogger("auditor.anomaly")
+
+RECENT_WINDOW = int(os.getenv("ANOMALY_RECENT_WINDOW", "50"))
+MIN_BASELINE = int(os.getenv("ANOMALY_MIN_BASELINE", "200"))
+# relative drift of the watched quantile vs. the model's own baseline
+QUANTILE_DEVIATION = float(os.getenv("ANOMALY_QUANTILE_DEVIATION", "0.5"))
+# absolute increase of the failure rate vs. baseline
+FAILURE_DEVIATION = float(os.getenv("ANOMALY_FAILURE_DEVIATION", "0.2"))
+POLL_SECONDS = float(os.getenv("ANOMALY_POLL_SECONDS", "5"))
+SNAPSHOT_SECONDS = float(os.getenv("ANOMALY_SNAPSHOT_SECONDS", "60"))
+BATCH_SIZE = 5000
+
+# metric -> (quantile watched, direction that counts as a regression)
+METRICS = {
+    "latency_s": (0.95, "up"),
+    "cost_usd": (0.95, "up"),
+    "score": (0.05, "down"),
+}
+
+# A failed attempt's model is in its event: requeueing clears jobs.assigned_model
+EVENTS_SQL = """
+    SELECT e.id, COALESCE(e.details->>'model', j.assigned_model) AS model,
+           COALESCE((e.details->>'success')::boolean, FALSE) AS success,
+           EXTRACT(EPOCH FROM e.created_at - c.created_at) AS latency_s
+    FROM job_events e
+    JOIN jobs j ON j.id = e.job_id
+    LEFT JOIN LATERAL (
+        SELECT created_at FROM job_events
+        WHERE job_id = e.job_id AND event_type = 'claimed'
+        ORDER BY id DESC LIMIT 1
+    ) c ON TRUE
+    WHERE e.id > $1
+      AND e.event_type IN ('completed', 'retry_scheduled', 'failed', 'dead_lettered')
+    ORDER BY e.id
+    LIMIT $2
+"""
+
+RUNS_SQL = """
+    SELECT mr.id, m.name AS model, mr.score, mr.estimated_cost
+    FROM model_runs mr
+    JOIN models m ON m.id = mr.model_id
+    WHERE mr.id > $1
+    ORDER BY mr.id
+    LIMIT $2
+"""
+
+
+class ModelStats:
+    def __init__(self):
+        self.baseline = {m: DDSketch() for m in METRICS}
+        self.recent = {m: DDSketch() for m in METRICS}
+        self.outcomes = {"base_ok": 0, "base_fail": 0, "ok": 0, "fail": 0}
+
+    def to_dict(self):
+        return {
+            "baseline": {m: s.to_dict() for m, s in self.baseline.items()},
+            "recent": {m: s.to_dict() for m, s in self.recent.items()},
+            "outcomes": self.outcomes,
+        }
+
+    @classmethod
+    def from_dict(cls, d):
+        st = cls()
+        for m in METRICS:
+            if m in d.get("baseline", {}):
+                st.baseline[m] = DDSketch.from_dict(d["baseline"][m])
+            if m in d.get("recent", {}):
+                st.recent[m] = DDSketch.from_dict(d["recent"][m])
+        st.outcomes.update(d.get("outcomes", {}))
+        return st
+
+
+class AnomalyDetector:
+    def __init__(self, engine):
+        self.engine = engine
+        self.models = {}
+        self.watermarks = {"events": 0, "runs": 0}
+        self.wake = asyncio.Event()
+        self._listener = None
+
+    def stats(self, model) -> ModelStats:
+        if model not in self.models:
+            self.models[model] = ModelStats()
+        return self.models[model]
+
+    async def load(self):
+        async with self.engine.pool.acquire() as conn:
+            rows = await conn.fetch("SELECT model, state FROM anomaly_sketches")
+        for r in rows:
+            state = r["state"]
+            state = json.loads(state) if isinstance(state, str) else state
+            if r["model"] == "__watermarks__":
+                self.watermarks.update(state)
+            else:
+                self.models[r["model"]] = ModelStats.from_dict(state)
+        logger.info(f"Anomaly detector restored {len(self.models)} model sketches")
+
+    async def snapshot(self):
+        records = [(m, json.dumps(st.to_dict())) for m, st in self.models.items()]
+        records.append(("__watermarks__", json.dumps(self.watermarks)))
+        async with self.engine.pool.acquire() as conn:
+            await conn.executemany(
+                """
+                INSERT INTO anomaly_sketches (model, state, updated_at) VALUES ($1, $2::jsonb, now())
+                ON CONFLICT (model) DO UPDATE SET state = EXCLUDED.state, updated_at = now()
+            """,
+                records,
+            )
+
+    async def _listen(self):
+        if self._listener is None or self._listener.is_closed():
+            self._listener = await asyncpg.connect(self.engine.dsn)
+            await self._listener.add_listener("job_completed", lambda *_: self.wake.set())
+
+    async def run_forever(self):
+        await self.load()
+        loop = asyncio.get_running_loop()
+        last_snapshot = loop.time()
+        while True:
+            try:
+                await self._listen()
+                self.wake.clear()
+                await self.consume()
+                if loop.time() - last_snapshot > SNAPSHOT_SECONDS:
+                    await self.snapshot()
+                    last_snapshot = loop.time()
+            except Exception as e:
+                logger.error(f"Anomaly detector error: {e}")
+                if self._listener is not None:
+                    try:
+                        await self._listener.close()
+                    except Exception:
+                        pass
+                self._listener = None
+            try:
+                await asyncio.wait_for(self.wake.wait(), POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+    async def consume(self):
+        touched = set()
+        async with self.engine.pool.acquire() as conn:
+            while True:
+                rows = await conn.fetch(EVENTS_SQL, self.watermarks["events"], BATCH_SIZE)
+                for r in rows:
+                    if not r["model"]:
+                        continue
+                    st = self.stats(r["model"])
+                    st.outcomes["ok" if r["success"] else "fail"] += 1
+                    if r["success"] and r["latency_s"] is not None:
+                        st.recent["latency_s"].add(float(r["latency_s"]))
+                    touched.add(r["model"])
+                if rows:
+                    self.watermarks["events"] = rows[-1]["id"]
+                if len(rows) < BATCH_SIZE:
+                    break
+
+            while True:
+                rows = await conn.fetch(RUNS_SQL, self.watermarks["runs"], BATCH_SIZE)
+                for r in rows:
+                    st = self.stats(r["model"])
+                    if r["score"] is not None:
+                        st.recent["score"].add(float(r["score"]))
+                    if r["estimated_cost"] is not None:
+                        st.recent["cost_usd"].add(float(r["estimated_cost"]))
+                    touched.add(r["model"])
+                if rows:
+                    self.watermarks["runs"] = rows[-1]["id"]
+                if len(rows) < BATCH_SIZE:
+                    break
+
+        for model in touched:
+            for finding in self.evaluate(model):
+                await self.alert(model, *finding)
+
+    def evaluate(self, model):
+        """Compare full recent windows with the baseline, then fold them in."""
+        st = self.models[model]
+        findings = []
+        for metric, (q, direction) in METRICS.items():
+            recent, base = st.recent[metric], st.baseline[metric]
+            if recent.count < RECENT_WINDOW:
+                continue
+            if base.count >= MIN_BASELINE:
+                r_q, b_q = recent.quantile(q), base.quantile(q)
+                if b_q:
+                    drift = (r_q - b_q) / b_q
+                    if (direction == "up" and drift > QUANTILE_DEVIATION) or (
+                        direction == "down" and -drift > QUANTILE_DEVIATION
+                    ):
+                        findings.append(
+                            (
+                                f"anomaly_{metric}",
+                                f"p{int(q * 100)} {metric} {r_q:.3f} vs baseline {b_q:.3f} ({drift:+.0%})",
+                            )
+                        )
+            base.merge(recent)
+            st.recent[metric] = DDSketch(recent.relative_accuracy, recent.max_bins)
+
+        o = st.outcomes
+        recent_total = o["ok"] + o["fail"]
+        if recent_total >= RECENT_WINDOW:
+            base_total = o["base_ok"] + o["base_fail"]
+            if base_total >= MIN_BASELINE:
+                r_rate = o["fail"] / recent_total
+                b_rate = o["base_fail"] / base_total
+                if r_rate - b_rate > FAILURE_DEVIATION:
+                    findings.append(
+                        (
+                            "anomaly_failure_rate",
+                            f"failure rate {r_rate:.0%} vs baseline {b_rate:.0%}",
+                        )
+                    )
+            o["base_ok"] += o["ok"]
+            o["base_fail"] += o["fail"]
+            o["ok"] = o["fail"] = 0
+        return findings
+
+    async def alert(self, model, rule, detail):
+        async with self.engine.pool.acquire() as conn:
+            payload = await self.engine.trigger_alert(
+                conn, rule, model, None, "medium", f"Model {model} drifted: {detail}"
+            )
+        if payload:
+            await self.engine.notify_manager(payload)
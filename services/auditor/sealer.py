@@ -0,0 +1,358 @@
+"""
+Tamper-evident sealing of audit_log and job_events.
+
+A background task takes new rows in id order and in batches. Each row is
+reduced to a canonical leaf string (built in SQL from the JSONB text form) and
+hashed. The batch's Merkle root is then chained to the previous seal:
+
+    seal_hash = sha256(prev_seal_hash || source || first_id || last_id || root)
+
+The full tree is stored with the seal. Proving that one event belongs to a
+batch costs O(log n): a binary search over the leaf ids, then one sibling hash
+per tree level. Verifying the chain is incremental, one hash per seal.
+
+Ids are handed out before commit, so a row can become visible after higher ids
+have been sealed. Every id a batch skips is recorded in audit_seal_gaps along
+with the snapshot xmax at that moment. Rows that later fill a gap are sealed in
+a late batch of their own. A gap nobody filled is forgotten once every
+transaction that was running when it was recorded has ended, i.e. the
+snapshot xmin has passed its xmax.
+
+    python -m services.auditor.sealer verify job_events 1234
+    python -m services.auditor.sealer verify-chain [--from-seal N]
+"""
+
+import os
+import sys
+import struct
+import asyncio
+import hashlib
+import logging
+import argparse
+from bisect import bisect_left
+
+import asyncpg
+
+logger = logging.getLogger("auditor.sealer")
+
+SEAL_BATCH_SIZE = int(os.getenv("SEAL_BATCH_SIZE", "4096"))
+SEAL_INTERVAL_SECONDS = float(os.getenv("SEAL_INTERVAL_SECONDS", "2"))
+SEAL_LOCK_ID = 987654321012345679
+
+_EPOCH_US = "(EXTRACT(EPOCH FROM created_at) * 1000000)::bigint"
+
+# source -> canonical leaf expression
+LEAF_SQL = {
+    "audit_log": f"concat_ws('|', id, actor, action, COALESCE(details::text, 'null'), {_EPOCH_US})",
+    "job_events": (
+        f"concat_ws('|', id, COALESCE(job_id::text, ''), event_type, "
+        f"COALESCE(details::text, 'null'), {_EPOCH_US})"
+    ),
+}
+# where a row may live after the archiver has moved it
+ARCHIVE_TABLES = {"job_events": "archived_job_events"}
+
+HASH_SIZE = 32
+
+# xid8 -> bigint, for comparing snapshot bounds stored in audit_seal_gaps
+_SNAPSHOT_XMIN = "pg_snapshot_xmin(pg_current_snapshot())::text::bigint"
+_SNAPSHOT_XMAX = "pg_snapshot_xmax(pg_current_snapshot())::text::bigint"
+
+
+def leaf_hash(leaf: str) -> bytes:
+    return hashlib.sha256(b"\x00" + leaf.encode()).digest()
+
+
+def node_hash(left: bytes, right: bytes) -> bytes:
+    return hashlib.sha256(b"\x01" + left + right).digest()
+
+
+def level_sizes(n: int):
+    sizes = [n]
+    while sizes[-1] > 1:
+        sizes.append((sizes[-1] + 1) // 2)
+    return sizes
+
+
+def build_tree(leaves):
+    """Return all levels, leaves first. An odd last node is promoted unchanged."""
+    levels = [leaves]
+    while len(levels[-1]) > 1:
+        prev = levels[-1]
+        nxt = [node_hash(prev[i], prev[i + 1]) for i in range(0, len(prev) - 1, 2)]
+        if len(prev) % 2:
+            nxt.append(prev[-1])
+        levels.append(nxt)
+    return levels
+
+
+def seal_digest(prev: bytes, source: str, first_id: int, last_id: int, root: bytes) -> bytes:
+    return hashlib.sha256(
+        (prev or b"") + source.encode() + struct.pack(">qq", first_id, last_id) + root
+    ).digest()
+
+
+def inclusion_proof(tree: bytes, leaf_count: int, index: int):
+    """Sibling path for leaf `index`: list of (sibling_is_left, hash)."""
+    proof = []
+    offset = 0
+    for size in level_sizes(leaf_count)[:-1]:
+        sib = index ^ 1
+        if sib < size:
+            start = (offset + sib) * HASH_SIZE
+            proof.append((sib < index, tree[start : start + HASH_SIZE]))
+        offset += size
+        index //= 2
+    return proof
+
+
+def root_from_proof(leaf: bytes, proof) -> bytes:
+    h = leaf
+    for is_left, sib in proof:
+        h = node_hash(sib, h) if is_left else node_hash(h, sib)
+    return h
+
+
+def skipped_ids(after: int, ids):
+    """Ids between `after` and the last of the ascending `ids` that are not in it."""
+    gaps = []
+    prev = after
+    for i in ids:
+        gaps.extend(range(prev + 1, i))
+        prev = i
+    return gaps
+
+
+async def insert_seal(conn, source: str, rows, prev):
+    """Seal rows (ascending id) onto the chain after `prev`. Returns (seal id, seal hash)."""
+    levels = build_tree([leaf_hash(r["leaf"]) for r in rows])
+    root = levels[-1][0]
+    first, final = rows[0]["id"], rows[-1]["id"]
+    digest = seal_digest(prev, source, first, final, root)
+    seal_id = await conn.fetchval(
+        """
+        INSERT INTO audit_seals
+          (source, first_id, last_id, leaf_count, leaf_ids, tree, merkle_root, prev_seal_hash, seal_hash)
+        VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9)
+        RETURNING id
+    """,
+        source,
+        first,
+        final,
+        len(rows),
+        struct.pack(f">{len(rows)}q", *(r["id"] for r in rows)),
+        b"".join(h for level in levels for h in level),
+        root,
+        prev,
+        digest,
+    )
+    return seal_id, digest
+
+
+async def seal_source(conn, source: str, batch_size: int = SEAL_BATCH_SIZE) -> int:
+    """Seal the next batch of a source, and any late rows. Returns the number of rows sealed."""
+    async with conn.transaction():
+        if not await conn.fetchval("SELECT pg_try_advisory_xact_lock($1)", SEAL_LOCK_ID):
+            return 0
+        last = await conn.fetchrow(
+            "SELECT seal_hash FROM audit_seals ORDER BY id DESC LIMIT 1"
+        )
+        prev = last["seal_hash"] if last else None
+        last_id = await conn.fetchval(
+            "SELECT MAX(last_id) FROM audit_seals WHERE source = $1", source
+        )
+
+        # rows that committed after their id range was sealed
+        late = await conn.fetch(
+            f"""
+            SELECT id, {LEAF_SQL[source]} AS leaf FROM {source}
+            WHERE id IN (SELECT id FROM audit_seal_gaps WHERE source = $1 AND sealed_in IS NULL)
+            ORDER BY id
+            LIMIT $2
+        """,
+            source,
+            batch_size,
+        )
+        if late:
+            seal_id, prev = await insert_seal(conn, source, late, prev)
+            await conn.execute(
+                "UPDATE audit_seal_gaps SET sealed_in = $3 WHERE source = $1 AND id = ANY($2::bigint[])",
+                source,
+                [r["id"] for r in late],
+                seal_id,
+            )
+            logger.info(f"Sealed {len(late)} late {source} rows in seal {seal_id}")
+        # the row is checked in the same statement, so one committing meanwhile keeps its gap
+        await conn.execute(
+            f"""
+            DELETE FROM audit_seal_gaps g
+            WHERE g.source = $1 AND g.sealed_in IS NULL AND g.xmax <= {_SNAPSHOT_XMIN}
+              AND NOT EXISTS (SELECT 1 FROM {source} s WHERE s.id = g.id)
+        """,
+            source,
+        )
+
+        rows = await conn.fetch(
+            f"""
+            SELECT id, {LEAF_SQL[source]} AS leaf FROM {source}
+            WHERE id > $1
+            ORDER BY id
+            LIMIT $2
+        """,
+            last_id or 0,
+            batch_size,
+        )
+        if rows:
+            # before the first seal there is no range to fill in
+            after = last_id if last_id is not None else rows[0]["id"] - 1
+            gaps = skipped_ids(after, [r["id"] for r in rows])
+            if gaps:
+                # taken after the batch was read: every transaction that could hold a gap id is below it
+                await conn.execute(
+                    f"""
+                    INSERT INTO audit_seal_gaps (source, id, xmax)
+                    SELECT $1, g, {_SNAPSHOT_XMAX} FROM unnest($2::bigint[]) g
+                    ON CONFLICT DO NOTHING
+                """,
+                    source,
+                    gaps,
+                )
+            await insert_seal(conn, source, rows, prev)
+        return len(late) + len(rows)
+
+
+async def fetch_leaf(conn, source: str, row_id: int):
+    for table in (source, ARCHIVE_TABLES.get(source)):
+        if not table:
+            continue
+        leaf = await conn.fetchval(
+            f"SELECT {LEAF_SQL[source]} FROM {table} WHERE id = $1 LIMIT 1", row_id
+        )
+        if leaf is not None:
+            return leaf
+    return None
+
+
+async def verify_event(conn, source: str, row_id: int) -> dict:
+    """O(log n) inclusion check of one row against its seal and the chain link."""
+    # a late row was sealed out of id order; its gap record points at the seal
+    seal = await conn.fetchrow(
+        """
+        SELECT s.* FROM audit_seal_gaps g JOIN audit_seals s ON s.id = g.sealed_in
+        WHERE g.source = $1 AND g.id = $2
+    """,
+        source,
+        row_id,
+    )
+    if seal is None:
+        # late seals span other seals' id ranges, so they are skipped here
+        seal = await conn.fetchrow(
+            """
+            SELECT * FROM audit_seals s
+            WHERE s.source = $1 AND s.last_id >= $2
+              AND NOT EXISTS (SELECT 1 FROM audit_seal_gaps g WHERE g.sealed_in = s.id)
+            ORDER BY s.last_id LIMIT 1
+        """,
+            source,
+            row_id,
+        )
+    if not seal or seal["first_id"] > row_id:
+        return {"ok": False, "reason": "not sealed"}
+
+    ids = struct.unpack(f">{seal['leaf_count']}q", seal["leaf_ids"])
+    index = bisect_left(ids, row_id)
+    if index >= len(ids) or ids[index] != row_id:
+        return {"ok": False, "reason": "not sealed", "seal_id": seal["id"]}
+
+    leaf = await fetch_leaf(conn, source, row_id)
+    if leaf is None:
+        return {"ok": False, "reason": "row missing", "seal_id": seal["id"]}
+
+    proof = inclusion_proof(seal["tree"], seal["leaf_count"], index)
+    if root_from_proof(leaf_hash(leaf), proof) != bytes(seal["merkle_root"]):
+        return {"ok": False, "reason": "row modified", "seal_id": seal["id"]}
+
+    expected = seal_digest(
+        seal["prev_seal_hash"], source, seal["first_id"], seal["last_id"], seal["merkle_root"]
+    )
+    if expected != bytes(seal["seal_hash"]):
+        return {"ok": False, "reason": "seal modified", "seal_id": seal["id"]}
+
+    prev_hash = await conn.fetchval(
+        "SELECT seal_hash FROM audit_seals WHERE id < $1 ORDER BY id DESC LIMIT 1", seal["id"]
+    )
+    if (prev_hash or None) != (seal["prev_seal_hash"] or None):
+        return {"ok": False, "reason": "chain broken", "seal_id": seal["id"]}
+
+    return {"ok": True, "seal_id": seal["id"], "proof_length": len(proof)}
+
+
+async def verify_chain(conn, from_seal: int = 0) -> dict:
+    """Walk seals after from_seal checking links and digests (not row contents)."""
+    prev = None
+    if from_seal:
+        prev = await conn.fetchval("SELECT seal_hash FROM audit_seals WHERE id = $1", from_seal)
+    checked = 0
+    last = from_seal
+    async with conn.transaction():
+        async for s in conn.cursor(
+            """
+            SELECT id, source, first_id, last_id, merkle_root, prev_seal_hash, seal_hash
+            FROM audit_seals WHERE id > $1 ORDER BY id
+        """,
+            from_seal,
+        ):
+            if (s["prev_seal_hash"] or None) != (prev or None):
+                return {"ok": False, "seal_id": s["id"], "reason": "chain broken", "checked": checked}
+            digest = seal_digest(
+                s["prev_seal_hash"], s["source"], s["first_id"], s["last_id"], s["merkle_root"]
+            )
+            if digest != bytes(s["seal_hash"]):
+                return {"ok": False, "seal_id": s["id"], "reason": "seal modified", "checked": checked}
+            prev = s["seal_hash"]
+            last = s["id"]
+            checked += 1
+    return {"ok": True, "checked": checked, "last_seal_id": last}
+
+
+class Sealer:
+    def __init__(self, engine, sources=("audit_log", "job_events")):
+        self.engine = engine
+        self.sources = sources
+
+    async def run_forever(self):
+        while True:
+            try:
+                async with self.engine.pool.acquire() as conn:
+                    for source in self.sources:
+                        while await seal_source(conn, source) >= SEAL_BATCH_SIZE:
+                            pass
+            except Exception as e:
+                logger.error(f"Sealer error: {e}")
+            await asyncio.sleep(SEAL_INTERVAL_SECONDS)
+
+
+async def main(argv=None):
+    parser = argparse.ArgumentParser(description="Verify audit seals")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    ev = sub.add_parser("verify")
+    ev.add_argument("source", choices=sorted(LEAF_SQL))
+    ev.add_argument("row_id", type=int)
+    ch = sub.add_parser("verify-chain")
+    ch.add_argument("--from-seal", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    conn = await asyncpg.connect(os.getenv("DATABASE_URL"))
+    try:
+        if args.cmd == "verify":
+            result = await verify_event(conn, args.source, args.row_id)
+        else:
+            result = await verify_chain(conn, args.from_seal)
+    finally:
+        await conn.close()
+    print(result)
+    return 0 if result["ok"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,97 @@
+"""
+DDSketch: a mergeable quantile sketch with relative-error guarantees.
+
+Values are mapped to logarithmic buckets of ratio gamma = (1 + a) / (1 - a), so
+any quantile is returned within relative accuracy `a`. The number of buckets is
+capped at max_bins by collapsing the lowest ones, which keeps memory constant
+per sketch and only affects accuracy in the far lower tail.
+"""
+
+import math
+
+MIN_VALUE = 1e-9
+
+
+class DDSketch:
+    def __init__(self, relative_accuracy: float = 0.01, max_bins: int = 512):
+        self.relative_accuracy = relative_accuracy
+        self.max_bins = max_bins
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.bins = {}
+        self.zero_count = 0
+        self.count = 0
+        self.sum = 0.0
+
+    def _key(self, value: float) -> int:
+        return math.ceil(math.log(value) / self._log_gamma)
+
+    def _value(self, key: int) -> float:
+        return 2 * self.gamma**key / (self.gamma + 1)
+
+    def add(self, value: float, weight: int = 1):
+        if value is None:
+            return
+        value = float(value)
+        if value <= MIN_VALUE:
+            self.zero_count += weight
+        else:
+            k = self._key(value)
+            self.bins[k] = self.bins.get(k, 0) + weight
+            if len(self.bins) > self.max_bins:
+                self._collapse()
+        self.count += weight
+        self.sum += value * weight
+
+    def _collapse(self):
+        keys = sorted(self.bins)
+        excess = len(keys) - self.max_bins
+        folded = sum(self.bins.pop(k) for k in keys[: excess + 1])
+        self.bins[keys[excess]] = folded
+
+    def merge(self, other: "DDSketch"):
+        if other.gamma != self.gamma:
+            raise ValueError("cannot merge sketches with different accuracy")
+        for k, c in other.bins.items():
+            self.bins[k] = self.bins.get(k, 0) + c
+        while len(self.bins) > self.max_bins:
+            self._collapse()
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.sum += other.sum
+
+    def quantile(self, q: float):
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+        for k in sorted(self.bins):
+            seen += self.bins[k]
+            if rank < seen:
+                return self._value(k)
+        return self._value(max(self.bins))
+
+    @property
+    def mean(self):
+        return self.sum / self.count if self.count else None
+
+    def to_dict(self) -> dict:
+        return {
+            "a": self.relative_accuracy,
+            "max_bins": self.max_bins,
+            "bins": {str(k): c for k, c in self.bins.items()},
+            "zero": self.zero_count,
+            "count": self.count,
+            "sum": self.sum,
+        }
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "DDSketch":
+        s = cls(d.get("a", 0.01), d.get("max_bins", 512))
+        s.bins = {int(k): c for k, c in d.get("bins", {}).items()}
+        s.zero_count = d.get("zero", 0)
+        s.count = d.get("count", 0)
+        s.sum = d.get("sum", 0.0)
+        return s
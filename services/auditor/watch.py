@@ -1,10 +1,14 @@
 import os
-import time
+import json
 import requests
 import asyncpg
 import asyncio
 import logging
-from datetime import datetime, timezone
+import time
+from collections import deque
+
+from services.auditor.anomaly import AnomalyDetector
+from services.auditor.sealer import Sealer
 
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s"
@@ -13,87 +17,194 @@ logger = logging.getLogger("auditor")
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 MANAGER_URL = os.getenv("MANAGER_URL", "http://manager:8000")
+SCAN_INTERVAL_SECONDS = float(os.getenv("AUDITOR_SCAN_INTERVAL_SECONDS", "30"))
+ALERT_COOLDOWN_SECONDS = float(os.getenv("AUDITOR_ALERT_COOLDOWN_SECONDS", "3600"))
+COST_SPIKE_USD = float(os.getenv("AUDITOR_COST_SPIKE_USD", "1.00"))
+# runs are re-scanned this long after they were first passed: a lower id can commit late
+COST_SPIKE_RESCAN_SECONDS = float(os.getenv("AUDITOR_COST_SPIKE_RESCAN_SECONDS", "300"))
 
 
-async def scan_stalled_jobs(pool, conn):
-    # Rule: In progress > 5 mins
-    rows = await conn.fetch(
-        """
-        SELECT id, created_at FROM jobs 
-        WHERE status = 'IN_PROGRESS' 
-        AND created_at < NOW() - INTERVAL '5 minutes'
+class AuditorEngine:
+    """
+    Long-lived watchdog. Holds one pool for its lifetime; append-only sources are
+    scanned from a per-rule high-water mark (auditor_watermarks) and every alert
+    goes through alert_state, keyed by (rule, subject), for dedup and cooldown.
     """
-    )
-    for r in rows:
-        job_id = str(r["id"])
-        msg = f"Job {job_id} stalled since {r['created_at']}"
-        await trigger_alert(conn, job_id, "high", "stalled_job", msg)
 
+    def __init__(self, dsn: str, interval: float = SCAN_INTERVAL_SECONDS):
+        self.dsn = dsn
+        self.interval = interval
+        self.pool = None
+        # (monotonic time, highest model_runs id scanned) per cost spike pass, oldest first
+        self._cost_marks = deque()
+        self.rules = [
+            self.scan_stalled_jobs,
+            self.scan_cost_spikes,
+            self.scan_high_failure_rate,
+        ]
+
+    async def start(self):
+        self.pool = await asyncpg.create_pool(self.dsn, min_size=1, max_size=4)
+
+    async def close(self):
+        if self.pool:
+            await self.pool.close()
+            self.pool = None
+
+    async def run_forever(self):
+        while True:
+            await self.scan_once()
+            await asyncio.sleep(self.interval)
+
+    async def scan_once(self):
+        for rule in self.rules:
+            try:
+                async with self.pool.acquire() as conn:
+                    alerts = await rule(conn)
+                for payload in alerts:
+                    await self.notify_manager(payload)
+            except Exception as e:
+                logger.error(f"Watchdog scan error in {rule.__name__}: {e}")
+
+    # --- state helpers ---
+
+    async def get_watermark(self, conn, rule: str) -> int:
+        return await conn.fetchval(
+            "SELECT last_id FROM auditor_watermarks WHERE rule = $1", rule
+        ) or 0
+
+    async def set_watermark(self, conn, rule: str, last_id: int):
+        await conn.execute(
+            """
+            INSERT INTO auditor_watermarks (rule, last_id, updated_at) VALUES ($1, $2, now())
+            ON CONFLICT (rule) DO UPDATE SET last_id = EXCLUDED.last_id, updated_at = now()
+        """,
+            rule,
+            last_id,
+        )
 
-async def scan_cost_spikes(pool, conn):
-    # Rule: Single job cost > $1.00
-    rows = await conn.fetch(
+    async def trigger_alert(self, conn, rule, subject, job_id, severity, message):
+        """
+        Record an alert unless (rule, subject) already fired within the cooldown.
+        Returns the payload to forward to the Manager, or None when suppressed.
         """
-        SELECT job_id, estimated_cost FROM model_runs
-        WHERE estimated_cost > 1.00
-        AND created_at > NOW() - INTERVAL '1 hour'
-        AND job_id NOT IN (
-            SELECT (details->>'job_id')::uuid FROM audit_log 
-            WHERE action='alert' AND details->>'reason'='cost_spike'
+        fired = await conn.fetchval(
+            """
+            INSERT INTO alert_state (rule, subject) VALUES ($1, $2)
+            ON CONFLICT (rule, subject) DO UPDATE
+              SET last_alert_at = now(), alert_count = alert_state.alert_count + 1
+              WHERE alert_state.last_alert_at < now() - make_interval(secs => $3)
+            RETURNING alert_count
+        """,
+            rule,
+            subject,
+            ALERT_COOLDOWN_SECONDS,
         )
-    """
-    )
-    for r in rows:
-        job_id = str(r["job_id"]) if r["job_id"] else None
-        msg = f"High cost detected: ${r['estimated_cost']}"
-        await trigger_alert(conn, job_id, "medium", "cost_spike", msg)
+        if fired is None:
+            return None
+
+        payload = {
+            "job_id": job_id,
+            "severity": severity,
+            "reason": rule,
+            "message": message,
+        }
+        await conn.execute(
+            "INSERT INTO audit_log (actor, action, details) VALUES ($1,$2,$3::jsonb)",
+            "auditor",
+            "alert",
+            json.dumps(payload),
+        )
+        return payload
 
+    async def notify_manager(self, payload):
+        try:
+            await asyncio.to_thread(
+                requests.post, f"{MANAGER_URL}/alerts", json=payload, timeout=2
+            )
+            logger.info(f"Alert sent: {payload['reason']} - {payload['message']}")
+        except Exception as e:
+            logger.error(f"Failed to send alert: {e}")
+
+    # --- rules: each returns the alerts it fired ---
 
-async def scan_high_failure_rate(pool, conn):
-    # Rule: > 3 failures for a model in last hour
-    rows = await conn.fetch(
+    async def scan_stalled_jobs(self, conn):
+        # Rule: In progress > 5 mins (partial index on IN_PROGRESS jobs)
+        rows = await conn.fetch(
+            """
+            SELECT id, created_at FROM jobs
+            WHERE status = 'IN_PROGRESS'
+            AND created_at < NOW() - INTERVAL '5 minutes'
         """
-        SELECT assigned_model, COUNT(*) as failures
-        FROM jobs
-        WHERE status = 'FAILED'
-        AND completed_at > NOW() - INTERVAL '1 hour'
-        GROUP BY assigned_model
-        HAVING COUNT(*) > 3
-    """
-    )
-    for r in rows:
-        model = r["assigned_model"]
-        msg = f"Model {model} failed {r['failures']} jobs in last hour"
-        # Alert without job_id (system level)
-        await trigger_alert(conn, None, "high", "high_failure_rate", msg)
-
-
-async def trigger_alert(conn, job_id, severity, reason, message):
-    # Check if recently alerted to avoid spam
-    # (Simple check: looked at audit_log in scan query or do dedup here)
-    # For MVP, just send.
-
-    payload = {
-        "job_id": job_id,
-        "severity": severity,
-        "reason": reason,
-        "message": message,
-    }
-
-    # 1. Log to DB
-    await conn.execute(
-        "INSERT INTO audit_log (actor, action, details) VALUES ($1,$2,$3)",
-        "auditor",
-        "alert",
-        str(payload),
-    )
-
-    # 2. Notify Manager
-    try:
-        requests.post(f"{MANAGER_URL}/alerts", json=payload, timeout=2)
-        logger.info(f"Alert sent: {reason} - {message}")
-    except Exception as e:
-        logger.error(f"Failed to send alert: {e}")
+        )
+        alerts = []
+        for r in rows:
+            job_id = str(r["id"])
+            msg = f"Job {job_id} stalled since {r['created_at']}"
+            alerts.append(
+                await self.trigger_alert(conn, "stalled_job", job_id, job_id, "high", msg)
+            )
+        return [a for a in alerts if a]
+
+    async def scan_cost_spikes(self, conn):
+        # Rule: Single job cost > $1.00, over runs added since the last pass plus a
+        # re-scan window; alert_state dedups runs that are seen twice
+        alerts = []
+        async with conn.transaction():
+            since = await self.get_watermark(conn, "cost_spike")
+            if self._cost_marks:
+                since = min(since, self._cost_marks[0][1])
+            high = await conn.fetchval("SELECT MAX(id) FROM model_runs") or 0
+            rows = await conn.fetch(
+                """
+                SELECT id, job_id, estimated_cost FROM model_runs
+                WHERE id > $1 AND id <= $2 AND estimated_cost > $3
+            """,
+                since,
+                high,
+                COST_SPIKE_USD,
+            )
+            for r in rows:
+                job_id = str(r["job_id"]) if r["job_id"] else None
+                msg = f"High cost detected: ${r['estimated_cost']}"
+                alerts.append(
+                    await self.trigger_alert(
+                        conn, "cost_spike", job_id or f"run:{r['id']}", job_id, "medium", msg
+                    )
+                )
+            # persist only a mark old enough that nothing below it can still commit
+            now = time.monotonic()
+            self._cost_marks.append((now, high))
+            settled = None
+            while self._cost_marks and self._cost_marks[0][0] <= now - COST_SPIKE_RESCAN_SECONDS:
+                settled = self._cost_marks.popleft()[1]
+            if settled is not None and settled > since:
+                await self.set_watermark(conn, "cost_spike", settled)
+        return [a for a in alerts if a]
+
+    async def scan_high_failure_rate(self, conn):
+        # Rule: > 3 failures for a model in last hour
+        rows = await conn.fetch(
+            """
+            SELECT assigned_model, COUNT(*) as failures
+            FROM jobs
+            WHERE status = 'FAILED'
+            AND completed_at > NOW() - INTERVAL '1 hour'
+            GROUP BY assigned_model
+            HAVING COUNT(*) > 3
+        """
+        )
+        alerts = []
+        for r in rows:
+            model = r["assigned_model"]
+            msg = f"Model {model} failed {r['failures']} jobs in last hour"
+            # Alert without job_id (system level)
+            alerts.append(
+                await self.trigger_alert(
+                    conn, "high_failure_rate", str(model), None, "high", msg
+                )
+            )
+        return [a for a in alerts if a]
 
 
 async def main():
@@ -103,18 +214,23 @@ async def main():
 
     logger.info("Auditor Watchdog Service Started")
 
+    engine = AuditorEngine(DATABASE_URL)
     while True:
         try:
-            pool = await asyncpg.create_pool(DATABASE_URL)
-            async with pool.acquire() as conn:
-                await scan_stalled_jobs(pool, conn)
-                await scan_cost_spikes(pool, conn)
-                await scan_high_failure_rate(pool, conn)
-            await pool.close()
+            await engine.start()
+            break
         except Exception as e:
-            logger.error(f"Watchdog scan error: {e}")
+            logger.error(f"Auditor DB connection failed: {e}")
+            await asyncio.sleep(5)
 
-        await asyncio.sleep(30)  # Scan every 30s
+    detector = AnomalyDetector(engine)
+    sealer = Sealer(engine)
+    try:
+        await asyncio.gather(
+            engine.run_forever(), detector.run_forever(), sealer.run_forever()
+        )
+    finally:
+        await engine.close()
 
 
 if __name__ == "__main__":
@@ -52,6 +52,7 @@ class CLIAdapter(BaseAdapter):
                 "confidence": 0.0,
                 "raw": {},
                 "error": "timeout",
+                "error_type": "TimeoutExpired",
             }
         except Exception as e:
             return {
@@ -60,4 +61,5 @@ class CLIAdapter(BaseAdapter):
                 "confidence": 0.0,
                 "raw": {},
                 "error": str(e),
+                "error_type": type(e).__name__,
             }
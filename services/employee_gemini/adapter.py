@@ -8,13 +8,18 @@ except ImportError:
         pass
 
 
+from services.employees.common.governor import Governor, RateLimited, estimate_tokens
+
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "")
+# generate_content has no output cap by default; assume this many for the estimate
+EXPECTED_OUTPUT_TOKENS = int(os.getenv("GEMINI_EXPECTED_OUTPUT_TOKENS", "1200"))
 
 
 class GeminiAdapter(BaseAdapter):
     def __init__(self, model_name="gemini-1.5-pro"):
         self.model = model_name
         self.genai = None
+        self.governor = Governor("gemini")
 
         if GEMINI_API_KEY:
             try:
@@ -33,6 +38,7 @@ class GeminiAdapter(BaseAdapter):
                 "confidence": 0.0,
                 "raw": {},
                 "error": "GEMINI_API_KEY not set or google-generativeai not installed",
+                "error_type": "NotConfigured",
             }
 
         try:
@@ -46,7 +52,20 @@ class GeminiAdapter(BaseAdapter):
                 },
             )
 
-            response = model.generate_content(prompt)
+            def send():
+                try:
+                    response = model.generate_content(prompt)
+                except Exception as e:
+                    # google.api_core ResourceExhausted is the SDK's 429; it carries no headers
+                    if getattr(e, "code", None) == 429 or type(e).__name__ == "ResourceExhausted":
+                        raise RateLimited({}, str(e)) from e
+                    raise
+                usage = getattr(response, "usage_metadata", None)
+                return response, {}, getattr(usage, "total_token_count", None)
+
+            response = self.governor.call(
+                estimate_tokens(prompt, EXPECTED_OUTPUT_TOKENS), send
+            )
 
             # Gemini doesn't always provide token counts
             tokens = {
@@ -81,4 +100,7 @@ class GeminiAdapter(BaseAdapter):
                 "confidence": 0.0,
                 "raw": {},
                 "error": str(e),
+                "error_type": type(e).__name__,
+                # google.api_core errors carry the HTTP status as .code
+                "status_code": e.code if isinstance(getattr(e, "code", None), int) else None,
             }
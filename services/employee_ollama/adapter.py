@@ -31,13 +31,16 @@ class OllamaAdapter(BaseAdapter):
 
             resp = requests.post(f"{host}/api/generate", json=payload, timeout=120)
             if resp.status_code == 200:
-                out = resp.json().get("response", "")
+                response = {"output": resp.json().get("response", "")}
             else:
-                out = f"Error: {resp.status_code} {resp.text}"
-
-            response = {"output": out}
+                response = {
+                    "output": "",
+                    "error": f"Error: {resp.status_code} {resp.text}",
+                    "error_type": "HTTPError",
+                    "status_code": resp.status_code,
+                }
         except Exception as e:
-            response = {"output": "", "error": str(e)}
+            response = {"output": "", "error": str(e), "error_type": type(e).__name__}
 
         return {
             "output": response.get("output", ""),
@@ -45,4 +48,6 @@ class OllamaAdapter(BaseAdapter):
             "explanation": "Ollama adapter output",
             "self_confidence": 0.8,
             "artifacts": {},
+            # set when the call failed; the worker reports the job as failed
+            **{k: v for k, v in response.items() if k != "output"},
         }
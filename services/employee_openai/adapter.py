@@ -8,8 +8,10 @@ except ImportError:
         pass
 
 
+from services.employees.common.governor import Governor, RateLimited, estimate_tokens
+
 # Modern OpenAI SDK (v1.0+)
-from openai import OpenAI
+from openai import OpenAI, RateLimitError
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
 
@@ -18,8 +20,10 @@ class OpenAIAdapter(BaseAdapter):
     def __init__(self, model="gpt-4o-mini"):
         self.model = model
         self.client = None
+        self.governor = Governor("openai")
         if OPENAI_API_KEY:
-            self.client = OpenAI(api_key=OPENAI_API_KEY)
+            # retries of 429s go through the governor so all replicas back off together
+            self.client = OpenAI(api_key=OPENAI_API_KEY, max_retries=0)
 
     def generate(self, prompt: str, context: dict) -> dict:
         if not self.client:
@@ -33,17 +37,27 @@ class OpenAIAdapter(BaseAdapter):
                 "confidence": 0.0,
                 "raw": {},
                 "error": "OPENAI_API_KEY not set",
+                "error_type": "NotConfigured",
             }
 
         try:
             model = context.get("model", self.model)
+            max_tokens = context.get("max_tokens", 1200)
+
+            def send():
+                try:
+                    raw = self.client.chat.completions.with_raw_response.create(
+                        model=model,
+                        messages=[{"role": "user", "content": prompt}],
+                        max_tokens=max_tokens,
+                        temperature=context.get("temperature", 0.7),
+                    )
+                except RateLimitError as e:
+                    raise RateLimited(e.response.headers, str(e)) from e
+                parsed = raw.parse()
+                return parsed, raw.headers, parsed.usage.total_tokens
 
-            response = self.client.chat.completions.create(
-                model=model,
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=context.get("max_tokens", 1200),
-                temperature=context.get("temperature", 0.7),
-            )
+            response = self.governor.call(estimate_tokens(prompt, max_tokens), send)
 
             content = response.choices[0].message.content
             usage = response.usage
@@ -69,4 +83,6 @@ class OpenAIAdapter(BaseAdapter):
                 "confidence": 0.0,
                 "raw": {},
                 "error": str(e),
+                "error_type": type(e).__name__,
+                "status_code": getattr(e, "status_code", None),
             }
@@ -0,0 +1,108 @@
+"""
+Client side of the Manager's shared rate-limit governor.
+
+Every replica of a backend asks the Manager for a slot before calling the
+provider, waits (instead of failing) when the shared buckets are empty, and
+reports the provider's response so the buckets follow the real limits:
+rate-limit headers, 429s with Retry-After, and actual token usage.
+"""
+
+import os
+import sys
+import time
+import requests
+
+MANAGER_URL = os.getenv("MANAGER_URL", "http://manager:8000")
+# Retries of a provider 429 before the call is given up
+MAX_RETRIES = int(os.getenv("GOVERNOR_MAX_RETRIES", "5"))
+# Longest a single call queues for a slot
+MAX_WAIT_SECONDS = float(os.getenv("GOVERNOR_MAX_WAIT_SECONDS", "900"))
+# ~4 characters per token for English text and code
+CHARS_PER_TOKEN = 4
+
+
+class RateLimited(Exception):
+    """Raised by a provider call that was rejected with a 429."""
+
+    def __init__(self, headers=None, message="rate limited"):
+        super().__init__(message)
+        self.headers = dict(headers or {})
+
+
+def estimate_tokens(prompt: str, max_output_tokens: int = 0) -> int:
+    return len(prompt) // CHARS_PER_TOKEN + 1 + int(max_output_tokens or 0)
+
+
+def _retry_after(headers, default: float) -> float:
+    for k, v in headers.items():
+        if k.lower() == "retry-after":
+            try:
+                return float(v)
+            except ValueError:
+                break
+    return default
+
+
+class Governor:
+    def __init__(self, backend: str, manager_url: str = MANAGER_URL):
+        self.backend = backend
+        self.url = f"{manager_url}/ratelimit/{backend}"
+        self.session = requests.Session()
+        self.degraded = False
+
+    def acquire(self, tokens: int):
+        """Block until the shared buckets grant one request of ~`tokens`."""
+        deadline = time.monotonic() + MAX_WAIT_SECONDS
+        while True:
+            try:
+                r = self.session.post(f"{self.url}/acquire", json={"tokens": tokens}, timeout=5)
+                r.raise_for_status()
+                grant = r.json()
+            except Exception as e:
+                # the governor is an optimisation; don't stop work when the Manager can't answer
+                print(f"Governor unavailable, sending unthrottled: {e}", file=sys.stderr)
+                self.degraded = True
+                return
+            self.degraded = False
+            if grant["granted"]:
+                return
+            wait = grant["wait_seconds"]
+            if time.monotonic() + wait > deadline:
+                raise RateLimited(message=f"{self.backend}: no rate-limit slot within {MAX_WAIT_SECONDS:.0f}s")
+            time.sleep(min(wait, 30))
+
+    def observe(self, status: int, headers=None, estimated_tokens: int = 0, used_tokens=None):
+        try:
+            self.session.post(
+                f"{self.url}/observe",
+                json={
+                    "status": status,
+                    "headers": dict(headers or {}),
+                    "estimated_tokens": estimated_tokens,
+                    "used_tokens": used_tokens,
+                },
+                timeout=5,
+            )
+        except Exception as e:
+            print(f"Governor observe failed: {e}", file=sys.stderr)
+
+    def call(self, estimated_tokens: int, send):
+        """
+        Run `send()` under the governor. `send` returns (result, headers, used_tokens)
+        and raises RateLimited on a 429; those are retried after the pause the
+        Manager derives from Retry-After.
+        """
+        for attempt in range(MAX_RETRIES + 1):
+            self.acquire(estimated_tokens)
+            try:
+                result, headers, used = send()
+            except RateLimited as e:
+                self.observe(429, e.headers, estimated_tokens, 0)
+                if attempt == MAX_RETRIES:
+                    raise
+                if self.degraded:
+                    # nobody is pacing us; honour Retry-After locally
+                    time.sleep(_retry_after(e.headers, 2 ** attempt))
+                continue
+            self.observe(200, headers, estimated_tokens, used)
+            return result
@@ -7,19 +7,26 @@ DATABASE_URL = os.getenv("DATABASE_URL")
 WINDOW_DAYS = int(os.getenv("HR_WINDOW_DAYS", "30"))
 PROMOTE_THRESHOLD = float(os.getenv("PROMOTE_THRESHOLD", "0.85"))
 DEMOTE_THRESHOLD = float(os.getenv("DEMOTE_THRESHOLD", "0.50"))
+# Rollups make an evaluation a few hundred bucket rows per model, so this can be short
+EVAL_INTERVAL_SECONDS = float(os.getenv("HR_INTERVAL_SECONDS", "60"))
 
 
 async def evaluate(pool):
     async with pool.acquire() as conn:
+        # model_scores holds hourly buckets maintained by a trigger on model_runs
         rows = await conn.fetch(
             """
-            SELECT m.id as model_id, AVG(mr.score) as avg_score, COUNT(*) as count
-            FROM model_runs mr
-            JOIN models m ON m.id = mr.model_id
-            WHERE mr.created_at >= now() - interval '$1 days'
-            GROUP BY m.id
+            SELECT ms.model_id,
+                   SUM(ms.score_sum) / NULLIF(SUM(ms.tasks_completed), 0) AS avg_score,
+                   SUM(ms.tasks_completed) AS count,
+                   (SELECT p.action FROM promotions p
+                    WHERE p.model_id = ms.model_id
+                    ORDER BY p.performed_at DESC LIMIT 1) AS last_action
+            FROM model_scores ms
+            WHERE ms.window_start >= date_trunc('hour', now() - make_interval(days => $1))
+            GROUP BY ms.model_id
         """,
-            float(WINDOW_DAYS),
+            WINDOW_DAYS,
         )
         for r in rows:
             mid = r["model_id"]
@@ -27,7 +34,8 @@ async def evaluate(pool):
             cnt = r["count"]
             if cnt < 3:
                 continue
-            if avg >= PROMOTE_THRESHOLD:
+            # only record transitions; evaluation runs every minute
+            if avg >= PROMOTE_THRESHOLD and r["last_action"] != "promote":
                 # create promotion record
                 await conn.execute(
                     "INSERT INTO promotions (model_id, action, reason) VALUES ($1,$2,$3)",
@@ -39,7 +47,7 @@ async def evaluate(pool):
                 await conn.execute(
                     "UPDATE models SET is_active = TRUE WHERE id = $1", mid
                 )
-            elif avg < DEMOTE_THRESHOLD:
+            elif avg < DEMOTE_THRESHOLD and r["last_action"] != "demote":
                 await conn.execute(
                     "INSERT INTO promotions (model_id, action, reason) VALUES ($1,$2,$3)",
                     mid,
@@ -63,7 +71,7 @@ async def main():
             await evaluate(pool)
         except Exception as e:
             print("HR eval error:", e)
-        await asyncio.sleep(60 * 60)  # run hourly
+        await asyncio.sleep(EVAL_INTERVAL_SECONDS)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,142 @@
+import os
+import hmac
+import math
+import time
+
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "true").lower() == "true"
+# Reject new work once the estimated wait for any of its roles would exceed this
+MAX_WAIT_SECONDS = float(os.getenv("ADMISSION_MAX_WAIT_SECONDS", "1800"))
+# Completions in this trailing window give the measured drain rate
+WINDOW_SECONDS = float(os.getenv("ADMISSION_WINDOW_SECONDS", "300"))
+REFRESH_SECONDS = float(os.getenv("ADMISSION_REFRESH_SECONDS", "5"))
+# EWMA weight of the newest drain-rate measurement
+ALPHA = float(os.getenv("ADMISSION_EWMA_ALPHA", "0.3"))
+# Assumed drain rate (jobs/s) for a role that has not completed anything yet
+MIN_DRAIN_PER_SECOND = float(os.getenv("ADMISSION_MIN_DRAIN_PER_SECOND", "0.05"))
+MAX_RETRY_AFTER_SECONDS = 3600
+# Requests carrying this token skip backpressure and quotas (unset: no bypass)
+DIRECTOR_TOKEN = os.getenv("DIRECTOR_TOKEN", "")
+DIRECTOR_HEADER = "X-Aura-Director-Token"
+
+# Work admitted but not finished: it all has to drain before new work starts
+BACKLOG_STATUSES = ("BLOCKED", "QUEUED", "ASSIGNED", "IN_PROGRESS")
+
+STATE_SQL = """
+    SELECT role, 'backlog' AS kind, COUNT(*) AS n FROM jobs
+    WHERE status = ANY($1::text[]) GROUP BY role
+    UNION ALL
+    SELECT role, 'drained', COUNT(*) FROM jobs
+    WHERE completed_at > now() - make_interval(secs => $2) GROUP BY role
+"""
+
+PROJECT_PENDING_SQL = """
+    SELECT COUNT(*) FROM jobs WHERE project_id = $1 AND status = ANY($2::text[])
+"""
+
+
+class Rejected(Exception):
+    def __init__(self, reason: str, retry_after: float, detail: dict):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = max(1, min(MAX_RETRY_AFTER_SECONDS, math.ceil(retry_after)))
+        self.detail = detail
+
+
+class AdmissionController:
+    """
+    Backpressure for PRD intake. Keeps per-role backlog and an EWMA of the
+    per-role drain rate (completions/s), both reconciled with the DB every
+    REFRESH_SECONDS so every manager replica sees the same picture. A PRD is
+    admitted only if, for each role it needs, (backlog + new tasks) / drain
+    rate stays under MAX_WAIT_SECONDS; otherwise it is rejected with the time
+    until it would fit, which callers send as Retry-After. Keeping the backlog
+    bounded this way bounds the queueing delay of everything that is admitted.
+    """
+
+    def __init__(self):
+        self.backlog = {}
+        self.rate = {}
+        self._refreshed_at = 0.0
+
+    async def refresh(self, conn, force: bool = False):
+        if not force and time.monotonic() - self._refreshed_at < REFRESH_SECONDS:
+            return
+        backlog, drained = {}, {}
+        for r in await conn.fetch(STATE_SQL, list(BACKLOG_STATUSES), WINDOW_SECONDS):
+            (backlog if r["kind"] == "backlog" else drained)[r["role"]] = r["n"]
+        for role in set(drained) | set(self.rate):
+            measured = drained.get(role, 0) / WINDOW_SECONDS
+            prev = self.rate.get(role)
+            self.rate[role] = measured if prev is None else ALPHA * measured + (1 - ALPHA) * prev
+        self.backlog = backlog
+        self._refreshed_at = time.monotonic()
+
+    def drain_rate(self, role) -> float:
+        return max(self.rate.get(role, 0.0), MIN_DRAIN_PER_SECOND)
+
+    def estimated_wait(self, role, extra: int = 0) -> float:
+        return (self.backlog.get(role, 0) + extra) / self.drain_rate(role)
+
+    def check(self, demand: dict):
+        """demand: {role: new tasks}. Raises Rejected if any role would wait too long."""
+        worst = None
+        for role, n in demand.items():
+            if not self.backlog.get(role):
+                # an idle role takes any PRD, however large
+                continue
+            wait = self.estimated_wait(role, n)
+            if wait > MAX_WAIT_SECONDS and (worst is None or wait > worst[1]):
+                worst = (role, wait)
+        if worst:
+            role, wait = worst
+            raise Rejected(
+                "queue_full",
+                wait - MAX_WAIT_SECONDS,
+                {
+                    "role": role,
+                    "backlog": self.backlog.get(role, 0),
+                    "drain_per_minute": round(self.drain_rate(role) * 60, 2),
+                    "estimated_wait_s": round(wait),
+                    "max_wait_s": MAX_WAIT_SECONDS,
+                },
+            )
+
+    async def check_quota(self, conn, project_id, max_pending, demand: dict):
+        # nothing requested (a PRD without tasks) can't push the project over its quota
+        if max_pending is None or not demand:
+            return
+        pending = await conn.fetchval(PROJECT_PENDING_SQL, project_id, list(BACKLOG_STATUSES))
+        n = sum(demand.values())
+        if pending + n > max_pending:
+            # time for the project's excess to drain at the pace of its slowest role
+            excess = pending + n - max_pending
+            rate = min(self.drain_rate(role) for role in demand)
+            raise Rejected(
+                "project_quota",
+                excess / rate,
+                {"pending": pending, "requested": n, "max_pending": max_pending},
+            )
+
+    def note_admitted(self, demand: dict):
+        for role, n in demand.items():
+            self.backlog[role] = self.backlog.get(role, 0) + n
+
+    def snapshot(self) -> dict:
+        roles = set(self.backlog) | set(self.rate)
+        return {
+            "enabled": ADMISSION_ENABLED,
+            "max_wait_s": MAX_WAIT_SECONDS,
+            "roles": {
+                role: {
+                    "backlog": self.backlog.get(role, 0),
+                    "drain_per_minute": round(self.drain_rate(role) * 60, 2),
+                    "estimated_wait_s": round(self.estimated_wait(role)),
+                }
+                for role in sorted(roles, key=str)
+            },
+        }
+
+
+def is_director(headers) -> bool:
+    token = headers.get(DIRECTOR_HEADER)
+    return bool(DIRECTOR_TOKEN and token) and hmac.compare_digest(token, DIRECTOR_TOKEN)
@@ -0,0 +1,253 @@
+import os
+import mmap
+import time
+import uuid
+import asyncio
+import hashlib
+import logging
+from contextlib import contextmanager
+
+try:
+    import zstandard
+except ImportError:  # blobs are stored uncompressed
+    zstandard = None
+
+LOGGER = logging.getLogger("aura.manager.blobstore")
+
+BLOB_ROOT = os.getenv("BLOB_ROOT", "/data/blobs")
+# below this size compression isn't worth a frame header and a decompress per read
+COMPRESS_MIN_BYTES = int(os.getenv("BLOB_COMPRESS_MIN_BYTES", "4096"))
+COMPRESS_LEVEL = int(os.getenv("BLOB_COMPRESS_LEVEL", "3"))
+# blobs younger than this are never collected: their row may not be committed yet
+GC_GRACE_SECONDS = float(os.getenv("BLOB_GC_GRACE_SECONDS", "3600"))
+CHUNK_SIZE = 256 * 1024
+
+
+class BlobStore:
+    """
+    Content-addressed files under BLOB_ROOT, sharded by SHA-256:
+    <root>/ab/cd/abcd...  (raw) or  <root>/ab/cd/abcd....zst  (zstd frame).
+
+    The address is the hash of the uncompressed bytes, so identical outputs are
+    stored once whatever their compression. Writes stream into <root>/tmp and are
+    renamed into place, so a blob is either complete or absent. view() hands
+    out a memoryview over a raw blob's mmap without copying; iter_chunks()
+    reads fixed-size bytes chunks for streaming responses, which the server
+    may keep buffered after the generator has moved on.
+    """
+
+    def __init__(self, root: str = BLOB_ROOT):
+        self.root = root
+        self.tmp = os.path.join(root, "tmp")
+        os.makedirs(self.tmp, exist_ok=True)
+
+    def path(self, sha256: str) -> str:
+        return os.path.join(self.root, sha256[:2], sha256[2:4], sha256)
+
+    def locate(self, sha256: str):
+        """(path, compressed) of a stored blob, or None."""
+        base = self.path(sha256)
+        if os.path.exists(base):
+            return base, False
+        if os.path.exists(base + ".zst"):
+            return base + ".zst", True
+        return None
+
+    def exists(self, sha256: str) -> bool:
+        return self.locate(sha256) is not None
+
+    # --- writes ---
+
+    async def put_stream(self, chunks):
+        """Store an async iterable of bytes. Returns (sha256, size)."""
+        digest = hashlib.sha256()
+        size = 0
+        tmp = os.path.join(self.tmp, uuid.uuid4().hex)
+        try:
+            with open(tmp, "wb") as f:
+                async for chunk in chunks:
+                    if chunk:
+                        # hashing and disk writes stay off the event loop
+                        await asyncio.to_thread(self._append, f, digest, chunk)
+                        size += len(chunk)
+            sha256 = digest.hexdigest()
+            await asyncio.to_thread(self._commit, tmp, sha256, size)
+            return sha256, size
+        finally:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+
+    async def put_bytes(self, data: bytes):
+        async def one():
+            yield data
+
+        return await self.put_stream(one())
+
+    @staticmethod
+    def _append(f, digest, chunk):
+        digest.update(chunk)
+        f.write(chunk)
+
+    def _commit(self, tmp, sha256, size):
+        found = self.locate(sha256)
+        if found:
+            # dedup hit: refresh mtime so a concurrent GC pass treats it as new
+            try:
+                os.utime(found[0])
+                return
+            except FileNotFoundError:
+                pass  # collected since locate(): store it again
+        final = self.path(sha256)
+        os.makedirs(os.path.dirname(final), exist_ok=True)
+        if zstandard is not None and size >= COMPRESS_MIN_BYTES:
+            packed = tmp + ".zst"
+            cctx = zstandard.ZstdCompressor(level=COMPRESS_LEVEL)
+            with open(tmp, "rb") as src, open(packed, "wb") as dst:
+                cctx.copy_stream(src, dst, size=size)
+            if os.path.getsize(packed) < size:
+                os.replace(packed, final + ".zst")
+                return
+            os.unlink(packed)
+        os.replace(tmp, final)
+
+    # --- reads ---
+
+    @contextmanager
+    def view(self, sha256: str):
+        """
+        Zero-copy memoryview over a raw blob's mmap (valid inside the block).
+        Compressed blobs are decompressed into memory instead.
+        """
+        found = self.locate(sha256)
+        if not found:
+            raise FileNotFoundError(sha256)
+        path, compressed = found
+        with open(path, "rb") as f:
+            if compressed:
+                yield memoryview(zstandard.ZstdDecompressor().stream_reader(f).readall())
+                return
+            if os.fstat(f.fileno()).st_size == 0:
+                yield memoryview(b"")
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                view = memoryview(mm)
+                try:
+                    yield view
+                finally:
+                    view.release()
+
+    def iter_chunks(self, sha256: str):
+        """Yield the blob's bytes in CHUNK_SIZE pieces."""
+        found = self.locate(sha256)
+        if not found:
+            raise FileNotFoundError(sha256)
+        path, compressed = found
+        with open(path, "rb") as f:
+            if compressed:
+                reader = zstandard.ZstdDecompressor().stream_reader(f)
+                while True:
+                    chunk = reader.read(CHUNK_SIZE)
+                    if not chunk:
+                        return
+                    yield chunk
+            while True:
+                chunk = f.read(CHUNK_SIZE)
+                if not chunk:
+                    return
+                yield chunk
+
+    def read_text(self, sha256: str, limit: int = None) -> str:
+        with self.view(sha256) as view:
+            data = view if limit is None else view[:limit]
+            try:
+                return str(data, "utf-8", errors="replace")
+            finally:
+                if data is not view:
+                    data.release()
+
+    # --- garbage collection ---
+
+    def iter_stored(self):
+        """(sha256, path, mtime) of every stored blob."""
+        for shard in os.scandir(self.root):
+            if not shard.is_dir() or len(shard.name) != 2:
+                continue
+            for sub in os.scandir(shard.path):
+                for entry in os.scandir(sub.path):
+                    yield entry.name.split(".", 1)[0], entry.path, entry.stat().st_mtime
+
+    def _collect(self, path: str, cutoff: float):
+        """
+        Delete an unreferenced blob unless a dedup hit has refreshed its mtime
+        since the candidate scan (its row may not be committed yet). The blob is
+        first renamed out of its address, so an upload either refreshes it before
+        the re-check or misses it and stores it again. Returns the bytes freed,
+        or None if the blob was kept or is already gone.
+        """
+        doomed = os.path.join(self.tmp, uuid.uuid4().hex + ".gc")
+        try:
+            os.replace(path, doomed)
+        except FileNotFoundError:
+            return None
+        st = os.stat(doomed)
+        if st.st_mtime >= cutoff:
+            os.replace(doomed, path)
+            return None
+        os.unlink(doomed)
+        return st.st_size
+
+    async def gc(self, conn, batch: int = 1000):
+        """Delete blobs older than the grace period that no model_artifacts row references."""
+        cutoff = time.time() - GC_GRACE_SECONDS
+        candidates = await asyncio.to_thread(
+            lambda: [(h, p) for h, p, mtime in self.iter_stored() if mtime < cutoff]
+        )
+        removed = freed = 0
+        for i in range(0, len(candidates), batch):
+            part = candidates[i : i + batch]
+            rows = await conn.fetch(
+                "SELECT DISTINCT blob_sha256 FROM model_artifacts WHERE blob_sha256 = ANY($1::text[])",
+                [h for h, _ in part],
+            )
+            live = {r["blob_sha256"] for r in rows}
+            for sha256, path in part:
+                if sha256 in live:
+                    continue
+                size = self._collect(path, cutoff)
+                if size is not None:
+                    freed += size
+                    removed += 1
+        # partial uploads left behind by a crash
+        for entry in os.scandir(self.tmp):
+            if entry.stat().st_mtime < cutoff:
+                os.unlink(entry.path)
+        if removed:
+            LOGGER.info(f"Blob GC removed {removed} blobs ({freed} bytes)")
+        return removed
+
+
+_store = None
+
+
+def get_store() -> BlobStore:
+    global _store
+    if _store is None:
+        _store = BlobStore()
+    return _store
+
+
+async def run_gc(leader, interval: float = None):
+    """Periodic blob GC; only the leader collects so replicas sharing BLOB_ROOT don't race."""
+    from .db import init_db_pool
+
+    interval = interval or float(os.getenv("BLOB_GC_INTERVAL_SECONDS", "3600"))
+    while True:
+        await asyncio.sleep(interval)
+        if not leader.is_leader:
+            continue
+        try:
+            pool = await init_db_pool()
+            async with pool.acquire() as conn:
+                await get_store().gc(conn)
+        except Exception as e:
+            LOGGER.error(f"Blob GC failed: {e}")
@@ -0,0 +1,217 @@
+import json
+import math
+from collections import deque
+from typing import List
+
+
+# jobs.priority is an INT column
+PRIORITY_RANGE = (-(2 ** 31), 2 ** 31 - 1)
+
+
+class DependencyError(ValueError):
+    """PRD tasks that cannot be scheduled (unknown task, duplicate key, cycle, bad field)."""
+
+
+def _priority(key: str, value) -> int:
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise DependencyError(f"task {key!r} priority must be an integer, got {value!r}")
+    if not PRIORITY_RANGE[0] <= value <= PRIORITY_RANGE[1]:
+        raise DependencyError(f"task {key!r} priority {value} is out of range")
+    return value
+
+
+def _estimate(key: str, value) -> float:
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise DependencyError(f"task {key!r} estimate must be a number, got {value!r}")
+    if not math.isfinite(value) or value < 0:
+        raise DependencyError(f"task {key!r} estimate must be finite and non-negative, got {value!r}")
+    return float(value)
+
+
+def _hedge(key: str, value) -> bool:
+    if not isinstance(value, bool):
+        raise DependencyError(f"task {key!r} hedge must be true or false, got {value!r}")
+    return value
+
+
+class TaskNode:
+    __slots__ = (
+        "index", "key", "task", "deps", "children", "priority", "hedge", "estimate", "critical_path",
+    )
+
+    def __init__(self, index: int, key: str, task: dict, default_priority: int = 0, default_hedge: bool = False):
+        self.index = index
+        self.key = key
+        self.task = task
+        self.deps = set()
+        self.children = []
+        self.priority = _priority(key, task.get("priority", default_priority))
+        self.hedge = _hedge(key, task.get("hedge", default_hedge))
+        self.estimate = _estimate(key, task.get("estimate", 1.0))
+        # longest estimate-weighted chain from this task to the end of the PRD (inclusive)
+        self.critical_path = 0.0
+
+
+def task_key(index: int, task: dict) -> str:
+    return str(task.get("id", index))
+
+
+def build_dag(tasks: list, default_priority: int = 0, default_hedge: bool = False) -> List[TaskNode]:
+    """
+    Resolve each task's "depends_on" (task ids, or list indexes for tasks without
+    an id) into a DAG and compute critical-path lengths. Tasks without their own
+    "priority" or "hedge" get the defaults. Raises DependencyError.
+    """
+    nodes = []
+    by_key = {}
+    for i, t in enumerate(tasks):
+        if not isinstance(t, dict):
+            raise DependencyError(f"task {i} is not an object")
+        node = TaskNode(i, task_key(i, t), t, default_priority, default_hedge)
+        if node.key in by_key:
+            raise DependencyError(f"duplicate task id {node.key!r}")
+        by_key[node.key] = node
+        nodes.append(node)
+
+    for node in nodes:
+        depends_on = node.task.get("depends_on") or []
+        if not isinstance(depends_on, list):
+            raise DependencyError(f"task {node.key!r} depends_on must be a list, got {depends_on!r}")
+        for dep in depends_on:
+            parent = by_key.get(str(dep))
+            if parent is None:
+                raise DependencyError(f"task {node.key!r} depends on unknown task {dep!r}")
+            if parent is node:
+                raise DependencyError(f"task {node.key!r} depends on itself")
+            if parent.index not in node.deps:
+                node.deps.add(parent.index)
+                parent.children.append(node)
+
+    # Kahn's algorithm: a topological order exists iff there is no cycle
+    indegree = {n.index: len(n.deps) for n in nodes}
+    ready = deque(n for n in nodes if not n.deps)
+    order = []
+    while ready:
+        n = ready.popleft()
+        order.append(n)
+        for c in n.children:
+            indegree[c.index] -= 1
+            if indegree[c.index] == 0:
+                ready.append(c)
+    if len(order) != len(nodes):
+        stuck = sorted(n.key for n in nodes if indegree[n.index] > 0)
+        raise DependencyError(f"dependency cycle among tasks {stuck}")
+
+    for n in reversed(order):
+        n.critical_path = n.estimate + max((c.critical_path for c in n.children), default=0.0)
+    return nodes
+
+
+# One decrement per completed predecessor; a job with no pending deps left becomes QUEUED
+RELEASE_SQL = """
+    UPDATE jobs j
+    SET pending_deps = j.pending_deps - 1,
+        status = CASE WHEN j.pending_deps - 1 <= 0 THEN 'QUEUED' ELSE j.status END
+    FROM job_dependencies d
+    WHERE d.depends_on = $1 AND j.id = d.job_id AND j.status = 'BLOCKED'
+    RETURNING j.id, j.project_id, j.status
+"""
+
+
+async def release_dependents(conn, job_id) -> list:
+    """Call once per job, in the transaction that marks it COMPLETED. Returns released jobs."""
+    rows = await conn.fetch(RELEASE_SQL, job_id)
+    released = [r for r in rows if r["status"] == "QUEUED"]
+    if released:
+        await conn.executemany(
+            "INSERT INTO job_events (job_id, event_type, details) VALUES ($1, 'released', $2::jsonb)",
+            [(r["id"], json.dumps({"after": str(job_id)})) for r in released],
+        )
+    return released
+
+
+# Everything downstream of a job that is still waiting on it (directly or through other waiters)
+CANCEL_DOWNSTREAM_SQL = """
+    WITH RECURSIVE down(id) AS (
+        SELECT job_id FROM job_dependencies WHERE depends_on = $1
+        UNION
+        SELECT d.job_id FROM job_dependencies d JOIN down ON d.depends_on = down.id
+    )
+    UPDATE jobs j SET status = 'CANCELLED', completed_at = now()
+    FROM down
+    WHERE j.id = down.id AND j.status = 'BLOCKED'
+    RETURNING j.id
+"""
+
+# Downstream jobs a failed predecessor cancelled, with the status of each of their dependencies
+CANCELLED_DOWNSTREAM_SQL = """
+    WITH RECURSIVE down(id) AS (
+        SELECT job_id FROM job_dependencies WHERE depends_on = $1
+        UNION
+        SELECT d.job_id FROM job_dependencies d JOIN down ON d.depends_on = down.id
+    )
+    SELECT j.id, d.depends_on, p.status AS dep_status
+    FROM down
+    JOIN jobs j ON j.id = down.id
+    JOIN job_dependencies d ON d.job_id = j.id
+    JOIN jobs p ON p.id = d.depends_on
+    WHERE j.status = 'CANCELLED'
+      AND EXISTS (SELECT 1 FROM job_events e
+                  WHERE e.job_id = j.id AND e.event_type = 'dependency_failed')
+    FOR UPDATE OF j
+"""
+
+
+async def cancel_dependents(conn, job_id, status: str) -> list:
+    """
+    Call in the transaction that ends job_id as FAILED or DEAD_LETTER: its
+    BLOCKED successors, transitively, can never be released and are CANCELLED.
+    Returns their ids.
+    """
+    rows = await conn.fetch(CANCEL_DOWNSTREAM_SQL, job_id)
+    if rows:
+        await conn.executemany(
+            "INSERT INTO job_events (job_id, event_type, details) VALUES ($1, 'dependency_failed', $2::jsonb)",
+            [(r["id"], json.dumps({"cause": str(job_id), "cause_status": status})) for r in rows],
+        )
+    return [r["id"] for r in rows]
+
+
+async def reblock_dependents(conn, job_id) -> list:
+    """
+    Call in the transaction that requeues job_id: successors that a dependency
+    failure cancelled go back to BLOCKED, unless one of their dependencies is
+    still failed (then they stay cancelled until that one is requeued). Returns
+    their ids.
+    """
+    deps = {}
+    for r in await conn.fetch(CANCELLED_DOWNSTREAM_SQL, job_id):
+        deps.setdefault(r["id"], {})[r["depends_on"]] = r["dep_status"]
+    # revived in dependency order: a job comes back once none of its dependencies is dead
+    alive = {job_id}
+    revived = []
+    changed = True
+    while changed:
+        changed = False
+        for jid, ds in deps.items():
+            if jid in alive:
+                continue
+            if all(
+                d in alive or s not in ("FAILED", "DEAD_LETTER", "CANCELLED") for d, s in ds.items()
+            ):
+                alive.add(jid)
+                revived.append(jid)
+                changed = True
+    for jid in revived:
+        pending = sum(1 for s in deps[jid].values() if s != "COMPLETED")
+        await conn.execute(
+            "UPDATE jobs SET status = 'BLOCKED', completed_at = NULL, pending_deps = $2 WHERE id = $1",
+            jid,
+            pending,
+        )
+    if revived:
+        await conn.executemany(
+            "INSERT INTO job_events (job_id, event_type, details) VALUES ($1, 'dependency_requeued', $2::jsonb)",
+            [(jid, json.dumps({"after": str(job_id)})) for jid in revived],
+        )
+    return revived
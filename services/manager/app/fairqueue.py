@@ -0,0 +1,136 @@
+import os
+import time
+import logging
+from collections import deque
+
+LOGGER = logging.getLogger("aura.manager.fairqueue")
+
+# Dispatch slots a weight-1.0 project earns per round
+QUANTUM = float(os.getenv("FAIR_QUEUE_QUANTUM", "1.0"))
+# In-memory depths are reconciled with the DB this often (other replicas take intake too)
+REFRESH_SECONDS = float(os.getenv("FAIR_QUEUE_REFRESH_SECONDS", "15"))
+# Floor so a zero weight slows a project down without starving it forever
+MIN_WEIGHT = 0.01
+
+DEPTHS_SQL = """
+    SELECT j.project_id, COUNT(*) AS depth, COALESCE(MAX(p.weight), 1.0) AS weight
+    FROM jobs j
+    LEFT JOIN projects p ON p.id = j.project_id
+    WHERE j.status = 'QUEUED' AND j.project_id IS NOT NULL
+      AND (j.not_before IS NULL OR j.not_before <= now())
+    GROUP BY j.project_id
+"""
+
+# Head of each selected project's queue: highest priority, longest remaining chain, oldest
+# (jobs backing off before a retry are skipped until their not_before)
+HEADS_SQL = """
+    SELECT j.id, j.role, j.trace_id, j.project_id, j.priority
+    FROM unnest($1::uuid[], $2::int[]) AS q(project_id, n)
+    CROSS JOIN LATERAL (
+        SELECT id, role, trace_id, project_id, priority FROM jobs
+        WHERE status = 'QUEUED' AND project_id = q.project_id
+          AND (not_before IS NULL OR not_before <= now())
+        ORDER BY priority DESC, critical_path DESC, created_at
+        LIMIT q.n
+    ) j
+"""
+
+
+class FairQueue:
+    """
+    Deficit round-robin over per-project queues.
+
+    Each round, every backlogged project earns QUANTUM * weight credits and can
+    dispatch one job per whole credit. Credit carries over while the project
+    stays backlogged and resets once its queue empties. Small projects are
+    therefore served within a round of submitting, while a bulk submitter still
+    gets throughput in proportion to its weight. Inside a project, jobs go out
+    by priority, then critical-path length (see app/dag.py), then age.
+    """
+
+    def __init__(self):
+        self.depth = {}
+        self.weight = {}
+        self.deficit = {}
+        self.order = deque()
+        self._refreshed_at = 0.0
+
+    def note_enqueued(self, project_id, n: int = 1, weight: float = None):
+        if project_id not in self.depth or self.depth[project_id] <= 0:
+            if project_id not in self.order:
+                self.order.append(project_id)
+            self.depth[project_id] = 0
+        self.depth[project_id] += n
+        if weight is not None:
+            self.weight[project_id] = weight
+
+    async def refresh(self, conn, force: bool = False):
+        if not force and time.monotonic() - self._refreshed_at < REFRESH_SECONDS:
+            return
+        rows = await conn.fetch(DEPTHS_SQL)
+        depth = {r["project_id"]: r["depth"] for r in rows}
+        for pid in depth:
+            if pid not in self.order:
+                self.order.append(pid)
+        self.order = deque(pid for pid in self.order if pid in depth)
+        self.deficit = {pid: d for pid, d in self.deficit.items() if pid in depth}
+        self.depth = depth
+        self.weight = {r["project_id"]: float(r["weight"]) for r in rows}
+        self._refreshed_at = time.monotonic()
+
+    def plan(self, slots: int) -> dict:
+        """Split `slots` dispatches across backlogged projects. Returns {project_id: n}."""
+        alloc = {}
+        while slots > 0 and any(self.depth.get(pid, 0) > 0 for pid in self.order):
+            for _ in range(len(self.order)):
+                pid = self.order[0]
+                self.order.rotate(-1)
+                backlog = self.depth.get(pid, 0)
+                if backlog <= 0:
+                    self.deficit[pid] = 0.0
+                    continue
+                weight = max(self.weight.get(pid, 1.0), MIN_WEIGHT)
+                self.deficit[pid] = self.deficit.get(pid, 0.0) + QUANTUM * weight
+                n = min(int(self.deficit[pid]), backlog, slots)
+                if n:
+                    alloc[pid] = alloc.get(pid, 0) + n
+                    self.deficit[pid] -= n
+                    self.depth[pid] = backlog - n
+                    slots -= n
+                if slots == 0:
+                    break
+        return alloc
+
+    async def next_batch(self, conn, slots: int):
+        """Jobs to dispatch this tick, interleaved across projects in DRR order."""
+        await self.refresh(conn)
+        alloc = self.plan(slots)
+        if not alloc:
+            # nothing known locally: pick up work submitted through other replicas
+            await self.refresh(conn, force=True)
+            alloc = self.plan(slots)
+            if not alloc:
+                return []
+
+        pids = list(alloc)
+        rows = await conn.fetch(HEADS_SQL, pids, [alloc[p] for p in pids])
+        per_project = {}
+        for r in rows:
+            per_project.setdefault(r["project_id"], deque()).append(r)
+        for pid in pids:
+            got = len(per_project.get(pid, ()))
+            if got < alloc[pid]:
+                # queue was shallower than we thought; trust the DB
+                self.depth[pid] = 0
+                self.deficit[pid] = 0.0
+
+        batch = []
+        while per_project:
+            for pid in list(per_project):
+                batch.append(per_project[pid].popleft())
+                if not per_project[pid]:
+                    del per_project[pid]
+        return batch
+
+    def depths(self) -> dict:
+        return {str(pid): d for pid, d in self.depth.items() if d > 0}
@@ -0,0 +1,248 @@
+import os
+import json
+import time
+import logging
+from datetime import datetime, timezone
+
+from .stats import stats
+from .dag import reblock_dependents
+
+LOGGER = logging.getLogger("aura.manager.hedging")
+
+HEDGING_ENABLED = os.getenv("HEDGING_ENABLED", "true").lower() == "true"
+# below this many adapter spans a model's p95 is not trusted; the default applies
+MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", "20"))
+DEFAULT_P95_SECONDS = float(os.getenv("HEDGE_DEFAULT_P95_SECONDS", "300"))
+DEFAULT_COST_USD = float(os.getenv("HEDGE_DEFAULT_COST_USD", "0.05"))
+STATS_REFRESH_SECONDS = float(os.getenv("HEDGE_STATS_REFRESH_SECONDS", "60"))
+STATS_WINDOW_HOURS = float(os.getenv("HEDGE_STATS_WINDOW_HOURS", "24"))
+
+# adapter spans are reported by workers with service = the model they ran as
+P95_SQL = """
+    SELECT service AS model, COUNT(*) AS n,
+           percentile_cont(0.95) WITHIN GROUP (ORDER BY duration_ms) / 1000.0 AS p95_s
+    FROM job_spans
+    WHERE stage = 'adapter' AND started_at > now() - make_interval(hours => $1)
+    GROUP BY service
+"""
+
+COST_SQL = """
+    SELECT m.name AS model, AVG(mr.estimated_cost) AS cost
+    FROM model_runs mr JOIN models m ON m.id = mr.model_id
+    WHERE mr.created_at > now() - make_interval(hours => $1) AND mr.estimated_cost IS NOT NULL
+    GROUP BY m.name
+"""
+
+CANDIDATES_SQL = """
+    SELECT j.id, j.role, j.assigned_model, j.project_id, j.trace_id, j.prd_id,
+           j.priority, j.critical_path, j.task_payload, EXTRACT(EPOCH FROM now() - j.started_at) AS elapsed_s
+    FROM jobs j
+    WHERE j.status = 'IN_PROGRESS' AND j.hedge AND j.hedge_of IS NULL
+      AND j.started_at < now() - make_interval(secs => $1)
+      AND NOT EXISTS (SELECT 1 FROM jobs h WHERE h.hedge_of = j.id)
+    ORDER BY j.started_at
+    LIMIT 20
+"""
+
+
+class Hedger:
+    """
+    Speculative duplicates for stragglers. An opted-in job that has been
+    IN_PROGRESS for longer than its model's observed p95 adapter latency gets a
+    copy assigned to a second model. The first successful completion wins (see
+    settle); the other copy is CANCELLED and any late result from it is
+    discarded. Every hedge reserves the hedge model's average run cost against
+    the project's hedge budget.
+    """
+
+    def __init__(self):
+        self.p95 = {}
+        self.cost = {}
+        self._stats_at = 0.0
+
+    async def refresh_stats(self, conn):
+        if time.monotonic() - self._stats_at < STATS_REFRESH_SECONDS:
+            return
+        rows = await conn.fetch(P95_SQL, STATS_WINDOW_HOURS)
+        self.p95 = {r["model"]: float(r["p95_s"]) for r in rows if r["n"] >= MIN_SAMPLES}
+        rows = await conn.fetch(COST_SQL, STATS_WINDOW_HOURS * 7)
+        self.cost = {r["model"]: float(r["cost"]) for r in rows}
+        self._stats_at = time.monotonic()
+
+    def threshold(self, model) -> float:
+        return self.p95.get(model, DEFAULT_P95_SECONDS)
+
+    async def tick(self, conn, pick_model):
+        """
+        pick_model(job, exclude) -> model name or None. Returns the hedges created.
+        """
+        await self.refresh_stats(conn)
+        floor = min([DEFAULT_P95_SECONDS, *self.p95.values()])
+        created = []
+        for job in await conn.fetch(CANDIDATES_SQL, floor):
+            limit = self.threshold(job["assigned_model"])
+            if job["elapsed_s"] < limit:
+                continue
+            model = await pick_model(job, [job["assigned_model"]])
+            if not model or model == job["assigned_model"]:
+                continue
+            hedge_id = await self.launch(conn, job, model, limit)
+            if hedge_id:
+                created.append(hedge_id)
+        return created
+
+    async def launch(self, conn, job, model, limit):
+        cost = self.cost.get(model, DEFAULT_COST_USD)
+        async with conn.transaction():
+            reserved = await conn.fetchval(
+                """
+                UPDATE projects SET hedge_spent_usd = hedge_spent_usd + $2
+                WHERE id = $1 AND hedge_spent_usd + $2 <= hedge_budget_usd
+                RETURNING hedge_spent_usd
+            """,
+                job["project_id"],
+                cost,
+            )
+            if reserved is None:
+                LOGGER.info(f"Hedge for job {job['id']} skipped: project hedge budget exhausted")
+                await conn.execute(
+                    "UPDATE jobs SET hedge = FALSE WHERE id = $1", job["id"]
+                )
+                await conn.execute(
+                    "INSERT INTO job_events (job_id, event_type, details) VALUES ($1, 'hedge_skipped', $2::jsonb)",
+                    job["id"],
+                    json.dumps({"reason": "budget", "cost_usd": cost}),
+                )
+                return None
+
+            hedge_id = await conn.fetchval(
+                """
+                INSERT INTO jobs (project_id, role, assigned_model, status, created_at, trace_id,
+                                  prd_id, priority, critical_path, hedge_of, hedge_cost_usd, task_payload)
+                VALUES ($1, $2, $3, 'ASSIGNED', $4, $5, $6, $7, $8, $9, $10, $11)
+                RETURNING id
+            """,
+                job["project_id"],
+                job["role"],
+                model,
+                datetime.now(timezone.utc),
+                job["trace_id"],
+                job["prd_id"],
+                job["priority"],
+                job["critical_path"],
+                job["id"],
+                cost,
+                job["task_payload"],
+            )
+            # same task payload, so workers and the validator treat it as the same task
+            await conn.execute(
+                """
+                INSERT INTO job_events (job_id, event_type, details)
+                SELECT $1, 'created', details FROM job_events
+                WHERE job_id = $2 AND event_type = 'created' LIMIT 1
+            """,
+                hedge_id,
+                job["id"],
+            )
+            details = {
+                "hedge_job": str(hedge_id),
+                "original_model": job["assigned_model"],
+                "hedge_model": model,
+                "elapsed_s": round(float(job["elapsed_s"]), 1),
+                "p95_s": round(limit, 1),
+                "reserved_usd": cost,
+            }
+            await conn.executemany(
+                "INSERT INTO job_events (job_id, event_type, details) VALUES ($1, $2, $3::jsonb)",
+                [
+                    (job["id"], "hedged", json.dumps(details)),
+                    (hedge_id, "assigned", json.dumps({"assigned_model": model, "method": "hedge"})),
+                ],
+            )
+        stats.created({"ASSIGNED": 1})
+        stats.entered("ASSIGNED")
+        LOGGER.info(
+            f"Hedged job {job['id']} on {model} after {details['elapsed_s']}s (p95 {details['p95_s']}s)"
+        )
+        return hedge_id
+
+
+def is_superseded(job) -> bool:
+    """
+    A completion report for a job of a hedge pair that is already settled: the
+    losing copy (CANCELLED), or an original that its duplicate already completed.
+    """
+    return bool(job["hedge"] or job["hedge_of"]) and job["status"] in ("CANCELLED", "COMPLETED")
+
+
+async def record_discarded(conn, job_id, success):
+    await conn.execute(
+        "INSERT INTO job_events (job_id, event_type, details) VALUES ($1, 'hedge_discarded', $2::jsonb)",
+        job_id,
+        json.dumps({"success": success}),
+    )
+
+
+async def settle(conn, job_id, hedge_of):
+    """
+    Run in complete_job's transaction after a successful completion. Cancels the
+    other copies of a hedge pair and, when the duplicate won, completes the
+    original with it, bringing back successors that a failure of the original
+    had cancelled. Returns the original's id in that case (so its successors can
+    be released), else None.
+    """
+    root = hedge_of or job_id
+    losers = await conn.fetch(
+        """
+        UPDATE jobs j SET status = 'CANCELLED', completed_at = now()
+        FROM (SELECT id, status FROM jobs WHERE (id = $1 OR hedge_of = $1) AND id <> $2 FOR UPDATE) old
+        WHERE j.id = old.id AND old.status IN ('QUEUED', 'ASSIGNED', 'IN_PROGRESS')
+        RETURNING j.id, j.project_id, j.hedge_cost_usd, old.status AS was
+    """,
+        root,
+        job_id,
+    )
+    if not losers and hedge_of is None:
+        return None
+
+    events = [(job_id, "hedge_won", json.dumps({"losers": [str(l["id"]) for l in losers]}))]
+    for l in losers:
+        stats.transition(l["was"], "CANCELLED")
+        events.append((l["id"], "hedge_lost", json.dumps({"winner": str(job_id), "was": l["was"]})))
+        # a duplicate that never started cost nothing; give its reservation back
+        if l["was"] == "ASSIGNED" and l["hedge_cost_usd"]:
+            await conn.execute(
+                "UPDATE projects SET hedge_spent_usd = GREATEST(hedge_spent_usd - $2, 0) WHERE id = $1",
+                l["project_id"],
+                l["hedge_cost_usd"],
+            )
+    await conn.executemany(
+        "INSERT INTO job_events (job_id, event_type, details) VALUES ($1, $2, $3::jsonb)", events
+    )
+
+    if hedge_of is None:
+        return None
+    # the duplicate won: the original completes with it. Only the winner's own run is
+    # validated and scored, so the original's queue entry is dropped.
+    prior = await conn.fetchval("SELECT status FROM jobs WHERE id = $1 FOR UPDATE", root)
+    if prior in ("FAILED", "DEAD_LETTER"):
+        # still counted as pending, so releasing the original below unblocks them
+        stats.transition("CANCELLED", "BLOCKED", len(await reblock_dependents(conn, root)))
+    was = await conn.fetchval(
+        """
+        UPDATE jobs j SET status = 'COMPLETED', completed_at = now()
+        FROM (SELECT id, status FROM jobs WHERE id = $1 FOR UPDATE) old
+        WHERE j.id = old.id
+        RETURNING old.status
+    """,
+        root,
+    )
+    if was is not None:
+        stats.transition(was, "COMPLETED")
+    await conn.execute("DELETE FROM validation_queue WHERE job_id = $1", root)
+    await conn.execute(
+        "INSERT INTO job_events (job_id, event_type, details) VALUES ($1, 'completed', $2::jsonb)",
+        root,
+        json.dumps({"success": True, "hedge_winner": str(job_id)}),
+    )
+    return root
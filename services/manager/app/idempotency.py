@@ -0,0 +1,131 @@
+import os
+import asyncio
+import hashlib
+import logging
+
+LOGGER = logging.getLogger("aura.manager.idempotency")
+
+HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+# How long a stored response is replayed for the same key
+TTL_SECONDS = float(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400"))
+# A first request that has not finished after this long is presumed dead; its key can be retried
+PENDING_TIMEOUT_SECONDS = float(os.getenv("IDEMPOTENCY_PENDING_TIMEOUT_SECONDS", "120"))
+MAX_KEY_LENGTH = 255
+PURGE_BATCH = 5000
+
+# Take the key, or take over one whose response expired or whose first request died
+CLAIM_SQL = """
+    INSERT INTO idempotency_keys (key_hash, request_hash, expires_at)
+    VALUES ($1, $2, now() + make_interval(secs => $3))
+    ON CONFLICT (key_hash) DO UPDATE
+    SET request_hash = EXCLUDED.request_hash, status_code = NULL, response = NULL,
+        created_at = now(), expires_at = EXCLUDED.expires_at
+    WHERE idempotency_keys.expires_at < now()
+       OR (idempotency_keys.status_code IS NULL
+           AND idempotency_keys.created_at < now() - make_interval(secs => $4))
+    RETURNING key_hash
+"""
+
+STORE_SQL = """
+    UPDATE idempotency_keys
+    SET status_code = $2, response = $3, expires_at = now() + make_interval(secs => $4)
+    WHERE key_hash = $1
+"""
+
+PURGE_SQL = """
+    DELETE FROM idempotency_keys
+    WHERE key_hash IN (
+        SELECT key_hash FROM idempotency_keys WHERE expires_at < now() LIMIT $1
+    )
+"""
+
+
+class KeyConflict(Exception):
+    """The key is held by a request still in flight, or was used with a different body."""
+
+    def __init__(self, reason: str, retry_after: int = None):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class Stored:
+    __slots__ = ("status_code", "body")
+
+    def __init__(self, status_code: int, body: bytes):
+        self.status_code = status_code
+        self.body = body
+
+
+def key_hash(scope: str, key: str) -> bytes:
+    return hashlib.sha256(f"{scope}\0{key}".encode()).digest()
+
+
+def fingerprint(*parts) -> bytes:
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part if isinstance(part, bytes) else str(part).encode())
+        digest.update(b"\0")
+    return digest.digest()
+
+
+async def claim(conn, khash: bytes, request_hash: bytes):
+    """
+    None when this request owns the key and should run; the Stored response
+    when an earlier request with the same key already succeeded.
+    """
+    if await conn.fetchval(CLAIM_SQL, khash, request_hash, TTL_SECONDS, PENDING_TIMEOUT_SECONDS):
+        return None
+    row = await conn.fetchrow(
+        "SELECT request_hash, status_code, response FROM idempotency_keys WHERE key_hash = $1",
+        khash,
+    )
+    if row is None:
+        # purged between the two statements
+        return await claim(conn, khash, request_hash)
+    if row["request_hash"] != request_hash:
+        raise KeyConflict("idempotency key reused with a different request")
+    if row["status_code"] is None:
+        raise KeyConflict("a request with this idempotency key is in progress", retry_after=1)
+    return Stored(row["status_code"], bytes(row["response"]))
+
+
+async def store(conn, khash: bytes, status_code: int, body: bytes):
+    await conn.execute(STORE_SQL, khash, status_code, body, TTL_SECONDS)
+
+
+async def release(conn, khash: bytes):
+    """The request failed: drop the key so a retry runs it again."""
+    await conn.execute(
+        "DELETE FROM idempotency_keys WHERE key_hash = $1 AND status_code IS NULL", khash
+    )
+
+
+async def purge(conn) -> int:
+    removed = 0
+    while True:
+        res = await conn.execute(PURGE_SQL, PURGE_BATCH)
+        n = int(res.split()[-1])
+        removed += n
+        if n < PURGE_BATCH:
+            return removed
+
+
+async def run_purge(leader, interval: float = None):
+    """Periodic removal of expired keys; only the leader purges."""
+    from .db import init_db_pool
+
+    interval = interval or float(os.getenv("IDEMPOTENCY_PURGE_INTERVAL_SECONDS", "600"))
+    while True:
+        await asyncio.sleep(interval)
+        if not leader.is_leader:
+            continue
+        try:
+            pool = await init_db_pool()
+            async with pool.acquire() as conn:
+                removed = await purge(conn)
+            if removed:
+                LOGGER.info(f"Purged {removed} expired idempotency keys")
+        except Exception as e:
+            LOGGER.error(f"Idempotency key purge failed: {e}")
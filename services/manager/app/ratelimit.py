@@ -0,0 +1,144 @@
+import os
+import logging
+from datetime import datetime, timedelta, timezone
+
+LOGGER = logging.getLogger("aura.manager.ratelimit")
+
+# Buckets are sized to this fraction of the provider limit, so bursts land just under it
+HEADROOM = float(os.getenv("RATE_LIMIT_HEADROOM", "0.9"))
+# Pause after a 429 that came without Retry-After
+DEFAULT_BACKOFF_SECONDS = float(os.getenv("RATE_LIMIT_DEFAULT_BACKOFF_SECONDS", "2"))
+# Backends without a bucket row get one with these limits
+DEFAULT_RPM = float(os.getenv("RATE_LIMIT_DEFAULT_RPM", "60"))
+DEFAULT_TPM = float(os.getenv("RATE_LIMIT_DEFAULT_TPM", "100000"))
+
+LOCK_SQL = """
+    INSERT INTO rate_limit_buckets (backend, rpm_limit, tpm_limit, requests_available, tokens_available)
+    VALUES ($1, $2, $3, 0, 0)
+    ON CONFLICT (backend) DO UPDATE SET backend = EXCLUDED.backend
+    RETURNING *
+"""
+
+SAVE_SQL = """
+    UPDATE rate_limit_buckets
+    SET rpm_limit = $2, tpm_limit = $3, requests_available = $4, tokens_available = $5,
+        paused_until = $6, updated_at = $7
+    WHERE backend = $1
+"""
+
+
+class Bucket:
+    """One backend's request and token buckets, refilled continuously at limit/60 per second."""
+
+    def __init__(self, row, now):
+        self.backend = row["backend"]
+        self.rpm = row["rpm_limit"]
+        self.tpm = row["tpm_limit"]
+        self.paused_until = row["paused_until"]
+        elapsed = max((now - row["updated_at"]).total_seconds(), 0.0)
+        self.requests = min(self.rpm * HEADROOM, row["requests_available"] + elapsed * self.rpm * HEADROOM / 60)
+        self.tokens = min(self.tpm * HEADROOM, row["tokens_available"] + elapsed * self.tpm * HEADROOM / 60)
+        self.now = now
+
+    def take(self, tokens: float) -> float:
+        """Debit one request and `tokens`; returns 0, or the seconds to wait before trying again."""
+        if self.paused_until and self.paused_until > self.now:
+            return (self.paused_until - self.now).total_seconds()
+        # a request bigger than the whole bucket would never fit; let it through on a full bucket
+        tokens = min(tokens, self.tpm * HEADROOM)
+        if self.requests >= 1 and self.tokens >= tokens:
+            self.requests -= 1
+            self.tokens -= tokens
+            return 0.0
+        wait_r = max(1 - self.requests, 0) * 60 / (self.rpm * HEADROOM)
+        wait_t = max(tokens - self.tokens, 0) * 60 / (self.tpm * HEADROOM)
+        return max(wait_r, wait_t)
+
+    def values(self):
+        return (
+            self.backend,
+            self.rpm,
+            self.tpm,
+            self.requests,
+            self.tokens,
+            self.paused_until,
+            self.now,
+        )
+
+
+async def _locked(conn, backend):
+    row = await conn.fetchrow(LOCK_SQL, backend, DEFAULT_RPM, DEFAULT_TPM)
+    return Bucket(row, datetime.now(timezone.utc))
+
+
+async def acquire(conn, backend: str, tokens: float) -> float:
+    """Try to take a slot for one request of ~`tokens`. Returns 0 when granted, else wait seconds."""
+    async with conn.transaction():
+        bucket = await _locked(conn, backend)
+        wait = bucket.take(tokens)
+        await conn.execute(SAVE_SQL, *bucket.values())
+    return wait
+
+
+def _header(headers, *names):
+    for name in names:
+        value = headers.get(name)
+        if value is not None:
+            try:
+                return float(str(value).rstrip("s"))
+            except ValueError:
+                continue
+    return None
+
+
+async def observe(conn, backend: str, status: int, headers: dict, estimated_tokens: float = 0, used_tokens: float = None):
+    """
+    Feed a provider response back into the buckets: the limit/remaining headers
+    (OpenAI style x-ratelimit-*) correct the local view, a 429 pauses the backend
+    for Retry-After, and the actual token usage settles the estimate taken in acquire.
+    """
+    headers = {k.lower(): v for k, v in (headers or {}).items()}
+    async with conn.transaction():
+        bucket = await _locked(conn, backend)
+        limit_r = _header(headers, "x-ratelimit-limit-requests")
+        limit_t = _header(headers, "x-ratelimit-limit-tokens")
+        if limit_r:
+            bucket.rpm = limit_r
+        if limit_t:
+            bucket.tpm = limit_t
+        remaining_r = _header(headers, "x-ratelimit-remaining-requests")
+        remaining_t = _header(headers, "x-ratelimit-remaining-tokens")
+        if remaining_r is not None:
+            bucket.requests = min(bucket.requests, remaining_r - bucket.rpm * (1 - HEADROOM))
+        if remaining_t is not None:
+            bucket.tokens = min(bucket.tokens, remaining_t - bucket.tpm * (1 - HEADROOM))
+        if used_tokens is not None:
+            bucket.tokens -= used_tokens - estimated_tokens
+        if status == 429:
+            backoff = _header(headers, "retry-after") or DEFAULT_BACKOFF_SECONDS
+            bucket.paused_until = bucket.now + timedelta(seconds=backoff)
+            bucket.requests = min(bucket.requests, 0.0)
+            LOGGER.warning(f"{backend} rate limited by provider; pausing {backoff:.1f}s")
+        await conn.execute(SAVE_SQL, *bucket.values())
+    return {
+        "backend": backend,
+        "rpm_limit": bucket.rpm,
+        "tpm_limit": bucket.tpm,
+        "requests_available": round(bucket.requests, 2),
+        "tokens_available": round(bucket.tokens),
+    }
+
+
+async def status(conn):
+    now = datetime.now(timezone.utc)
+    return [
+        {
+            "backend": b.backend,
+            "rpm_limit": b.rpm,
+            "tpm_limit": b.tpm,
+            "requests_available": round(b.requests, 2),
+            "tokens_available": round(b.tokens),
+            "paused_until": b.paused_until.isoformat() if b.paused_until and b.paused_until > now else None,
+        }
+        for b in (Bucket(r, now) for r in await conn.fetch("SELECT * FROM rate_limit_buckets ORDER BY backend"))
+    ]
@@ -0,0 +1,153 @@
+import os
+import asyncio
+import logging
+
+import asyncpg
+
+LOGGER = logging.getLogger("aura.manager.registry")
+
+NOTIFY_CHANNEL = "models_changed"
+# Full reload as a safety net for notifications missed while the listener was down
+RELOAD_SECONDS = float(os.getenv("MODEL_REGISTRY_RELOAD_SECONDS", "300"))
+
+MODEL_COLUMNS = "id, name, kind, endpoint, is_active, COALESCE(suspended, FALSE) AS suspended, capabilities"
+
+
+class ModelRegistry:
+    """
+    In-process copy of the models table. Loaded once at startup; the
+    models_changed NOTIFY (see 025_models_changed.sql) names the model to
+    reload, so lookups by name or id never touch the database.
+    """
+
+    def __init__(self):
+        self.by_name = {}
+        self.by_id = {}
+        self._listener = None
+        self._task = None
+        self._dirty = set()
+        self._reload_all = asyncio.Event()
+        self._wake = asyncio.Event()
+
+    async def start(self, pool, dsn):
+        self.pool = pool
+        self.dsn = dsn
+        await self.load_all()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+        if self._listener and not self._listener.is_closed():
+            await self._listener.close()
+
+    def _put(self, row):
+        model = dict(row)
+        model["capabilities"] = list(model["capabilities"] or [])
+        old = self.by_name.get(model["name"])
+        if old and old["id"] != model["id"]:
+            self.by_id.pop(old["id"], None)
+        self.by_name[model["name"]] = model
+        self.by_id[model["id"]] = model
+
+    async def load_all(self):
+        async with self.pool.acquire() as conn:
+            rows = await conn.fetch(f"SELECT {MODEL_COLUMNS} FROM models ORDER BY id")
+        self.by_name, self.by_id = {}, {}
+        for r in rows:
+            self._put(r)
+        LOGGER.info(f"Model registry loaded: {len(self.by_name)} models")
+
+    async def load(self, names):
+        async with self.pool.acquire() as conn:
+            rows = await conn.fetch(
+                f"SELECT {MODEL_COLUMNS} FROM models WHERE name = ANY($1::text[])", list(names)
+            )
+        found = {r["name"] for r in rows}
+        for name in names:
+            if name not in found:
+                gone = self.by_name.pop(name, None)
+                if gone:
+                    self.by_id.pop(gone["id"], None)
+        for r in rows:
+            self._put(r)
+
+    def _notified(self, conn, pid, channel, payload):
+        if payload:
+            self._dirty.add(payload)
+        else:
+            self._reload_all.set()
+        self._wake.set()
+
+    async def _listen(self):
+        if self._listener is None or self._listener.is_closed():
+            self._listener = await asyncpg.connect(self.dsn)
+            await self._listener.add_listener(NOTIFY_CHANNEL, self._notified)
+            # anything may have changed while we weren't listening
+            self._reload_all.set()
+
+    async def _run(self):
+        while True:
+            self._wake.clear()
+            try:
+                await self._listen()
+                if self._reload_all.is_set():
+                    self._reload_all.clear()
+                    self._dirty.clear()
+                    await self.load_all()
+                elif self._dirty:
+                    names, self._dirty = self._dirty, set()
+                    await self.load(names)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                LOGGER.error(f"Model registry refresh failed: {e}")
+                self._listener = None
+                await asyncio.sleep(5)
+                continue
+            try:
+                await asyncio.wait_for(self._wake.wait(), RELOAD_SECONDS)
+            except asyncio.TimeoutError:
+                self._reload_all.set()
+
+    # --- lookups ---
+
+    def get(self, name):
+        return self.by_name.get(name)
+
+    def id_of(self, name):
+        model = self.by_name.get(name)
+        return model["id"] if model else None
+
+    async def resolve(self, name):
+        """get(), falling back to the DB for a model registered a moment ago."""
+        model = self.by_name.get(name)
+        if model is None:
+            await self.load([name])
+            model = self.by_name.get(name)
+        return model
+
+    def usable(self, name) -> bool:
+        model = self.by_name.get(name)
+        return bool(model and model["is_active"] and not model["suspended"])
+
+    def blocked(self, name) -> bool:
+        """Known to be retired or suspended (models the registry has never seen are not)."""
+        model = self.by_name.get(name)
+        return bool(model and (not model["is_active"] or model["suspended"]))
+
+    def usable_names(self, exclude=()):
+        return [
+            n for n, m in self.by_name.items()
+            if m["is_active"] and not m["suspended"] and n not in exclude
+        ]
+
+    def capabilities(self, name):
+        model = self.by_name.get(name)
+        return model["capabilities"] if model else []
+
+    def all(self):
+        return [self.by_id[i] for i in sorted(self.by_id)]
+
+
+registry = ModelRegistry()
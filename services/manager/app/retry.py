@@ -0,0 +1,181 @@
+import os
+import re
+import json
+import random
+import logging
+
+from .dag import cancel_dependents
+
+LOGGER = logging.getLogger("aura.manager.retry")
+
+# Retries after the first attempt before a transient failure is dead-lettered
+MAX_RETRIES = int(os.getenv("RETRY_MAX_RETRIES", "3"))
+BASE_DELAY_SECONDS = float(os.getenv("RETRY_BASE_DELAY_SECONDS", "15"))
+MAX_DELAY_SECONDS = float(os.getenv("RETRY_MAX_DELAY_SECONDS", "900"))
+METRICS_WINDOW_HOURS = float(os.getenv("RETRY_METRICS_WINDOW_HOURS", "24"))
+
+TRANSIENT = "transient"
+PERMANENT = "permanent"
+
+# HTTP statuses worth another attempt; any other 4xx is the request's own fault
+TRANSIENT_STATUS = {408, 409, 425, 429, 500, 502, 503, 504}
+# Exception class names reported by the workers' adapters (details.error_type)
+TRANSIENT_TYPES = {
+    "Timeout", "TimeoutError", "ReadTimeout", "ConnectTimeout", "TimeoutExpired",
+    "ConnectionError", "ConnectionRefusedError", "ConnectionResetError",
+    "RateLimited", "RateLimitError", "APITimeoutError", "APIConnectionError",
+    "InternalServerError", "ServiceUnavailable", "ResourceExhausted", "DeadlineExceeded",
+}
+TRANSIENT_MESSAGE = re.compile(
+    r"time[d ]?\s?out|rate.?limit|too many requests|\b(429|502|503|504)\b"
+    r"|connection (refused|reset|aborted|error)|temporarily unavailable"
+    r"|service unavailable|overloaded|try again",
+    re.IGNORECASE,
+)
+
+# job_events written for a failed attempt, by outcome
+EVENT_TYPES = {"QUEUED": "retry_scheduled", "FAILED": "failed", "DEAD_LETTER": "dead_lettered"}
+
+METRICS_SQL = """
+    SELECT details->>'model' AS model, details->>'failure' AS failure, event_type, COUNT(*) AS n
+    FROM job_events
+    WHERE event_type = ANY($1::text[]) AND created_at > now() - make_interval(hours => $2)
+    GROUP BY 1, 2, 3
+"""
+
+# A hedge duplicate that may still complete the original
+LIVE_HEDGE_SQL = """
+    SELECT EXISTS(SELECT 1 FROM jobs
+                  WHERE hedge_of = $1 AND status IN ('QUEUED', 'ASSIGNED', 'IN_PROGRESS'))
+"""
+
+BACKLOG_SQL = """
+    SELECT COUNT(*) FILTER (WHERE status = 'QUEUED' AND not_before > now()) AS backing_off,
+           COUNT(*) FILTER (WHERE status = 'DEAD_LETTER') AS dead_letter
+    FROM jobs
+    WHERE status IN ('QUEUED', 'DEAD_LETTER')
+"""
+
+
+def classify(details: dict):
+    """(TRANSIENT | PERMANENT, reason) for a failed attempt's report details."""
+    details = details or {}
+    status = details.get("status_code")
+    if isinstance(status, int):
+        if status in TRANSIENT_STATUS:
+            return TRANSIENT, f"HTTP {status}"
+        if 400 <= status < 500:
+            return PERMANENT, f"HTTP {status}"
+    error_type = details.get("error_type")
+    if error_type in TRANSIENT_TYPES:
+        return TRANSIENT, error_type
+    error = str(details.get("error") or "")
+    if TRANSIENT_MESSAGE.search(error):
+        return TRANSIENT, error[:200]
+    return PERMANENT, error[:200] or error_type or "unspecified failure"
+
+
+def backoff(retry_count: int) -> float:
+    """Seconds before retry number retry_count + 1: exponential, capped, with equal jitter."""
+    ceiling = min(MAX_DELAY_SECONDS, BASE_DELAY_SECONDS * 2 ** retry_count)
+    return ceiling / 2 + random.uniform(0, ceiling / 2)
+
+
+async def handle_failure(conn, job_id, job, details: dict) -> dict:
+    """
+    Run in complete_job's transaction for a failed attempt of a running job
+    (job: its locked row). Requeues it with backoff, or ends it as FAILED or
+    DEAD_LETTER and cancels the successors that were waiting on it, unless a
+    hedge duplicate still running may complete it. Hedge duplicates are never
+    retried; the last copy of a pair to fail cancels the original's successors.
+    Returns the outcome.
+    """
+    failure, reason = classify(details)
+    retries = job["retry_count"] or 0
+    delay = None
+    if job["hedge_of"] is not None:
+        status, reason = "FAILED", f"hedge duplicate: {reason}"
+    elif failure == PERMANENT:
+        status = "FAILED"
+    elif retries >= MAX_RETRIES:
+        status = "DEAD_LETTER"
+    else:
+        status = "QUEUED"
+        delay = backoff(retries)
+
+    if status == "QUEUED":
+        not_before = await conn.fetchval(
+            """
+            UPDATE jobs SET status = 'QUEUED', assigned_model = NULL, started_at = NULL,
+                            retry_count = retry_count + 1,
+                            not_before = now() + make_interval(secs => $2)
+            WHERE id = $1
+            RETURNING not_before
+        """,
+            job_id,
+            delay,
+        )
+        retries += 1
+    else:
+        not_before = None
+        await conn.execute(
+            "UPDATE jobs SET status = $2, completed_at = now() WHERE id = $1", job_id, status
+        )
+    cancelled = []
+    if status != "QUEUED":
+        if job["hedge_of"] is None:
+            if not await conn.fetchval(LIVE_HEDGE_SQL, job_id):
+                cancelled = await cancel_dependents(conn, job_id, status)
+        else:
+            original = await conn.fetchval("SELECT status FROM jobs WHERE id = $1", job["hedge_of"])
+            if original in ("FAILED", "DEAD_LETTER") and not await conn.fetchval(
+                LIVE_HEDGE_SQL, job["hedge_of"]
+            ):
+                cancelled = await cancel_dependents(conn, job["hedge_of"], original)
+
+    outcome = {
+        "status": status,
+        "failure": failure,
+        "reason": reason,
+        "model": job["assigned_model"],
+        "retry_count": retries,
+        "max_retries": MAX_RETRIES,
+        "not_before": not_before.isoformat() if not_before else None,
+        "cancelled_dependents": [str(c) for c in cancelled],
+    }
+    await conn.execute(
+        "INSERT INTO job_events (job_id, event_type, details) VALUES ($1, $2, $3::jsonb)",
+        job_id,
+        EVENT_TYPES[status],
+        json.dumps({**outcome, "success": False, "details": details}),
+    )
+    if status == "QUEUED":
+        LOGGER.info(
+            f"Job {job_id} failed ({reason}) on {job['assigned_model']}; "
+            f"retry {retries}/{MAX_RETRIES} in {delay:.0f}s"
+        )
+    else:
+        LOGGER.warning(f"Job {job_id} {status} on {job['assigned_model']} ({failure}: {reason})")
+    return outcome
+
+
+async def metrics(conn, hours: float = METRICS_WINDOW_HOURS) -> dict:
+    """Failed attempts per model in the window, by outcome and failure class."""
+    models = {}
+    for r in await conn.fetch(METRICS_SQL, list(EVENT_TYPES.values()), hours):
+        m = models.setdefault(
+            r["model"] or "unknown",
+            {"retried": 0, "failed": 0, "dead_lettered": 0, TRANSIENT: 0, PERMANENT: 0},
+        )
+        outcome = {"retry_scheduled": "retried"}.get(r["event_type"], r["event_type"])
+        m[outcome] += r["n"]
+        if r["failure"] in (TRANSIENT, PERMANENT):
+            m[r["failure"]] += r["n"]
+    backlog = await conn.fetchrow(BACKLOG_SQL)
+    return {
+        "window_hours": hours,
+        "max_retries": MAX_RETRIES,
+        "backing_off": backlog["backing_off"],
+        "dead_letter": backlog["dead_letter"],
+        "models": dict(sorted(models.items())),
+    }
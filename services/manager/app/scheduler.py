@@ -1,12 +1,20 @@
 import os
 import json
+import random
 import asyncio
 import logging
 import requests
 from .leader import LeaderElector
+from .tracing import spans, trace_headers
+from .fairqueue import FairQueue
+from .hedging import Hedger, HEDGING_ENABLED
+from .registry import registry
+from .stats import stats
 
 LOGGER = logging.getLogger("aura.manager.scheduler")
 ROUTER_URL = os.getenv("ROUTER_URL", "http://router:8000")
+BATCH_SIZE = int(os.getenv("SCHEDULER_BATCH_SIZE", "10"))
+INTERVAL_SECONDS = float(os.getenv("SCHEDULER_INTERVAL_SECONDS", "2"))
 
 
 class Scheduler:
@@ -14,6 +22,8 @@ class Scheduler:
         self.leader = leader
         self.running = False
         self.task = None
+        self.queue = FairQueue()
+        self.hedger = Hedger()
 
     async def start(self):
         self.running = True
@@ -35,28 +45,44 @@ class Scheduler:
 
                 pool = await init_db_pool()
                 async with pool.acquire() as conn:
-                    # Find QUEUED jobs
-                    jobs = await conn.fetch(
-                        "SELECT id, role FROM jobs WHERE status = 'QUEUED' ORDER BY created_at LIMIT 10"
-                    )
+                    # Next QUEUED jobs, shared fairly across projects
+                    jobs = await self.queue.next_batch(conn, BATCH_SIZE)
 
                     for job in jobs:
                         job_id = job["id"]
                         role = job["role"]
+                        trace_id = job["trace_id"]
 
-                        # Try Router first
-                        model_name = await self._route_via_router(job_id, role)
+                        # Try Router first (it learns from outcomes per route context)
+                        with spans.span("route", job_id, trace_id) as attrs:
+                            routed = await self._route_via_router(job_id, role, trace_id)
+                            method = "router" if routed else "fallback"
+                            attrs["method"] = method
 
                         # Fallback to role-based
-                        if not model_name:
+                        if routed:
+                            model_name = routed["model"]
+                        else:
                             model_name = self._select_model_for_role(role)
 
+                        # never hand work to a suspended or retired model
+                        if registry.blocked(model_name):
+                            model_name = self._usable_alternative(role, model_name)
+                            method = "registry"
+                            if not model_name:
+                                LOGGER.warning(f"No usable model for job {job_id} ({role}); leaving it queued")
+                                continue
+
                         # Assign
-                        await conn.execute(
-                            "UPDATE jobs SET assigned_model = $1, status = 'ASSIGNED' WHERE id = $2",
+                        res = await conn.execute(
+                            "UPDATE jobs SET assigned_model = $1, status = 'ASSIGNED' WHERE id = $2 AND status = 'QUEUED'",
                             model_name,
                             job_id,
                         )
+                        if res != "UPDATE 1":
+                            # claimed, cancelled or requeued meanwhile: nothing was assigned
+                            continue
+                        stats.transition("QUEUED", "ASSIGNED")
 
                         # Log event
                         await conn.execute(
@@ -65,20 +91,32 @@ class Scheduler:
                             json.dumps(
                                 {
                                     "assigned_model": model_name,
-                                    "method": "router" if model_name else "fallback",
+                                    "method": method,
+                                    "route_context": routed.get("context") if routed else None,
                                 }
                             ),
                         )
 
                         LOGGER.info(f"Assigned job {job_id} to {model_name}")
 
+                    if HEDGING_ENABLED:
+                        await self.hedger.tick(conn, self._pick_hedge_model)
+
             except Exception as e:
                 LOGGER.error(f"Scheduler error: {e}")
 
-            await asyncio.sleep(2)
+            await asyncio.sleep(INTERVAL_SECONDS)
 
-    async def _route_via_router(self, job_id, role):
-        """Call Router service for intelligent model selection"""
+    async def _pick_hedge_model(self, job, exclude):
+        """A second eligible model for a hedge: the router's pick, else any other active model."""
+        routed = await self._route_via_router(job["id"], job["role"], job["trace_id"], exclude)
+        if routed and routed["model"] not in exclude and not registry.blocked(routed["model"]):
+            return routed["model"]
+        candidates = registry.usable_names(exclude)
+        return random.choice(candidates) if candidates else None
+
+    async def _route_via_router(self, job_id, role, trace_id=None, exclude=None):
+        """Call Router service for model selection. Returns its response (model, context, ...) or None."""
         try:
             # Map role to requirements
             requirements_map = {
@@ -91,7 +129,13 @@ class Scheduler:
 
             response = requests.post(
                 f"{ROUTER_URL}/route",
-                json={"requirements": requirements, "priority": "normal"},
+                json={
+                    "requirements": requirements,
+                    "priority": "normal",
+                    "exclude_models": exclude or [],
+                    "role": role,
+                },
+                headers=trace_headers(trace_id),
                 timeout=2,
             )
 
@@ -100,12 +144,20 @@ class Scheduler:
                 LOGGER.info(
                     f"Router selected {data['model']} for job {job_id}: {data['reason']}"
                 )
-                return data["model"]
+                return data
         except Exception as e:
             LOGGER.warning(f"Router unavailable, using fallback: {e}")
 
         return None
 
+    def _usable_alternative(self, role, blocked_model):
+        """The role's default model if usable, else any usable model (from the registry cache)."""
+        default = self._select_model_for_role(role)
+        if default != blocked_model and not registry.blocked(default):
+            return default
+        candidates = registry.usable_names([blocked_model])
+        return random.choice(candidates) if candidates else None
+
     def _select_model_for_role(self, role: str) -> str:
         """Fallback role-based selection"""
         mapping = {
@@ -0,0 +1,145 @@
+import json
+import uuid
+import decimal
+from datetime import date, datetime
+
+from fastapi import Request, Response
+from fastapi.responses import StreamingResponse
+
+try:
+    import orjson
+except ImportError:  # stdlib json with the same type coverage, just slower
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # MessagePack negotiation is disabled
+    msgpack = None
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+MSGPACK_TYPES = (MSGPACK, "application/x-msgpack")
+# rows pulled from the server-side cursor per round trip
+STREAM_PREFETCH = 500
+
+
+def _default(obj):
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, uuid.UUID):
+        return str(obj)
+    if isinstance(obj, decimal.Decimal):
+        return float(obj)
+    if isinstance(obj, RawJSON):
+        return json.loads(obj.text)
+    raise TypeError(f"{type(obj).__name__} is not serializable")
+
+
+class RawJSON:
+    """
+    JSON text (e.g. a JSONB column as asyncpg returns it) embedded as-is in a
+    JSON response. Only MessagePack and the stdlib fallback have to parse it.
+    """
+
+    __slots__ = ("text",)
+
+    def __init__(self, text: str):
+        self.text = text
+
+
+_has_fragment = orjson is not None and hasattr(orjson, "Fragment")
+
+
+def dumps(obj) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj, default=_orjson_default)
+    return json.dumps(obj, default=_default, separators=(",", ":")).encode()
+
+
+def _orjson_default(obj):
+    if isinstance(obj, RawJSON):
+        return orjson.Fragment(obj.text) if _has_fragment else orjson.loads(obj.text)
+    # asyncpg's UUID subclasses uuid.UUID, which orjson only handles natively by exact type
+    return _default(obj)
+
+
+def _msgpack_default(obj):
+    if isinstance(obj, RawJSON):
+        return orjson.loads(obj.text) if orjson is not None else json.loads(obj.text)
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, uuid.UUID):
+        return str(obj)
+    if isinstance(obj, decimal.Decimal):
+        return float(obj)
+    raise TypeError(f"{type(obj).__name__} is not serializable")
+
+
+def packb(obj) -> bytes:
+    return msgpack.packb(obj, default=_msgpack_default, use_bin_type=True)
+
+
+def wants_msgpack(request: Request) -> bool:
+    if msgpack is None:
+        return False
+    accept = request.headers.get("accept", "")
+    return any(t in accept for t in MSGPACK_TYPES)
+
+
+def row_dict(record, jsonb=()) -> dict:
+    """asyncpg Record -> dict, with JSONB columns passed through unparsed."""
+    d = dict(record)
+    for key in jsonb:
+        if d.get(key) is not None:
+            d[key] = RawJSON(d[key])
+    return d
+
+
+class FastJSONResponse(Response):
+    media_type = JSON
+
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+def respond(request: Request, content, status_code: int = 200) -> Response:
+    """JSON, or MessagePack when the client asked for it."""
+    if wants_msgpack(request):
+        return Response(packb(content), status_code=status_code, media_type=MSGPACK)
+    return FastJSONResponse(content, status_code=status_code)
+
+
+def stream_rows(request: Request, pool, sql: str, *args, jsonb=()) -> Response:
+    """
+    List response fed from a server-side cursor. JSON is written row by row as
+    a JSON array, so the full result is never materialised. MessagePack needs
+    the array length up front and is sent in one piece.
+    """
+    if wants_msgpack(request):
+
+        async def packed():
+            async with pool.acquire() as conn:
+                async with conn.transaction():
+                    rows = [
+                        row_dict(r, jsonb)
+                        async for r in conn.cursor(sql, *args, prefetch=STREAM_PREFETCH)
+                    ]
+            yield packb(rows)
+
+        return StreamingResponse(packed(), media_type=MSGPACK)
+
+    async def rows_json():
+        first = True
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                async for r in conn.cursor(sql, *args, prefetch=STREAM_PREFETCH):
+                    yield (b"[" if first else b",") + dumps(row_dict(r, jsonb))
+                    first = False
+        yield b"[]" if first else b"]"
+
+    return StreamingResponse(rows_json(), media_type=JSON)
+
+
+def sse_event(data, event: str = None) -> bytes:
+    head = f"event: {event}\n".encode() if event else b""
+    return head + b"data: " + dumps(data) + b"\n\n"
@@ -0,0 +1,265 @@
+import os
+import time
+import asyncio
+import logging
+from datetime import datetime, timezone
+
+LOGGER = logging.getLogger("aura.manager.stats")
+
+WINDOW_MINUTES = int(os.getenv("STATS_WINDOW_MINUTES", "60"))
+# Full reseed from the DB: picks up transitions made by other replicas and the archiver
+RECONCILE_SECONDS = float(os.getenv("STATS_RECONCILE_SECONDS", "60"))
+
+# job_events type -> status the job entered ('created' counts intake, whatever its status)
+EVENT_STATUS = {
+    "created": "created",
+    "assigned": "ASSIGNED",
+    "assigned_manual": "ASSIGNED",
+    "claimed": "IN_PROGRESS",
+    "released": "QUEUED",
+    "hedge_lost": "CANCELLED",
+    "retry_scheduled": "QUEUED",
+    "failed": "FAILED",
+    "dead_lettered": "DEAD_LETTER",
+    "requeued": "QUEUED",
+    "dependency_failed": "CANCELLED",
+    "dependency_requeued": "BLOCKED",
+}
+
+GAUGE_SQL = "SELECT status, COUNT(*) AS n FROM jobs GROUP BY status"
+
+TRANSITIONS_SQL = """
+    SELECT floor(extract(epoch FROM created_at) / 60)::bigint AS minute,
+           CASE WHEN event_type <> 'completed' THEN event_type
+                WHEN details->>'success' = 'true' THEN 'COMPLETED'
+                ELSE 'SUBMITTED' END AS kind,
+           COUNT(*) AS n
+    FROM job_events
+    WHERE created_at > now() - make_interval(mins => $1)
+      AND event_type = ANY($2::text[])
+    GROUP BY 1, 2
+"""
+
+# A hedged original completed by its duplicate is the duplicate's run, not its own.
+# Failed attempts may have been requeued since, so they are counted from their events.
+COMPLETIONS_SQL = """
+    SELECT floor(extract(epoch FROM j.completed_at) / 60)::bigint AS minute,
+           j.assigned_model AS model,
+           COUNT(*) AS ok,
+           0 AS failed,
+           COALESCE(SUM(extract(epoch FROM j.completed_at - j.started_at)), 0) AS gen_sum,
+           COUNT(j.started_at) AS gen_n
+    FROM jobs j
+    WHERE j.completed_at > now() - make_interval(mins => $1)
+      AND j.status = 'COMPLETED'
+      AND j.assigned_model IS NOT NULL
+      AND NOT EXISTS (SELECT 1 FROM jobs h WHERE h.hedge_of = j.id AND h.status = 'COMPLETED')
+    GROUP BY 1, 2
+    UNION ALL
+    SELECT floor(extract(epoch FROM created_at) / 60)::bigint, details->>'model', 0, COUNT(*), 0, 0
+    FROM job_events
+    WHERE created_at > now() - make_interval(mins => $1)
+      AND event_type IN ('retry_scheduled', 'failed', 'dead_lettered')
+      AND details->>'model' IS NOT NULL
+    GROUP BY 1, 2
+"""
+
+ALERTS_SQL = """
+    SELECT floor(extract(epoch FROM created_at) / 60)::bigint AS minute,
+           COALESCE(details->>'severity', 'unknown') AS severity,
+           COUNT(*) AS n
+    FROM audit_log
+    WHERE action = 'alert' AND created_at > now() - make_interval(mins => $1)
+    GROUP BY 1, 2
+"""
+
+
+def _minute() -> int:
+    return int(time.time() // 60)
+
+
+class Bucket:
+    __slots__ = ("minute", "entered", "models", "alerts")
+
+    def __init__(self, minute: int):
+        self.minute = minute
+        self.entered = {}
+        # model -> [completed, failed, generation seconds, timed runs]
+        self.models = {}
+        self.alerts = {}
+
+
+class MinuteRing:
+    """Fixed number of per-minute buckets; a slot is reused once its minute falls out of the window."""
+
+    def __init__(self, minutes: int):
+        self.slots = [None] * minutes
+
+    def at(self, minute: int) -> Bucket:
+        i = minute % len(self.slots)
+        bucket = self.slots[i]
+        if bucket is None or bucket.minute != minute:
+            bucket = self.slots[i] = Bucket(minute)
+        return bucket
+
+    def window(self, now: int):
+        """Live buckets, oldest first."""
+        return sorted(
+            (b for b in self.slots if b is not None and now - len(self.slots) < b.minute <= now),
+            key=lambda b: b.minute,
+        )
+
+
+def _add(d: dict, key, n=1):
+    d[key] = d.get(key, 0) + n
+
+
+class StatsBoard:
+    """
+    Dashboard statistics kept in memory: the current job count per status plus
+    WINDOW_MINUTES per-minute buckets of status transitions, completions and
+    generation time per model, and alerts per severity. The request paths that
+    move jobs feed it as they commit; seed() rebuilds it from the DB at startup
+    and every RECONCILE_SECONDS. /stats is served from here without a query,
+    and the rendered snapshot is reused until something changes or the minute
+    rolls over.
+    """
+
+    def __init__(self, minutes: int = WINDOW_MINUTES):
+        self.minutes = minutes
+        self.by_status = {}
+        self.ring = MinuteRing(minutes)
+        self.seeded_at = None
+        self._task = None
+        self._snapshot = None
+
+    async def start(self, pool):
+        self.pool = pool
+        try:
+            await self.seed()
+        except Exception as e:
+            LOGGER.error(f"Stats seed failed: {e}")
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(RECONCILE_SECONDS)
+            try:
+                await self.seed()
+            except Exception as e:
+                LOGGER.error(f"Stats reconcile failed: {e}")
+
+    async def seed(self):
+        async with self.pool.acquire() as conn:
+            gauge = await conn.fetch(GAUGE_SQL)
+            events = await conn.fetch(
+                TRANSITIONS_SQL, self.minutes, list(EVENT_STATUS) + ["completed"]
+            )
+            runs = await conn.fetch(COMPLETIONS_SQL, self.minutes)
+            alerts = await conn.fetch(ALERTS_SQL, self.minutes)
+        ring = MinuteRing(self.minutes)
+        for r in events:
+            _add(ring.at(r["minute"]).entered, EVENT_STATUS.get(r["kind"], r["kind"]), r["n"])
+        for r in runs:
+            run = ring.at(r["minute"]).models.setdefault(r["model"], [0, 0, 0.0, 0])
+            run[0] += r["ok"]
+            run[1] += r["failed"]
+            run[2] += float(r["gen_sum"])
+            run[3] += r["gen_n"]
+        for r in alerts:
+            _add(ring.at(r["minute"]).alerts, r["severity"], r["n"])
+        self.by_status = {r["status"]: r["n"] for r in gauge}
+        self.ring = ring
+        self.seeded_at = datetime.now(timezone.utc)
+        self._snapshot = None
+
+    # --- feed ---
+
+    def created(self, by_status: dict):
+        """New jobs: {status: n}."""
+        bucket = self.ring.at(_minute())
+        for status, n in by_status.items():
+            if n:
+                _add(self.by_status, status, n)
+                _add(bucket.entered, "created", n)
+        self._snapshot = None
+
+    def transition(self, old, new, n: int = 1):
+        if old == new or not n:
+            return
+        if old is not None:
+            self.by_status[old] = max(self.by_status.get(old, 0) - n, 0)
+        _add(self.by_status, new, n)
+        self.entered(new, n)
+
+    def entered(self, status, n: int = 1):
+        """Count a transition into status in this minute's bucket (the status gauge is left alone)."""
+        _add(self.ring.at(_minute()).entered, status, n)
+        self._snapshot = None
+
+    def completed(self, model, success: bool, seconds=None):
+        if not model:
+            return
+        run = self.ring.at(_minute()).models.setdefault(model, [0, 0, 0.0, 0])
+        run[0 if success else 1] += 1
+        if seconds is not None:
+            run[2] += seconds
+            run[3] += 1
+        self._snapshot = None
+
+    def alert(self, severity):
+        _add(self.ring.at(_minute()).alerts, severity or "unknown")
+        self._snapshot = None
+
+    # --- read ---
+
+    def snapshot(self) -> dict:
+        now = _minute()
+        if self._snapshot is not None and self._snapshot[0] == now:
+            return self._snapshot[1]
+        entered, alerts, models, series = {}, {}, {}, []
+        for b in self.ring.window(now):
+            for status, n in b.entered.items():
+                _add(entered, status, n)
+            for severity, n in b.alerts.items():
+                _add(alerts, severity, n)
+            for model, run in b.models.items():
+                total = models.setdefault(model, [0, 0, 0.0, 0])
+                for i in range(4):
+                    total[i] += run[i]
+            series.append(
+                {
+                    "minute": datetime.fromtimestamp(b.minute * 60, timezone.utc).isoformat(),
+                    "entered": dict(b.entered),
+                    "completed": sum(run[0] for run in b.models.values()),
+                    "failed": sum(run[1] for run in b.models.values()),
+                    "alerts": dict(b.alerts),
+                }
+            )
+        snap = {
+            "window_minutes": self.minutes,
+            "seeded_at": self.seeded_at.isoformat() if self.seeded_at else None,
+            "jobs": {
+                "by_status": {s: n for s, n in sorted(self.by_status.items()) if n},
+                "entered": entered,
+            },
+            "models": {
+                model: {
+                    "completed": ok,
+                    "failed": failed,
+                    "avg_generation_s": round(gen_sum / gen_n, 2) if gen_n else None,
+                }
+                for model, (ok, failed, gen_sum, gen_n) in sorted(models.items())
+            },
+            "alerts": alerts,
+            "series": series,
+        }
+        self._snapshot = (now, snap)
+        return snap
+
+
+stats = StatsBoard()
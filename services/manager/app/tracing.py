@@ -0,0 +1,151 @@
+import os
+import json
+import time
+import uuid
+import asyncio
+import logging
+import contextvars
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Optional
+
+from .db import init_db_pool
+
+LOGGER = logging.getLogger("aura.manager.tracing")
+
+# Propagated on every service-to-service call; one trace per PRD intake
+TRACE_HEADER = "X-Aura-Trace-Id"
+
+FLUSH_SECONDS = float(os.getenv("TRACE_FLUSH_SECONDS", "1.0"))
+FLUSH_MAX_SPANS = int(os.getenv("TRACE_FLUSH_MAX_SPANS", "500"))
+# Spans are dropped (not queued without bound) if the DB falls behind
+BUFFER_LIMIT = int(os.getenv("TRACE_BUFFER_LIMIT", "20000"))
+
+SPAN_COLUMNS = ["trace_id", "job_id", "stage", "service", "started_at", "duration_ms", "attrs"]
+
+current_trace: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar(
+    "aura_trace_id", default=None
+)
+
+
+def new_trace_id() -> str:
+    return uuid.uuid4().hex
+
+
+def adopt_trace(trace_id: Optional[str]) -> Optional[str]:
+    """Fall back to the job's stored trace when the caller sent no header."""
+    if not current_trace.get() and trace_id:
+        current_trace.set(trace_id)
+    return current_trace.get()
+
+
+def trace_headers(trace_id: Optional[str] = None) -> dict:
+    trace_id = trace_id or current_trace.get()
+    return {TRACE_HEADER: trace_id} if trace_id else {}
+
+
+class SpanBuffer:
+    """
+    Collects spans in memory and writes them with one COPY per flush, so tracing
+    adds no round trip to the request path.
+    """
+
+    def __init__(self, service: str = "manager"):
+        self.service = service
+        self._spans = []
+        self._task = None
+        self._wake = asyncio.Event()
+        self.dropped = 0
+
+    def record(self, trace_id, job_id, stage, started_at, duration_ms, service=None, attrs=None):
+        if not trace_id:
+            return
+        if len(self._spans) >= BUFFER_LIMIT:
+            self.dropped += 1
+            return
+        self._spans.append(
+            (
+                trace_id,
+                uuid.UUID(str(job_id)) if job_id else None,
+                stage,
+                service or self.service,
+                started_at,
+                float(duration_ms),
+                json.dumps(attrs) if attrs else None,
+            )
+        )
+        if len(self._spans) >= FLUSH_MAX_SPANS:
+            self._wake.set()
+
+    @contextmanager
+    def span(self, stage, job_id=None, trace_id=None, **attrs):
+        """Time the enclosed block; attrs may be filled in by the caller while inside."""
+        started_at = datetime.now(timezone.utc)
+        t0 = time.perf_counter()
+        try:
+            yield attrs
+        except Exception as e:
+            attrs["error"] = type(e).__name__
+            raise
+        finally:
+            self.record(
+                trace_id or current_trace.get(),
+                job_id,
+                stage,
+                started_at,
+                (time.perf_counter() - t0) * 1000,
+                attrs=attrs,
+            )
+
+    def record_reported(self, trace_id, job_id, spans, service):
+        """Spans sent by a worker: [{stage, started_at (ISO), duration_ms, attrs}]."""
+        for s in spans or []:
+            try:
+                started_at = datetime.fromisoformat(s["started_at"])
+                self.record(
+                    trace_id, job_id, s["stage"], started_at, s["duration_ms"],
+                    service=service, attrs=s.get("attrs"),
+                )
+            except (KeyError, TypeError, ValueError) as e:
+                LOGGER.debug(f"Ignoring malformed span from {service}: {e}")
+
+    async def flush(self):
+        if not self._spans:
+            return
+        batch, self._spans = self._spans, []
+        pool = await init_db_pool()
+        async with pool.acquire() as conn:
+            await conn.copy_records_to_table("job_spans", records=batch, columns=SPAN_COLUMNS)
+
+    async def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        try:
+            await self.flush()
+        except Exception as e:
+            LOGGER.error(f"Final span flush failed: {e}")
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), FLUSH_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                LOGGER.error(f"Span flush failed: {e}")
+            if self.dropped:
+                LOGGER.warning(f"Dropped {self.dropped} spans (buffer full)")
+                self.dropped = 0
+
+
+spans = SpanBuffer()
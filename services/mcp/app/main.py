@@ -1,25 +1,276 @@
-from fastapi import FastAPI
-import requests
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+import httpx
+import asyncio
+import hashlib
+import json
+import time
 import os
+import uuid
 
 MANAGER_URL = os.getenv("MANAGER_URL", "http://manager:8000")
+TRACE_HEADER = "X-Aura-Trace-Id"
+DIRECTOR_HEADER = "X-Aura-Director-Token"
+# passed through to the Manager, which replays the first response for a repeated key
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+# identical commands within this window share one submission
+COALESCE_TTL_SECONDS = float(os.getenv("MCP_COALESCE_TTL_SECONDS", "10"))
+STREAM_POLL_SECONDS = float(os.getenv("MCP_STREAM_POLL_SECONDS", "1"))
+STREAM_TIMEOUT_SECONDS = float(os.getenv("MCP_STREAM_TIMEOUT_SECONDS", "3600"))
+KEEPALIVE_SECONDS = 15
+
+TERMINAL_STATUSES = {"COMPLETED", "SUBMITTED", "FAILED", "CANCELLED", "DEAD_LETTER"}
+# 4xx answers worth polling again; any other one ends the watch
+RETRYABLE_STATUSES = {408, 425, 429}
 
 app = FastAPI(title="Aura MCP Bridge")
 
+client: httpx.AsyncClient = None
+
+# command key -> future of the in-flight submission
+_inflight = {}
+# command key -> (expires_at, result) for recently completed submissions
+_recent = {}
+# prd_id -> PrdWatch shared by every stream on that PRD
+_watches = {}
+
+
+@app.on_event("startup")
+async def startup():
+    global client
+    client = httpx.AsyncClient(
+        base_url=MANAGER_URL,
+        timeout=httpx.Timeout(30.0, connect=5.0),
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+    )
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    for watch in list(_watches.values()):
+        watch.task.cancel()
+    if client:
+        await client.aclose()
+
+
+class Busy(Exception):
+    """The Manager refused the PRD under backpressure (429); passed through to the IDE."""
+
+    def __init__(self, detail, retry_after: str):
+        super().__init__(f"manager busy, retry after {retry_after}s")
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+def busy_response(e: Busy, trace_id: str):
+    return JSONResponse(
+        status_code=429,
+        content={"error": str(e), "detail": e.detail, "trace_id": trace_id},
+        headers={"Retry-After": e.retry_after, TRACE_HEADER: trace_id},
+    )
+
+
+def command_key(payload: dict) -> str:
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+async def submit(payload: dict, trace_id: str, director_token: str = None, idempotency_key: str = None):
+    """
+    Forward a command to the Manager once. Concurrent or recently repeated
+    identical commands get the same result instead of creating duplicate jobs.
+    Returns (result, coalesced).
+    """
+    # Director submissions bypass backpressure, so they never share a non-Director result
+    key = command_key(payload) + (":director" if director_token else "")
+    now = time.monotonic()
+    cached = _recent.get(key)
+    if cached and cached[0] > now:
+        return cached[1], True
+    if key in _inflight:
+        return await asyncio.shield(_inflight[key]), True
+
+    fut = asyncio.get_running_loop().create_future()
+    _inflight[key] = fut
+    try:
+        headers = {TRACE_HEADER: trace_id}
+        if director_token:
+            headers[DIRECTOR_HEADER] = director_token
+        if idempotency_key:
+            headers[IDEMPOTENCY_HEADER] = idempotency_key
+        r = await client.post("/prds", json=payload, headers=headers)
+        if r.status_code == 429:
+            raise Busy(r.json().get("detail"), r.headers.get("Retry-After", "1"))
+        r.raise_for_status()
+        result = r.json()
+        for k in [k for k, (exp, _) in _recent.items() if exp <= now]:
+            del _recent[k]
+        _recent[key] = (now + COALESCE_TTL_SECONDS, result)
+        fut.set_result(result)
+        return result, False
+    except Exception as e:
+        fut.set_exception(e)
+        fut.exception()  # waiters re-raise it; don't warn when there are none
+        raise
+    finally:
+        _inflight.pop(key, None)
+
 
 @app.post("/mcp/command")
-def mcp_command(payload: dict):
+async def mcp_command(payload: dict, request: Request, response: Response):
     """
     IDE -> MCP -> Manager
     Forwards instructions to Manager to create jobs.
+    The trace starts here (unless the IDE sent one) and follows the job downstream.
     """
-    # In a real scenario, this might validate keys or transform payload
+    trace_id = request.headers.get(TRACE_HEADER) or uuid.uuid4().hex
+    response.headers[TRACE_HEADER] = trace_id
     try:
-        r = requests.post(f"{MANAGER_URL}/prds", json=payload, timeout=30)
-        r.raise_for_status()
-        return r.json()
+        result, coalesced = await submit(
+            payload,
+            trace_id,
+            request.headers.get(DIRECTOR_HEADER),
+            request.headers.get(IDEMPOTENCY_HEADER),
+        )
+        return {**result, "coalesced": coalesced}
+    except Busy as e:
+        return busy_response(e, trace_id)
+    except Exception as e:
+        return {"error": str(e), "trace_id": trace_id}
+
+
+class PrdWatch:
+    """
+    Polls the Manager for one PRD's jobs and fans status transitions out to every
+    subscribed stream, so N IDE windows watching a PRD cost one poll loop.
+    """
+
+    def __init__(self, prd_id: str):
+        self.prd_id = prd_id
+        self.jobs = {}
+        self.subscribers = set()
+        self.done = False
+        self.task = asyncio.create_task(self.run())
+
+    def subscribe(self) -> asyncio.Queue:
+        q = asyncio.Queue()
+        if self.jobs:
+            q.put_nowait(("status", {"prd_id": self.prd_id, "jobs": list(self.jobs.values())}))
+        self.subscribers.add(q)
+        return q
+
+    def unsubscribe(self, q):
+        self.subscribers.discard(q)
+
+    def publish(self, event, data):
+        for q in self.subscribers:
+            q.put_nowait((event, data))
+
+    async def run(self):
+        deadline = time.monotonic() + STREAM_TIMEOUT_SECONDS
+        try:
+            while time.monotonic() < deadline:
+                if not self.subscribers:
+                    return
+                try:
+                    r = await client.get(f"/prds/{self.prd_id}/jobs")
+                    # the request itself is wrong (unknown or malformed id): polling won't fix it
+                    if 400 <= r.status_code < 500 and r.status_code not in RETRYABLE_STATUSES:
+                        error = "unknown prd" if r.status_code == 404 else f"HTTP {r.status_code}: {r.text[:200]}"
+                        self.publish("error", {"prd_id": self.prd_id, "error": error})
+                        return
+                    r.raise_for_status()
+                    jobs = r.json()
+                except httpx.HTTPError as e:
+                    self.publish("error", {"prd_id": self.prd_id, "error": str(e)})
+                    await asyncio.sleep(STREAM_POLL_SECONDS)
+                    continue
+
+                changed = []
+                for j in jobs:
+                    prev = self.jobs.get(j["id"])
+                    if not prev or prev["status"] != j["status"]:
+                        changed.append(j)
+                    self.jobs[j["id"]] = j
+                if changed:
+                    self.publish("status", {"prd_id": self.prd_id, "jobs": changed})
+
+                if jobs and all(j["status"] in TERMINAL_STATUSES for j in jobs):
+                    counts = {}
+                    for j in jobs:
+                        counts[j["status"]] = counts.get(j["status"], 0) + 1
+                    self.publish("done", {"prd_id": self.prd_id, "statuses": counts})
+                    return
+                await asyncio.sleep(STREAM_POLL_SECONDS)
+            self.publish("timeout", {"prd_id": self.prd_id})
+        finally:
+            self.done = True
+            self.publish(None, None)
+            _watches.pop(self.prd_id, None)
+
+
+def watch_prd(prd_id: str) -> PrdWatch:
+    watch = _watches.get(prd_id)
+    if watch is None or watch.done:
+        watch = _watches[prd_id] = PrdWatch(prd_id)
+    return watch
+
+
+def sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+async def progress_events(request: Request, prd_id: str, first=None):
+    if first:
+        yield first
+    watch = watch_prd(prd_id)
+    q = watch.subscribe()
+    try:
+        while True:
+            try:
+                event, data = await asyncio.wait_for(q.get(), KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                if await request.is_disconnected():
+                    return
+                yield ": keepalive\n\n"
+                continue
+            if event is None:
+                return
+            yield sse(event, data)
+    finally:
+        watch.unsubscribe(q)
+
+
+@app.get("/mcp/prds/{prd_id}/stream")
+async def prd_stream(prd_id: str, request: Request):
+    """SSE: per-task status transitions for a PRD until every task is terminal."""
+    return StreamingResponse(progress_events(request, prd_id), media_type="text/event-stream")
+
+
+@app.post("/mcp/command/stream")
+async def mcp_command_stream(payload: dict, request: Request):
+    """Submit a command and keep the connection open for its progress (SSE)."""
+    trace_id = request.headers.get(TRACE_HEADER) or uuid.uuid4().hex
+    headers = {TRACE_HEADER: trace_id}
+    try:
+        result, coalesced = await submit(
+            payload,
+            trace_id,
+            request.headers.get(DIRECTOR_HEADER),
+            request.headers.get(IDEMPOTENCY_HEADER),
+        )
+    except Busy as e:
+        return busy_response(e, trace_id)
     except Exception as e:
-        return {"error": str(e)}
+        error = sse("error", {"error": str(e), "trace_id": trace_id})
+        return StreamingResponse(iter([error]), media_type="text/event-stream", headers=headers)
+
+    accepted = sse("accepted", {**result, "coalesced": coalesced})
+    return StreamingResponse(
+        progress_events(request, result["root_job_id"], accepted),
+        media_type="text/event-stream",
+        headers=headers,
+    )
 
 
 @app.get("/health")
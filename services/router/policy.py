@@ -0,0 +1,313 @@
+"""
+Online routing policy for the router: Thompson sampling per (role, capability-set).
+
+Every context keeps a Beta(alpha, beta) posterior per eligible model. A route
+request draws one sample from each eligible arm and picks the highest draw, so
+models that have done well are picked more often while uncertain ones still
+get explored.
+
+Only the requested capabilities listed in HARD_REQUIREMENTS (default: code)
+decide eligibility; the rest are preferences. Each arm's draw is shifted by a
+pseudo-count prior of PRIOR_STRENGTH split by the fraction of preferences the
+model covers, so a role's best catalog match starts ahead but loses traffic
+to the other eligible models once they earn better rewards.
+
+Feedback is streamed from model_runs (by id watermark) and turned into a
+fractional reward in 0..1:
+
+    reward = (wq * quality + wl * speed + wc * thrift) / (wq + wl + wc)
+
+  quality  score / QUALITY_TARGET, capped at 1: anything "good enough" earns
+           full credit, so among good-enough models speed and cost decide
+  speed    exp(-latency / LATENCY_SCALE), from the worker's 'adapter' span
+  thrift   exp(-cost / COST_SCALE), from estimated_cost or the model_costs price
+
+A failed attempt earns 0. Validated runs only reach model_runs, so failures are
+streamed separately from the retry_scheduled / failed / dead_lettered job_events
+(by their own id watermark). Posteriors in a context decay towards the prior on every
+update (DISCOUNT), so the policy follows models whose behaviour drifts.
+
+State is a few floats per (context, model) and is checkpointed to
+routing_policy_state together with the watermarks and the operator weights.
+"""
+
+import os
+import json
+import math
+import time
+import random
+import asyncio
+import logging
+
+LOGGER = logging.getLogger("aura.router.policy")
+
+QUALITY_TARGET = float(os.getenv("ROUTER_QUALITY_TARGET", "0.7"))
+LATENCY_SCALE_SECONDS = float(os.getenv("ROUTER_LATENCY_SCALE_SECONDS", "60"))
+COST_SCALE_USD = float(os.getenv("ROUTER_COST_SCALE_USD", "0.05"))
+# prices in model_costs are per 1k tokens; runs without a recorded cost assume this many
+NOMINAL_KTOKENS = float(os.getenv("ROUTER_NOMINAL_KTOKENS", "2"))
+DISCOUNT = float(os.getenv("ROUTER_DISCOUNT", "0.995"))
+POLL_SECONDS = float(os.getenv("ROUTER_POLL_SECONDS", "5"))
+CHECKPOINT_SECONDS = float(os.getenv("ROUTER_CHECKPOINT_SECONDS", "60"))
+MODELS_REFRESH_SECONDS = float(os.getenv("ROUTER_MODELS_REFRESH_SECONDS", "15"))
+# Requested capabilities a model must have; requests naming none of them need all of theirs
+HARD_REQUIREMENTS = set(filter(None, os.getenv("ROUTER_HARD_REQUIREMENTS", "code").split(",")))
+# Pseudo-observations behind the preference prior
+PRIOR_STRENGTH = float(os.getenv("ROUTER_PRIOR_STRENGTH", "2"))
+BATCH_SIZE = 1000
+
+DEFAULT_WEIGHTS = {
+    "quality": float(os.getenv("ROUTER_WEIGHT_QUALITY", "0.6")),
+    "latency": float(os.getenv("ROUTER_WEIGHT_LATENCY", "0.25")),
+    "cost": float(os.getenv("ROUTER_WEIGHT_COST", "0.15")),
+}
+
+META = "__meta__"
+
+# One row per run. The routing context is the one the scheduler recorded on the
+# job's 'assigned' event; runs without one (e.g. hedges) can't be attributed.
+RUNS_SQL = """
+    SELECT mr.id, m.name AS model, mr.success, mr.score, mr.estimated_cost,
+           mc.cost_per_1k_input + mc.cost_per_1k_output AS price_per_1k,
+           a.details->>'route_context' AS context,
+           COALESCE(s.duration_ms / 1000.0, EXTRACT(EPOCH FROM j.completed_at - j.started_at)) AS latency_s
+    FROM model_runs mr
+    JOIN models m ON m.id = mr.model_id
+    LEFT JOIN jobs j ON j.id = mr.job_id
+    LEFT JOIN LATERAL (
+        SELECT cost_per_1k_input, cost_per_1k_output FROM model_costs
+        WHERE model_id = m.id ORDER BY updated_at DESC LIMIT 1
+    ) mc ON TRUE
+    LEFT JOIN LATERAL (
+        SELECT details FROM job_events
+        WHERE job_id = mr.job_id AND event_type = 'assigned' ORDER BY id DESC LIMIT 1
+    ) a ON TRUE
+    LEFT JOIN LATERAL (
+        SELECT duration_ms FROM job_spans
+        WHERE job_id = mr.job_id AND stage = 'adapter' ORDER BY started_at DESC LIMIT 1
+    ) s ON TRUE
+    WHERE mr.id > $1
+    ORDER BY mr.id
+    LIMIT $2
+"""
+
+# Failed attempts as zero-reward observations, attributed to the routing context of
+# the assignment that preceded them
+FAILURES_SQL = """
+    SELECT e.id, e.details->>'model' AS model, a.details->>'route_context' AS context
+    FROM job_events e
+    LEFT JOIN LATERAL (
+        SELECT details FROM job_events
+        WHERE job_id = e.job_id AND event_type = 'assigned' AND id < e.id
+        ORDER BY id DESC LIMIT 1
+    ) a ON TRUE
+    WHERE e.id > $1
+      AND e.event_type IN ('retry_scheduled', 'failed', 'dead_lettered')
+    ORDER BY e.id
+    LIMIT $2
+"""
+
+MODELS_SQL = "SELECT name, is_active AND NOT COALESCE(suspended, FALSE) AS usable FROM models"
+
+
+def context_key(role: str, requirements) -> str:
+    return f"{role or '*'}:{','.join(sorted(set(requirements)))}"
+
+
+class RoutingPolicy:
+    def __init__(self, capabilities: dict):
+        self.catalog = capabilities.get("models", {}) or {}
+        self.weights = dict(DEFAULT_WEIGHTS)
+        # context -> model -> [alpha, beta, pulls]
+        self.arms = {}
+        self.watermark = 0
+        self.failures_watermark = 0
+        # model name -> usable; models the DB doesn't know about are allowed
+        self.usable = {}
+        self.dirty = set()
+        self._models_at = 0.0
+        self._checkpoint_at = time.monotonic()
+
+    # --- selection ---
+
+    def split(self, requirements):
+        """(hard, soft) requirements."""
+        req = set(requirements)
+        hard = (req & HARD_REQUIREMENTS) or req
+        return hard, req - hard
+
+    def eligible(self, requirements, exclude=()):
+        """Catalog models covering every hard requirement, else the best partial matches."""
+        req, _ = self.split(requirements)
+        pool = {
+            name: set(spec.get("capabilities", []))
+            for name, spec in self.catalog.items()
+            if name not in exclude and self.usable.get(name, True)
+        }
+        full = [name for name, caps in pool.items() if req <= caps]
+        if full or not pool:
+            return full
+        best = max(len(req & caps) for caps in pool.values())
+        return [name for name, caps in pool.items() if best and len(req & caps) == best]
+
+    def arm(self, context, model):
+        return self.arms.setdefault(context, {}).setdefault(model, [1.0, 1.0, 0])
+
+    def prior(self, model, soft):
+        """(alpha, beta) pseudo-counts from the share of preferences the model covers."""
+        if not soft:
+            return 0.0, 0.0
+        caps = set(self.catalog.get(model, {}).get("capabilities", []))
+        share = len(soft & caps) / len(soft)
+        return PRIOR_STRENGTH * share, PRIOR_STRENGTH * (1.0 - share)
+
+    def choose(self, role, requirements, exclude=()):
+        """Returns (model, context, posterior mean) or None if nothing is eligible."""
+        context = context_key(role, requirements)
+        candidates = self.eligible(requirements, exclude)
+        if not candidates:
+            return None
+        _, soft = self.split(requirements)
+        posteriors = {}
+        for name in candidates:
+            alpha, beta, _ = self.arm(context, name)
+            pa, pb = self.prior(name, soft)
+            posteriors[name] = (alpha + pa, beta + pb)
+        draws = {name: random.betavariate(a, b) for name, (a, b) in posteriors.items()}
+        model = max(draws, key=draws.get)
+        alpha, beta = posteriors[model]
+        return model, context, alpha / (alpha + beta)
+
+    # --- learning ---
+
+    def reward(self, run) -> float:
+        if not run["success"]:
+            return 0.0
+        terms = []
+        if run["score"] is not None:
+            terms.append((self.weights["quality"], min(1.0, float(run["score"]) / QUALITY_TARGET)))
+        if run["latency_s"] is not None:
+            terms.append((self.weights["latency"], math.exp(-float(run["latency_s"]) / LATENCY_SCALE_SECONDS)))
+        if run["estimated_cost"] is not None:
+            cost = float(run["estimated_cost"])
+        elif run["price_per_1k"] is not None:
+            cost = float(run["price_per_1k"]) * NOMINAL_KTOKENS
+        else:
+            cost = None
+        if cost is not None:
+            terms.append((self.weights["cost"], math.exp(-cost / COST_SCALE_USD)))
+        total = sum(w for w, _ in terms)
+        if total <= 0:
+            return 0.5
+        return sum(w * v for w, v in terms) / total
+
+    def update(self, context, model, reward):
+        for a in self.arms.setdefault(context, {}).values():
+            a[0] = 1.0 + DISCOUNT * (a[0] - 1.0)
+            a[1] = 1.0 + DISCOUNT * (a[1] - 1.0)
+        a = self.arm(context, model)
+        a[0] += reward
+        a[1] += 1.0 - reward
+        a[2] += 1
+        self.dirty.add(context)
+
+    async def refresh_models(self, conn, force=False):
+        if not force and time.monotonic() - self._models_at < MODELS_REFRESH_SECONDS:
+            return
+        self.usable = {r["name"]: r["usable"] for r in await conn.fetch(MODELS_SQL)}
+        self._models_at = time.monotonic()
+
+    async def learn(self, conn) -> int:
+        """Applies the next batch of runs and of failures; returns the larger batch size."""
+        rows = await conn.fetch(RUNS_SQL, self.watermark, BATCH_SIZE)
+        for r in rows:
+            if r["context"]:
+                self.update(r["context"], r["model"], self.reward(r))
+        if rows:
+            self.watermark = rows[-1]["id"]
+            self.dirty.add(META)
+        failures = await conn.fetch(FAILURES_SQL, self.failures_watermark, BATCH_SIZE)
+        for r in failures:
+            if r["context"] and r["model"]:
+                self.update(r["context"], r["model"], 0.0)
+        if failures:
+            self.failures_watermark = failures[-1]["id"]
+            self.dirty.add(META)
+        return max(len(rows), len(failures))
+
+    # --- checkpoints ---
+
+    async def load(self, conn):
+        for r in await conn.fetch("SELECT context, state FROM routing_policy_state"):
+            state = json.loads(r["state"])
+            if r["context"] == META:
+                self.watermark = state.get("watermark", 0)
+                self.failures_watermark = state.get("failures_watermark", 0)
+                self.weights.update(state.get("weights", {}))
+            else:
+                self.arms[r["context"]] = {m: list(v) for m, v in state.items()}
+        LOGGER.info(f"Routing policy restored: {len(self.arms)} contexts, watermark {self.watermark}")
+
+    async def checkpoint(self, conn):
+        if not self.dirty:
+            return
+        rows = []
+        for context in self.dirty:
+            if context == META:
+                state = {
+                    "watermark": self.watermark,
+                    "failures_watermark": self.failures_watermark,
+                    "weights": self.weights,
+                }
+            else:
+                state = self.arms.get(context, {})
+            rows.append((context, json.dumps(state)))
+        await conn.executemany(
+            """
+            INSERT INTO routing_policy_state (context, state, updated_at)
+            VALUES ($1, $2::jsonb, now())
+            ON CONFLICT (context) DO UPDATE SET state = EXCLUDED.state, updated_at = now()
+        """,
+            rows,
+        )
+        self.dirty.clear()
+        self._checkpoint_at = time.monotonic()
+
+    def set_weights(self, weights: dict):
+        self.weights.update({k: max(0.0, float(v)) for k, v in weights.items() if k in self.weights})
+        self.dirty.add(META)
+
+    def summary(self):
+        return {
+            "weights": self.weights,
+            "quality_target": QUALITY_TARGET,
+            "watermark": self.watermark,
+            "failures_watermark": self.failures_watermark,
+            "hard_requirements": sorted(HARD_REQUIREMENTS),
+            "prior_strength": PRIOR_STRENGTH,
+            "suspended": sorted(m for m, ok in self.usable.items() if not ok),
+            "contexts": {
+                context: {
+                    m: {"mean": round(a / (a + b), 4), "alpha": round(a, 3), "beta": round(b, 3), "runs": n}
+                    for m, (a, b, n) in arms.items()
+                }
+                for context, arms in self.arms.items()
+            },
+        }
+
+    async def run_forever(self, pool):
+        async with pool.acquire() as conn:
+            await self.load(conn)
+        while True:
+            try:
+                async with pool.acquire() as conn:
+                    await self.refresh_models(conn)
+                    while await self.learn(conn) == BATCH_SIZE:
+                        pass
+                    if time.monotonic() - self._checkpoint_at >= CHECKPOINT_SECONDS:
+                        await self.checkpoint(conn)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                LOGGER.error(f"Routing policy update failed: {e}")
+            await asyncio.sleep(POLL_SECONDS)
@@ -1,10 +1,13 @@
 import os
 import yaml
+import asyncio
 import asyncpg
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
 from typing import List, Optional
 
+from policy import RoutingPolicy
+
 app = FastAPI(title="Aura Router")
 
 DATABASE_URL = os.getenv("DATABASE_URL")
@@ -14,11 +17,16 @@ MANAGER_URL = os.getenv("MANAGER_URL", "http://manager:8000")
 with open("/app/capabilities.yaml") as f:
     CAPABILITIES = yaml.safe_load(f)
 
+policy = RoutingPolicy(CAPABILITIES)
+pool: asyncpg.Pool = None
+learner: asyncio.Task = None
+
 
 class RouteRequest(BaseModel):
     requirements: List[str] = []
     priority: str = "normal"
     exclude_models: List[str] = []
+    role: Optional[str] = None
 
 
 class RouteResponse(BaseModel):
@@ -26,10 +34,67 @@ class RouteResponse(BaseModel):
     reason: str
     capabilities: List[str]
     cost_tier: str
+    context: str
+
+
+class PolicyWeights(BaseModel):
+    quality: Optional[float] = None
+    latency: Optional[float] = None
+    cost: Optional[float] = None
+
+
+@app.on_event("startup")
+async def startup():
+    global pool, learner
+    pool = await asyncpg.create_pool(DATABASE_URL, min_size=1, max_size=4)
+    learner = asyncio.create_task(policy.run_forever(pool))
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    if learner:
+        learner.cancel()
+    if pool:
+        async with pool.acquire() as conn:
+            await policy.checkpoint(conn)
+        await pool.close()
+
+
+@app.post("/route", response_model=RouteResponse)
+def route(req: RouteRequest):
+    picked = policy.choose(req.role, req.requirements, req.exclude_models)
+    if not picked:
+        raise HTTPException(status_code=404, detail="No eligible model for requirements")
+    model, context, mean = picked
+    spec = CAPABILITIES["models"][model]
+    return RouteResponse(
+        model=model,
+        reason=f"thompson sample ({context}, posterior mean {mean:.2f})",
+        capabilities=spec.get("capabilities", []),
+        cost_tier=spec.get("cost_tier", "unknown"),
+        context=context,
+    )
+
+
+@app.get("/policy")
+def get_policy():
+    return policy.summary()
+
+
+@app.put("/policy/weights")
+async def put_policy_weights(weights: PolicyWeights):
+    """Operator tradeoff between quality, latency and cost (relative weights)."""
+    policy.set_weights(weights.dict(exclude_none=True))
+    async with pool.acquire() as conn:
+        await policy.checkpoint(conn)
+    return {"weights": policy.weights}
+
+
+@app.get("/capabilities")
+def capabilities():
+    return CAPABILITIES
 
 
 @app.get("/health")
 def health():
     return {"status": "ok"}
-
-    return CAPABILITIES
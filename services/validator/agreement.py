@@ -0,0 +1,167 @@
+"""
+Cross-model agreement via MinHash signatures.
+
+Every result artifact is reduced once to a fixed-size MinHash signature
+(NUM_PERM uint32 values) which is stored in artifact_signatures. Agreement for a
+new artifact is then computed against the signatures of *other* models in the
+same task family: LSH banding narrows the candidates, and the estimated Jaccard
+similarity to every candidate is a single vectorized comparison.
+"""
+
+import re
+import zlib
+from collections import OrderedDict, defaultdict
+
+import numpy as np
+
+NUM_PERM = 128
+BANDS = 32  # 32 bands x 4 rows -> candidate threshold around 0.42 Jaccard
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 3
+MAX_FAMILIES = 512
+
+# Largest prime below 2**32 so hashed values fit in uint32
+_PRIME = np.uint64(4294967291)
+_rng = np.random.default_rng(0xA0A0)
+_A = _rng.integers(1, 2**31, size=NUM_PERM, dtype=np.uint64)
+_B = _rng.integers(0, 2**31, size=NUM_PERM, dtype=np.uint64)
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def shingles(text: str):
+    tokens = _TOKEN_RE.findall(text.lower())
+    if len(tokens) < SHINGLE_SIZE:
+        return {" ".join(tokens)} if tokens else set()
+    return {
+        " ".join(tokens[i : i + SHINGLE_SIZE])
+        for i in range(len(tokens) - SHINGLE_SIZE + 1)
+    }
+
+
+def minhash(text: str):
+    """Return the MinHash signature of text, or None if it has no tokens."""
+    sh = shingles(text or "")
+    if not sh:
+        return None
+    hv = np.fromiter(
+        (zlib.crc32(s.encode()) for s in sh), dtype=np.uint64, count=len(sh)
+    )
+    # (NUM_PERM, n_shingles) -> min per permutation
+    sig = ((_A[:, None] * hv[None, :] + _B[:, None]) % _PRIME).min(axis=1)
+    return sig.astype(np.uint32)
+
+
+def to_bytes(sig) -> bytes:
+    return sig.astype("<u4").tobytes()
+
+
+def from_bytes(raw: bytes):
+    return np.frombuffer(raw, dtype="<u4").astype(np.uint32)
+
+
+def _band_keys(sig):
+    return [sig[i * ROWS : (i + 1) * ROWS].tobytes() for i in range(BANDS)]
+
+
+class SignatureIndex:
+    """LSH index of the signatures of one task family."""
+
+    def __init__(self):
+        self.size = 0
+        self._sigs = np.empty((64, NUM_PERM), dtype=np.uint32)
+        self._model_ids = np.empty(64, dtype=np.int64)
+        self.artifact_ids = set()
+        self.last_artifact_id = 0
+        self.buckets = [defaultdict(list) for _ in range(BANDS)]
+
+    @property
+    def sigs(self):
+        return self._sigs[: self.size]
+
+    @property
+    def model_ids(self):
+        return self._model_ids[: self.size]
+
+    def add_many(self, rows):
+        """rows: iterable of (artifact_id, model_id, signature)"""
+        rows = [r for r in rows if r[0] not in self.artifact_ids]
+        if not rows:
+            return
+        start = self.size
+        end = start + len(rows)
+        if end > len(self._model_ids):
+            cap = max(end, 2 * len(self._model_ids))
+            self._sigs = np.resize(self._sigs, (cap, NUM_PERM))
+            self._model_ids = np.resize(self._model_ids, cap)
+        self._sigs[start:end] = np.stack([r[2] for r in rows])
+        self._model_ids[start:end] = [r[1] for r in rows]
+        self.size = end
+        for offset, (artifact_id, _, sig) in enumerate(rows):
+            self.artifact_ids.add(artifact_id)
+            self.last_artifact_id = max(self.last_artifact_id, artifact_id)
+            for band, key in enumerate(_band_keys(sig)):
+                self.buckets[band][key].append(start + offset)
+
+    def agreement(self, sig, model_id):
+        """
+        Mean over the other models in the family of the best estimated Jaccard
+        similarity between sig and that model's artifacts. None when no other
+        model has produced an artifact for this family yet.
+        """
+        others = np.unique(self.model_ids[self.model_ids != model_id])
+        if others.size == 0:
+            return None
+
+        candidates = set()
+        for band, key in enumerate(_band_keys(sig)):
+            candidates.update(self.buckets[band].get(key, ()))
+        idx = np.fromiter(candidates, dtype=np.int64, count=len(candidates))
+        idx = idx[self.model_ids[idx] != model_id] if idx.size else idx
+        if idx.size == 0:
+            return 0.0
+
+        sims = (self.sigs[idx] == sig).mean(axis=1)
+        best = np.zeros(others.size)
+        np.maximum.at(best, np.searchsorted(others, self.model_ids[idx]), sims)
+        return float(best.mean())
+
+
+class AgreementEngine:
+    """Keeps a bounded set of family indexes warm and syncs them from the DB."""
+
+    def __init__(self, max_families: int = MAX_FAMILIES):
+        self.max_families = max_families
+        self.families = OrderedDict()
+
+    async def family_index(self, conn, family: str) -> SignatureIndex:
+        index = self.families.get(family)
+        if index is None:
+            index = SignatureIndex()
+            self.families[family] = index
+            if len(self.families) > self.max_families:
+                self.families.popitem(last=False)
+        else:
+            self.families.move_to_end(family)
+
+        # pick up signatures written by other validator replicas
+        rows = await conn.fetch(
+            """
+            SELECT artifact_id, model_id, signature FROM artifact_signatures
+            WHERE family = $1 AND artifact_id > $2
+            ORDER BY artifact_id
+        """,
+            family,
+            index.last_artifact_id,
+        )
+        index.add_many(
+            (r["artifact_id"], r["model_id"], from_bytes(r["signature"])) for r in rows
+        )
+        return index
+
+    async def score(self, conn, family, artifact_id, model_id, sig):
+        """Agreement for one artifact; registers its signature in the local index."""
+        index = await self.family_index(conn, family)
+        value = index.agreement(sig, model_id)
+        index.add_many([(artifact_id, model_id, sig)])
+        return value
@@ -0,0 +1,65 @@
+"""
+Read-only access to the Manager's content-addressed artifact blobs.
+
+The blob volume is mounted read-only at BLOB_ROOT (same <ab>/<cd>/<sha256>[.zst]
+layout as services/manager/app/blobstore.py); raw blobs are decoded straight
+from an mmap. When the volume isn't mounted, or a blob is compressed and
+zstandard isn't installed, the bytes come from the Manager's /blobs endpoint.
+"""
+
+import os
+import mmap
+import asyncio
+
+import requests
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+MANAGER_URL = os.getenv("MANAGER_URL", "http://manager:8000")
+BLOB_ROOT = os.getenv("BLOB_ROOT", "/data/blobs")
+# minhash only needs the head of very large outputs
+MAX_TEXT_BYTES = int(os.getenv("VALIDATOR_MAX_TEXT_BYTES", str(8 * 1024 * 1024)))
+
+
+def _local_text(sha256: str):
+    base = os.path.join(BLOB_ROOT, sha256[:2], sha256[2:4], sha256)
+    if os.path.exists(base):
+        with open(base, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return ""
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                return mm[:MAX_TEXT_BYTES].decode("utf-8", errors="replace")
+    if os.path.exists(base + ".zst") and zstandard is not None:
+        data = bytearray()
+        with open(base + ".zst", "rb") as f:
+            reader = zstandard.ZstdDecompressor().stream_reader(f)
+            while len(data) < MAX_TEXT_BYTES:
+                chunk = reader.read(MAX_TEXT_BYTES - len(data))
+                if not chunk:
+                    break
+                data += chunk
+        return bytes(data).decode("utf-8", errors="replace")
+    return None
+
+
+def _remote_text(sha256: str) -> str:
+    with requests.get(f"{MANAGER_URL}/blobs/{sha256}", stream=True, timeout=30) as r:
+        r.raise_for_status()
+        data = bytearray()
+        for chunk in r.iter_content(256 * 1024):
+            data += chunk
+            if len(data) >= MAX_TEXT_BYTES:
+                break
+    return bytes(data[:MAX_TEXT_BYTES]).decode("utf-8", errors="replace")
+
+
+def read_text_sync(sha256: str) -> str:
+    text = _local_text(sha256)
+    return text if text is not None else _remote_text(sha256)
+
+
+async def read_text(sha256: str) -> str:
+    return await asyncio.to_thread(read_text_sync, sha256)
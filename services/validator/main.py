@@ -1,95 +1,310 @@
-import os, time, requests, asyncpg, asyncio, json
-from services.validator.scoring import score_from_signals
+import os, time, socket, asyncpg, asyncio, json
+from datetime import datetime, timezone
+from services.validator.scoring import score_from_signals, WEIGHTS, WEIGHTS_VERSION
+from services.validator.rescore import load_weights
+from services.validator.agreement import AgreementEngine, minhash, to_bytes, from_bytes
+from services.validator.sandbox_runner import TestStage
+from services.validator.blobs import read_text as read_blob_text
 
 MANAGER_URL = os.getenv("MANAGER_URL", "http://manager:8000")
 DATABASE_URL = os.getenv("DATABASE_URL")
+VALIDATOR_ID = os.getenv("VALIDATOR_ID", socket.gethostname())
+CONCURRENCY = int(os.getenv("VALIDATOR_CONCURRENCY", "8"))
+BATCH_SIZE = int(os.getenv("VALIDATOR_BATCH_SIZE", "50"))
+LEASE_SECONDS = float(os.getenv("VALIDATOR_LEASE_SECONDS", "120"))
+MAX_ATTEMPTS = int(os.getenv("VALIDATOR_MAX_ATTEMPTS", "5"))
+# Safety net for missed notifications (listener reconnects, backfilled rows)
+IDLE_POLL_SECONDS = float(os.getenv("VALIDATOR_IDLE_POLL_SECONDS", "5"))
+WEIGHTS_REFRESH_SECONDS = float(os.getenv("VALIDATOR_WEIGHTS_REFRESH_SECONDS", "60"))
 
+NOTIFY_CHANNEL = "job_completed"
+# registration, HR and suspension changes (025_models_changed.sql)
+MODELS_CHANNEL = "models_changed"
 
-async def validate_loop():
-    pool = await asyncpg.create_pool(DATABASE_URL)
-    print("Validator started")
-    while True:
-        try:
-            # Poll for jobs that are COMPLETED (worker done) but not VALIDATED?
-            # Or Manager moves them to 'SUBMITTED' (per main.py: "status": "COMPLETED" if result.success else "SUBMITTED")
-            # Wait, main.py says: "UPDATE jobs SET status = ... 'COMPLETED' ... 'SUBMITTED'"
-            # If success, it goes COMPLETED. Does Validator run on COMPLETED?
-            # "Validator picks job up... and runs scoring... call Manager endpoint POST /jobs/{job_id}/validate"
-            # We probably want a new status 'VALIDATED' or just add a score to model_runs.
-            # Let's say we look for 'COMPLETED' jobs that don't have a model_runs entry yet?
-            # Or use a separate status 'NEEDS_REVIEW'?
-            # For MVP, let's poll 'COMPLETED' jobs and check if we already scored them.
-
-            async with pool.acquire() as conn:
-                # Find recent completed jobs
-                rows = await conn.fetch(
-                    """
-                    SELECT j.id, j.assigned_model, j.project_id 
-                    FROM jobs j
-                    WHERE j.status = 'COMPLETED'
-                    AND NOT EXISTS (SELECT 1 FROM model_runs mr WHERE mr.job_id = j.id)
-                    LIMIT 10
-                """
-                )
+# Claim a batch of queued jobs (or jobs whose lease expired) and fetch everything
+# needed to validate them in a single round trip. SKIP LOCKED lets any number of
+# validator replicas drain the queue without stepping on each other.
+CLAIM_SQL = """
+    WITH candidates AS (
+        SELECT job_id FROM validation_queue
+        WHERE claimed_at IS NULL OR claimed_at < now() - make_interval(secs => $2)
+        ORDER BY enqueued_at
+        LIMIT $3
+        FOR UPDATE SKIP LOCKED
+    ), claimed AS (
+        UPDATE validation_queue q
+        SET claimed_by = $1, claimed_at = now(), attempts = q.attempts + 1
+        FROM candidates c
+        WHERE q.job_id = c.job_id
+        RETURNING q.job_id, q.attempts
+    )
+    SELECT j.id, j.assigned_model, j.project_id, c.attempts, j.trace_id, j.completed_at,
+           a.id AS artifact_id, a.model_id AS artifact_model_id,
+           s.signature,
+           CASE WHEN s.signature IS NULL THEN a.artifact->>'output' END AS output,
+           CASE WHEN s.signature IS NULL THEN a.blob_sha256 END AS blob_sha256,
+           COALESCE(md5(j.task_payload::text), j.id::text) AS family
+    FROM claimed c
+    JOIN jobs j ON j.id = c.job_id
+    LEFT JOIN LATERAL (
+        SELECT id, model_id, artifact, blob_sha256 FROM model_artifacts
+        WHERE job_id = j.id AND artifact_type = 'result'
+        ORDER BY id DESC LIMIT 1
+    ) a ON TRUE
+    LEFT JOIN artifact_signatures s ON s.artifact_id = a.id
+"""
 
-                for r in rows:
-                    job_id = r["id"]
-                    model_name = r["assigned_model"]
-                    project_id = r["project_id"]  # might be null per schema
+# Neutral agreement when no other model has worked on the same task yet
+DEFAULT_AGREEMENT = 0.5
 
-                    print(f"Validating job {job_id}")
+# models.name -> models.id, loaded once; dropped on models_changed and refreshed on a miss
+_model_ids = {}
 
-                    # Fetch artifacts/events to compute signals
-                    # This implies reading from DB or Manager.
-                    # For MVP, we'll mock signals or check if artifact exists.
+# active scoring weight set: {"version": int, "weights": dict, "loaded_at": float}
+_weights = {"version": WEIGHTS_VERSION, "weights": WEIGHTS, "loaded_at": 0.0}
 
-                    # Check for result artifact
-                    has_artifact = await conn.fetchval(
-                        """
-                        SELECT EXISTS(SELECT 1 FROM model_artifacts WHERE job_id = $1 AND artifact_type='result')
-                    """,
-                        job_id,
-                    )
 
-                    signals = {
-                        "tests_passed": True,  # Mock
-                        "test_score": 0.9 if has_artifact else 0.0,
-                        "coverage": 0.8,
-                        "docs_quality": 0.8,
-                        "performance_ok": True,
-                        "cross_model_agreement": 0.5,
-                    }
+async def refresh_weights(conn):
+    version, weights = await load_weights(conn)
+    if version != _weights["version"]:
+        print(f"Using scoring weight set {version}")
+    _weights.update(version=version, weights=weights, loaded_at=time.monotonic())
 
-                    score = score_from_signals(signals)
 
-                    # Lookup model_id
-                    mid = await conn.fetchval(
-                        "SELECT id FROM models WHERE name = $1", model_name
-                    )
-                    if not mid:
-                        # try to find it or log error
-                        print(f"Model {model_name} not found in models table")
-                        continue
-
-                    # Insert execution run
-                    await conn.execute(
-                        """
-                        INSERT INTO model_runs (model_id, job_id, project_id, success, confidence, score, details)
-                        VALUES ($1, $2, $3, TRUE, 0.9, $4, $5::jsonb)
-                    """,
-                        mid,
+async def load_model_ids(conn):
+    rows = await conn.fetch("SELECT id, name FROM models")
+    _model_ids.clear()
+    _model_ids.update({r["name"]: r["id"] for r in rows})
+
+
+async def lookup_model_id(conn, model_name):
+    if model_name not in _model_ids:
+        await load_model_ids(conn)
+    return _model_ids.get(model_name)
+
+
+async def cross_model_agreement(pool, engine, job, model_id):
+    """
+    Agreement of the job's result artifact with other models' results for the
+    same task family. Returns (agreement, signature row to persist or None).
+    """
+    if job["artifact_id"] is None:
+        return 0.0, None
+
+    new_row = None
+    if job["signature"] is not None:
+        sig = from_bytes(job["signature"])
+    else:
+        text = job["output"]
+        if text is None and job["blob_sha256"]:
+            try:
+                text = await read_blob_text(job["blob_sha256"])
+            except Exception as e:
+                print(f"Blob {job['blob_sha256']} unreadable for job {job['id']}: {e}")
+                return DEFAULT_AGREEMENT, None
+        sig = minhash(text or "")
+        if sig is None:
+            return 0.0, None
+        new_row = (job["artifact_id"], job["id"], model_id, job["family"], to_bytes(sig))
+
+    async with pool.acquire() as conn:
+        agreement = await engine.score(
+            conn, job["family"], job["artifact_id"], model_id, sig
+        )
+    return (DEFAULT_AGREEMENT if agreement is None else agreement), new_row
+
+
+async def validate_job(pool, engine, tests, job, model_id, sem):
+    """Compute signals and score for one claimed job."""
+    async with sem:
+        started_at = datetime.now(timezone.utc)
+        t0 = time.perf_counter()
+        agreement, sig_row = await cross_model_agreement(
+            pool, engine, job, job["artifact_model_id"] or model_id
+        )
+        # artifact-based defaults, replaced by real results when the snapshot has tests
+        signals = {
+            "tests_passed": True,
+            "test_score": 0.9 if job["artifact_id"] is not None else 0.0,
+            "coverage": 0.8,
+            "docs_quality": 0.8,
+            "performance_ok": True,
+            "cross_model_agreement": agreement,
+        }
+        test_signals = await tests.signals_for(pool, job["id"])
+        if test_signals.get("tests_found"):
+            signals.update(test_signals)
+        elif test_signals:
+            signals["tests_found"] = False
+        score = score_from_signals(signals, weights=_weights["weights"])
+        span = (started_at, (time.perf_counter() - t0) * 1000)
+        return signals, score, sig_row, span
+
+
+async def process_batch(pool, engine, tests, sem):
+    """Claim, validate and persist one batch. Returns the number of jobs claimed."""
+    async with pool.acquire() as conn:
+        jobs = await conn.fetch(CLAIM_SQL, VALIDATOR_ID, LEASE_SECONDS, BATCH_SIZE)
+        model_ids = [await lookup_model_id(conn, job["assigned_model"]) for job in jobs]
+    if not jobs:
+        return 0
+
+    runnable = []
+    done = []
+    for job, mid in zip(jobs, model_ids):
+        if mid:
+            runnable.append((job, mid))
+            continue
+        print(f"Model {job['assigned_model']} not found in models table")
+        if job["attempts"] >= MAX_ATTEMPTS:
+            done.append(job["id"])
+
+    results = await asyncio.gather(
+        *(validate_job(pool, engine, tests, job, mid, sem) for job, mid in runnable),
+        return_exceptions=True,
+    )
+
+    runs = []
+    signatures = []
+    spans = []
+    for (job, mid), res in zip(runnable, results):
+        job_id = job["id"]
+        if isinstance(res, Exception):
+            # leave the lease to expire so another pass retries it
+            print(f"Validation failed for job {job_id}: {res}")
+            if job["attempts"] >= MAX_ATTEMPTS:
+                done.append(job_id)
+            continue
+
+        signals, score, sig_row, (started_at, duration_ms) = res
+        runs.append(
+            (
+                mid,
+                job_id,
+                job["project_id"],
+                True,
+                0.9,
+                score,
+                json.dumps(signals),
+                _weights["version"],
+            )
+        )
+        if sig_row:
+            signatures.append(sig_row)
+        if job["trace_id"]:
+            if job["completed_at"]:
+                wait_ms = (started_at - job["completed_at"]).total_seconds() * 1000
+                spans.append(
+                    (
+                        job["trace_id"],
                         job_id,
-                        project_id,
-                        score,
-                        json.dumps(signals),
+                        "wait_validation",
+                        "queue",
+                        job["completed_at"],
+                        wait_ms,
+                        None,
                     )
+                )
+            spans.append(
+                (
+                    job["trace_id"],
+                    job_id,
+                    "validate",
+                    "validator",
+                    started_at,
+                    duration_ms,
+                    json.dumps({"score": score, "validator": VALIDATOR_ID}),
+                )
+            )
+        done.append(job_id)
+        print(f"Scored job {job_id}: {score}")
+
+    async with pool.acquire() as conn:
+        async with conn.transaction():
+            if signatures:
+                await conn.executemany(
+                    """
+                    INSERT INTO artifact_signatures (artifact_id, job_id, model_id, family, signature)
+                    VALUES ($1, $2, $3, $4, $5)
+                    ON CONFLICT (artifact_id) DO NOTHING
+                """,
+                    signatures,
+                )
+            if runs:
+                await conn.executemany(
+                    """
+                    INSERT INTO model_runs (model_id, job_id, project_id, success, confidence, score, details, weights_version)
+                    VALUES ($1, $2, $3, $4, $5, $6, $7::jsonb, $8)
+                """,
+                    runs,
+                )
+            if spans:
+                await conn.copy_records_to_table(
+                    "job_spans",
+                    records=spans,
+                    columns=["trace_id", "job_id", "stage", "service", "started_at", "duration_ms", "attrs"],
+                )
+            if done:
+                await conn.execute(
+                    "DELETE FROM validation_queue WHERE job_id = ANY($1::uuid[])", done
+                )
+
+    return len(jobs)
+
+
+def forget_models(conn, pid, channel, name):
+    if name:
+        _model_ids.pop(name, None)
+    else:
+        _model_ids.clear()
 
-                    print(f"Scored job {job_id}: {score}")
 
+async def listen(wake):
+    conn = await asyncpg.connect(DATABASE_URL)
+    await conn.add_listener(NOTIFY_CHANNEL, lambda *_: wake.set())
+    await conn.add_listener(MODELS_CHANNEL, forget_models)
+    # changes made while we weren't listening
+    _model_ids.clear()
+    return conn
+
+
+async def validate_loop():
+    pool = await asyncpg.create_pool(DATABASE_URL)
+    sem = asyncio.Semaphore(CONCURRENCY)
+    engine = AgreementEngine()
+    tests = TestStage()
+    wake = asyncio.Event()
+    listener = None
+    print(f"Validator {VALIDATOR_ID} started")
+
+    async with pool.acquire() as conn:
+        await load_model_ids(conn)
+
+    while True:
+        try:
+            if listener is None or listener.is_closed():
+                listener = await listen(wake)
+
+            if time.monotonic() - _weights["loaded_at"] > WEIGHTS_REFRESH_SECONDS:
+                async with pool.acquire() as conn:
+                    await refresh_weights(conn)
+
+            wake.clear()
+            while await process_batch(pool, engine, tests, sem) >= BATCH_SIZE:
+                pass
         except Exception as e:
             print(f"Validator error: {e}")
+            if listener is not None:
+                try:
+                    await listener.close()
+                except Exception:
+                    pass
+            listener = None
 
-        await asyncio.sleep(10)
+        try:
+            await asyncio.wait_for(wake.wait(), IDLE_POLL_SECONDS)
+        except asyncio.TimeoutError:
+            pass
 
 
 if __name__ == "__main__":
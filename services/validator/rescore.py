@@ -0,0 +1,142 @@
+"""
+Bulk re-scoring of model_runs after the validator weights change.
+
+    python -m services.validator.rescore                  # re-score to the active version
+    python -m services.validator.rescore --version 3
+    python -m services.validator.rescore --weights '{"tests": 0.5, ...}' --note "favour tests"
+
+Runs are streamed in id order in chunks. The signal columns are extracted in
+SQL so Python never parses the JSONB. Each chunk is scored as one NumPy matrix
+product and written back through a temp table with COPY + UPDATE ... FROM. Every
+chunk commits on its own, and rows already on the target version are skipped,
+so an interrupted run can simply be restarted.
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+
+import asyncpg
+import numpy as np
+
+from services.validator.scoring import WEIGHTS, WEIGHTS_VERSION, WEIGHT_KEYS, score_matrix
+
+DATABASE_URL = os.getenv("DATABASE_URL")
+CHUNK_SIZE = int(os.getenv("RESCORE_CHUNK_SIZE", "50000"))
+
+CHUNK_SQL = """
+    SELECT id,
+           COALESCE((details->>'test_score')::float8, 0),
+           COALESCE((details->>'cross_model_agreement')::float8, 0),
+           COALESCE((details->>'docs_quality')::float8, 0),
+           CASE WHEN (details->>'performance_ok')::boolean THEN 1.0 ELSE 0.0 END,
+           COALESCE((details->>'penalties')::float8, 0)
+    FROM model_runs
+    WHERE id > $1 AND weights_version IS DISTINCT FROM $2
+    ORDER BY id
+    LIMIT $3
+"""
+
+
+async def load_weights(conn, version=None):
+    """Return (version, weights) for the given or the active weight set."""
+    if version is None:
+        row = await conn.fetchrow(
+            "SELECT version, weights FROM scoring_weight_sets WHERE is_active"
+        )
+    else:
+        row = await conn.fetchrow(
+            "SELECT version, weights FROM scoring_weight_sets WHERE version = $1",
+            version,
+        )
+    if not row:
+        if version in (None, WEIGHTS_VERSION):
+            return WEIGHTS_VERSION, dict(WEIGHTS)
+        raise ValueError(f"Unknown weight set version {version}")
+    weights = row["weights"]
+    return row["version"], json.loads(weights) if isinstance(weights, str) else weights
+
+
+async def create_weight_set(conn, weights: dict, note: str = None) -> int:
+    """Store a new weight set and make it the active one."""
+    missing = [k for k in WEIGHT_KEYS if k not in weights]
+    if missing:
+        raise ValueError(f"Weight set missing keys: {missing}")
+    async with conn.transaction():
+        await conn.execute("UPDATE scoring_weight_sets SET is_active = FALSE WHERE is_active")
+        return await conn.fetchval(
+            """
+            INSERT INTO scoring_weight_sets (version, weights, note, is_active)
+            SELECT COALESCE(MAX(version), 0) + 1, $1::jsonb, $2, TRUE FROM scoring_weight_sets
+            RETURNING version
+        """,
+            json.dumps(weights),
+            note,
+        )
+
+
+async def rescore(conn, version: int, weights: dict, chunk_size: int = CHUNK_SIZE) -> int:
+    await conn.execute(
+        "CREATE TEMP TABLE IF NOT EXISTS rescore_tmp (id BIGINT, score NUMERIC) ON COMMIT DELETE ROWS"
+    )
+    last_id = 0
+    total = 0
+    started = time.monotonic()
+    while True:
+        rows = await conn.fetch(CHUNK_SQL, last_id, version, chunk_size)
+        if not rows:
+            break
+        data = np.array([tuple(r) for r in rows], dtype=np.float64)
+        ids = data[:, 0].astype(np.int64)
+        scores = score_matrix(data[:, 1:], weights)
+
+        async with conn.transaction():
+            await conn.copy_records_to_table(
+                "rescore_tmp", records=zip(ids.tolist(), scores.tolist())
+            )
+            await conn.execute(
+                """
+                UPDATE model_runs mr SET score = t.score, weights_version = $1
+                FROM rescore_tmp t WHERE mr.id = t.id
+            """,
+                version,
+            )
+
+        last_id = int(ids[-1])
+        total += len(rows)
+        print(f"Re-scored {total} runs (last id {last_id}) in {time.monotonic() - started:.1f}s")
+    return total
+
+
+async def main(argv=None):
+    parser = argparse.ArgumentParser(description="Re-score model_runs with a weight set")
+    parser.add_argument("--version", type=int, help="weight set version (default: active)")
+    parser.add_argument("--weights", help="JSON weights; creates and activates a new version")
+    parser.add_argument("--note", help="description stored with a new weight set")
+    parser.add_argument("--chunk", type=int, default=CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    if not DATABASE_URL:
+        print("DATABASE_URL not set")
+        return 1
+
+    conn = await asyncpg.connect(DATABASE_URL)
+    try:
+        if args.weights:
+            version = await create_weight_set(conn, json.loads(args.weights), args.note)
+            print(f"Created weight set version {version}")
+        else:
+            version = args.version
+        version, weights = await load_weights(conn, version)
+        print(f"Re-scoring with weight set {version}: {weights}")
+        await rescore(conn, version, weights, args.chunk)
+    finally:
+        await conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,283 @@
+"""
+Test-execution stage for the validator.
+
+Snapshots written by workers (/sandbox/snapshots/<job_id>.tar) are unpacked and
+their tests run under pytest. Execution happens in a ProcessPoolExecutor whose
+workers import pytest once at start-up; each job then runs in a fork of that
+warm interpreter with CPU, address-space and wall-clock limits applied, so
+nothing a snapshot does can leak into the next one.
+
+Snapshot tests are untrusted code. Before pytest starts, the child drops the
+validator's environment (DATABASE_URL and friends) down to an allow-list,
+moves into a network namespace of its own (no route to Postgres or anything
+else) and switches to an unprivileged uid. If it cannot isolate itself the
+tests are not run. Isolation needs root and CAP_SYS_ADMIN in the container
+(see docker-compose.yml); VALIDATOR_TEST_REQUIRE_ISOLATION=false relaxes it
+for local development only.
+
+Results are cached by the sha256 of the snapshot tarball (in memory and in the
+snapshot_validations table), so re-validating an unchanged snapshot is free.
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import ctypes
+import signal
+import asyncio
+import hashlib
+import resource
+import tarfile
+import tempfile
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+SNAPSHOT_DIR = Path(os.getenv("SNAPSHOT_DIR", "/sandbox/snapshots"))
+TEST_WORKERS = int(os.getenv("VALIDATOR_TEST_WORKERS", str(os.cpu_count() or 2)))
+CPU_SECONDS = int(os.getenv("VALIDATOR_TEST_CPU_SECONDS", "60"))
+MEMORY_MB = int(os.getenv("VALIDATOR_TEST_MEMORY_MB", "1024"))
+TIMEOUT_SECONDS = float(os.getenv("VALIDATOR_TEST_TIMEOUT_SECONDS", "120"))
+PERF_BUDGET_SECONDS = float(os.getenv("VALIDATOR_PERF_BUDGET_SECONDS", "30"))
+CACHE_SIZE = 4096
+REQUIRE_ISOLATION = os.getenv("VALIDATOR_TEST_REQUIRE_ISOLATION", "true").lower() == "true"
+# nobody:nogroup unless overridden
+SANDBOX_UID = int(os.getenv("VALIDATOR_TEST_UID", "65534"))
+SANDBOX_GID = int(os.getenv("VALIDATOR_TEST_GID", "65534"))
+# the only variables the test process inherits
+ENV_ALLOWLIST = ("PATH", "LANG", "LC_ALL", "TZ")
+CLONE_NEWNET = 0x40000000
+# child exit status when isolation could not be set up
+EXIT_NO_SANDBOX = 125
+
+_PASSED_RE = re.compile(r"(\d+) passed")
+_FAILED_RE = re.compile(r"(\d+) failed")
+_ERROR_RE = re.compile(r"(\d+) errors?")
+_COVERAGE_RE = re.compile(r"^TOTAL\s+.*?(\d+(?:\.\d+)?)%\s*$", re.MULTILINE)
+
+_pytest = None
+_has_cov = False
+
+
+def _warm_worker():
+    """ProcessPoolExecutor initializer: import pytest once per worker."""
+    global _pytest, _has_cov
+    try:
+        import pytest
+        import importlib.util
+
+        _pytest = pytest
+        _has_cov = importlib.util.find_spec("pytest_cov") is not None
+    except ImportError:
+        _pytest = None
+
+
+def snapshot_digest(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _unpack(path: str, dest: str):
+    with tarfile.open(path) as tar:
+        if hasattr(tarfile, "data_filter"):
+            tar.extractall(dest, filter="data")
+        else:
+            root = os.path.realpath(dest)
+            for m in tar.getmembers():
+                target = os.path.realpath(os.path.join(dest, m.name))
+                if not target.startswith(root + os.sep) or m.issym() or m.islnk():
+                    raise ValueError(f"unsafe member in snapshot: {m.name}")
+            tar.extractall(dest)
+    # snapshots are tarred as <job_id>/..., step into the single top-level dir
+    entries = os.listdir(dest)
+    if len(entries) == 1 and os.path.isdir(os.path.join(dest, entries[0])):
+        return os.path.join(dest, entries[0])
+    return dest
+
+
+def _has_tests(project: str) -> bool:
+    for _, _, files in os.walk(project):
+        for name in files:
+            if name.endswith(".py") and (
+                name.startswith("test_") or name.endswith("_test.py")
+            ):
+                return True
+    return False
+
+
+def _unshare_network():
+    """Give this process an empty network namespace (only a loopback, down)."""
+    if hasattr(os, "unshare"):  # Python 3.12+
+        os.unshare(CLONE_NEWNET)
+        return
+    libc = ctypes.CDLL(None, use_errno=True)
+    if libc.unshare(CLONE_NEWNET) != 0:
+        err = ctypes.get_errno()
+        raise OSError(err, os.strerror(err))
+
+
+def _isolate(workdir: str):
+    """Child side: scrub the environment, cut the network, drop root."""
+    env = {k: os.environ[k] for k in ENV_ALLOWLIST if k in os.environ}
+    os.environ.clear()
+    os.environ.update(env, HOME=workdir, TMPDIR=workdir, PYTHONDONTWRITEBYTECODE="1")
+    try:
+        _unshare_network()
+        if os.getuid() == 0:
+            for root, dirs, files in os.walk(workdir):
+                for name in dirs + files:
+                    os.lchown(os.path.join(root, name), SANDBOX_UID, SANDBOX_GID)
+            os.lchown(workdir, SANDBOX_UID, SANDBOX_GID)
+            # the sandbox uid has to traverse the (root-only) temp dir to reach workdir
+            os.chmod(os.path.dirname(workdir), 0o711)
+            os.setgroups([])
+            os.setgid(SANDBOX_GID)
+            os.setuid(SANDBOX_UID)
+        elif REQUIRE_ISOLATION:
+            raise PermissionError("validator is not root; cannot drop to the sandbox uid")
+    except OSError as e:
+        if REQUIRE_ISOLATION:
+            print(f"sandbox isolation unavailable: {e}", file=sys.stderr, flush=True)
+            os._exit(EXIT_NO_SANDBOX)
+
+
+def _run_forked(project: str, log_path: str, workdir: str):
+    """Fork the warm worker, isolate and limit the child, and run pytest in it."""
+    args = ["-q", "-p", "no:cacheprovider", project]
+    if _has_cov:
+        args[:0] = [f"--cov={project}", "--cov-report=term"]
+
+    pid = os.fork()
+    if pid == 0:  # child
+        code = 1
+        try:
+            os.setsid()
+            resource.setrlimit(resource.RLIMIT_CPU, (CPU_SECONDS, CPU_SECONDS))
+            mem = MEMORY_MB * 1024 * 1024
+            resource.setrlimit(resource.RLIMIT_AS, (mem, mem))
+            fd = os.open(log_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            os.dup2(fd, 1)
+            os.dup2(fd, 2)
+            _isolate(workdir)
+            os.chdir(project)
+            sys.path.insert(0, project)
+            code = int(_pytest.main(args))
+        finally:
+            os._exit(code)
+
+    deadline = time.monotonic() + TIMEOUT_SECONDS
+    while True:
+        done, status = os.waitpid(pid, os.WNOHANG)
+        if done:
+            return os.waitstatus_to_exitcode(status), False
+        if time.monotonic() > deadline:
+            os.killpg(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
+            return None, True
+        time.sleep(0.05)
+
+
+def run_snapshot_tests(path: str) -> dict:
+    """Unpack a snapshot, run its tests and return validator signals."""
+    if _pytest is None:
+        return {"tests_found": False, "test_error": "pytest not installed"}
+
+    with tempfile.TemporaryDirectory(prefix="aura-validate-") as tmp:
+        project = _unpack(path, os.path.join(tmp, "ws"))
+        if not _has_tests(project):
+            return {"tests_found": False}
+
+        log_path = os.path.join(tmp, "pytest.log")
+        started = time.monotonic()
+        exit_code, timed_out = _run_forked(project, log_path, os.path.join(tmp, "ws"))
+        duration = time.monotonic() - started
+        with open(log_path, errors="replace") as f:
+            out = f.read()
+    if exit_code == EXIT_NO_SANDBOX:
+        # not run: score on the artifact-based defaults, as without pytest
+        return {"tests_found": False, "test_error": out.strip()[-500:] or "sandbox isolation unavailable"}
+
+    def count(rx):
+        m = rx.findall(out)
+        return int(m[-1]) if m else 0
+
+    passed, failed, errors = count(_PASSED_RE), count(_FAILED_RE), count(_ERROR_RE)
+    total = passed + failed + errors
+    cov = _COVERAGE_RE.findall(out)
+    return {
+        "tests_found": True,
+        "tests_passed": bool(total) and not timed_out and failed + errors == 0,
+        "test_score": passed / total if total else 0.0,
+        "tests_total": total,
+        "coverage": float(cov[-1]) / 100.0 if cov else 0.0,
+        "performance_ok": not timed_out and duration <= PERF_BUDGET_SECONDS,
+        "test_duration_s": round(duration, 3),
+        "test_exit_code": exit_code,
+        "test_timed_out": timed_out,
+    }
+
+
+class TestStage:
+    """Async facade over the worker pool with a content-hash result cache."""
+
+    def __init__(self, workers: int = TEST_WORKERS):
+        self.executor = ProcessPoolExecutor(max_workers=workers, initializer=_warm_worker)
+        self.cache = OrderedDict()
+
+    def _remember(self, digest, signals):
+        self.cache[digest] = signals
+        self.cache.move_to_end(digest)
+        if len(self.cache) > CACHE_SIZE:
+            self.cache.popitem(last=False)
+
+    async def signals_for(self, pool, job_id) -> dict:
+        """
+        Test signals for a job's snapshot, or {} when no snapshot exists so the
+        caller keeps its artifact-based defaults.
+        """
+        path = SNAPSHOT_DIR / f"{job_id}.tar"
+        if not path.exists():
+            return {}
+
+        loop = asyncio.get_running_loop()
+        digest = await loop.run_in_executor(self.executor, snapshot_digest, str(path))
+        if digest in self.cache:
+            self.cache.move_to_end(digest)
+            return self.cache[digest]
+
+        async with pool.acquire() as conn:
+            cached = await conn.fetchval(
+                "SELECT signals FROM snapshot_validations WHERE content_hash = $1",
+                digest,
+            )
+        if cached is not None:
+            signals = json.loads(cached) if isinstance(cached, str) else cached
+            self._remember(digest, signals)
+            return signals
+
+        signals = await loop.run_in_executor(
+            self.executor, run_snapshot_tests, str(path)
+        )
+        signals["snapshot_sha256"] = digest
+        if signals.get("test_error"):
+            # an environment problem (no pytest, no sandbox), not a property of the snapshot
+            return signals
+        async with pool.acquire() as conn:
+            await conn.execute(
+                """
+                INSERT INTO snapshot_validations (content_hash, signals)
+                VALUES ($1, $2::jsonb) ON CONFLICT (content_hash) DO NOTHING
+            """,
+                digest,
+                json.dumps(signals),
+            )
+        self._remember(digest, signals)
+        return signals
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -1,7 +1,11 @@
 from datetime import datetime, timedelta
 import math
 
-# weights (tunable)
+import numpy as np
+
+# weights (tunable). Persisted versions live in scoring_weight_sets; this is
+# version 1 and the fallback when the table is empty.
+WEIGHTS_VERSION = 1
 WEIGHTS = {
     "tests": 0.40,
     "cross_agreement": 0.30,
@@ -10,8 +14,11 @@ WEIGHTS = {
     "penalties": -0.25,
 }
 
+# column order of signal_matrix()
+WEIGHT_KEYS = ("tests", "cross_agreement", "docs_quality", "performance", "penalties")
+
 
-def score_from_signals(signals: dict, penalties: float = 0.0) -> float:
+def score_from_signals(signals: dict, penalties: float = 0.0, weights: dict = None) -> float:
     """
     signals example:
     {
@@ -23,15 +30,16 @@ def score_from_signals(signals: dict, penalties: float = 0.0) -> float:
       "cross_model_agreement": 0.6  # 0..1, how many other models had same design
     }
     """
-    test_component = signals.get("test_score", 0.0) * WEIGHTS["tests"]
+    weights = weights or WEIGHTS
+    test_component = signals.get("test_score", 0.0) * weights["tests"]
     agreement_component = (
-        signals.get("cross_model_agreement", 0.0) * WEIGHTS["cross_agreement"]
+        signals.get("cross_model_agreement", 0.0) * weights["cross_agreement"]
     )
-    docs_component = signals.get("docs_quality", 0.0) * WEIGHTS["docs_quality"]
-    perf_component = (1.0 if signals.get("performance_ok", False) else 0.0) * WEIGHTS[
+    docs_component = signals.get("docs_quality", 0.0) * weights["docs_quality"]
+    perf_component = (1.0 if signals.get("performance_ok", False) else 0.0) * weights[
         "performance"
     ]
-    penalty_component = penalties * WEIGHTS["penalties"]
+    penalty_component = penalties * weights["penalties"]
     raw = (
         test_component
         + agreement_component
@@ -42,3 +50,16 @@ def score_from_signals(signals: dict, penalties: float = 0.0) -> float:
     # clamp to 0..1
     final = max(0.0, min(1.0, raw))
     return final
+
+
+def weight_vector(weights: dict):
+    return np.array([weights[k] for k in WEIGHT_KEYS], dtype=np.float64)
+
+
+def score_matrix(features, weights: dict):
+    """
+    Vectorized score_from_signals. features is an (n, 5) array whose columns
+    follow WEIGHT_KEYS: test_score, cross_model_agreement, docs_quality,
+    performance_ok (0/1) and penalties.
+    """
+    return np.clip(np.asarray(features, dtype=np.float64) @ weight_vector(weights), 0.0, 1.0)
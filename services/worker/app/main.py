@@ -1,4 +1,6 @@
-import os, time, importlib, requests, json, sys
+import os, time, importlib, requests, json, sys, uuid
+from datetime import datetime, timezone
+from contextlib import contextmanager
 
 # from sandbox import create_workspace, snapshot # assuming logic moved or we copy it
 # In Batch 3 we put sandbox.py in services/worker/app/sandbox.py
@@ -35,8 +37,40 @@ import os, time, importlib, requests, json, sys
 # Let's try to update `services/worker/app/main.py` first.
 # AND I need `sandbox.py` and `reporter.py` accessible to it. They are already in `services/worker/app`.
 
+try:
+    import msgpack
+except ImportError:  # plain JSON job listings
+    msgpack = None
+
 from sandbox import create_workspace, snapshot
-from reporter import report
+from reporter import report, trace_headers, idempotency_headers
+
+
+class StageTimer:
+    """Collects worker-side spans; they travel to the Manager with the completion report."""
+
+    def __init__(self):
+        self.spans = []
+
+    @contextmanager
+    def stage(self, name, **attrs):
+        started_at = datetime.now(timezone.utc)
+        t0 = time.perf_counter()
+        try:
+            yield attrs
+        except Exception as e:
+            attrs["error"] = type(e).__name__
+            raise
+        finally:
+            self.spans.append(
+                {
+                    "stage": name,
+                    "started_at": started_at.isoformat(),
+                    "duration_ms": (time.perf_counter() - t0) * 1000,
+                    "attrs": attrs or None,
+                }
+            )
+
 
 MANAGER_URL = os.getenv("MANAGER_URL", "http://manager:8000")
 MODEL_BACKEND = os.getenv("MODEL_BACKEND", "ollama")  # ollama | openai | gemini
@@ -91,8 +125,16 @@ def poll_job():
         # For MVP, Manager Manual Assign -> assigned_model = 'employee_ollama'
         # So we look for jobs assigned to US.
         url = f"{MANAGER_URL}/jobs?status=ASSIGNED"
-        r = requests.get(url, timeout=5)
-        jobs = r.json()
+        if msgpack is not None:
+            r = requests.get(url, headers={"Accept": "application/msgpack"}, timeout=5)
+            jobs = (
+                msgpack.unpackb(r.content)
+                if r.headers.get("content-type", "").startswith("application/msgpack")
+                else r.json()
+            )
+        else:
+            r = requests.get(url, timeout=5)
+            jobs = r.json()
 
         # Filter for my ID
         my_jobs = [j for j in jobs if j.get("assigned_model") == WORKER_ID]
@@ -105,6 +147,45 @@ def poll_job():
         return None
 
 
+def fetch_context(job_id, trace_id):
+    """Task payload, PRD title and prior artifacts for the job (cached by the Manager)."""
+    try:
+        r = requests.get(
+            f"{MANAGER_URL}/jobs/{job_id}/context",
+            headers=trace_headers(trace_id),
+            timeout=5,
+        )
+        if r.status_code == 200:
+            return r.json()
+        print(f"Context fetch failed ({r.status_code}) for {job_id}", file=sys.stderr)
+    except Exception as e:
+        print(f"Context fetch error for {job_id}: {e}", file=sys.stderr)
+    return {}
+
+
+def build_prompt(job, ctx):
+    task = dict(ctx.get("task") or {})
+    if not task:
+        return f"Implement task for job {job['id']}. Context: {job}"
+    # scheduling metadata; not part of the instructions
+    for key in ("id", "depends_on", "estimate", "priority", "hedge", "role"):
+        task.pop(key, None)
+    title = task.pop("title", None) or task.pop("description", None) or "task"
+    lines = [
+        f"Project: {ctx.get('prd_title') or 'untitled'}",
+        f"Role: {ctx.get('role') or job.get('role')}",
+        f"Task: {title}",
+    ]
+    if task:
+        lines.append(f"Task details: {json.dumps(task, indent=2, default=str)}")
+    for a in ctx.get("artifacts") or []:
+        body = a.get("artifact") or {}
+        text = body.get("output") if isinstance(body, dict) else body
+        origin = "this job (earlier attempt)" if a.get("job_id") == job["id"] else f"job {a.get('job_id')}"
+        lines.append(f"Prior {a.get('artifact_type')} from {origin}:\n{text}")
+    return "\n\n".join(lines)
+
+
 while True:
     try:
         job = poll_job()
@@ -113,12 +194,17 @@ while True:
             continue
 
         job_id = job["id"]
+        trace_id = job.get("trace_id")
+        timer = StageTimer()
+        # one key per run of the job: retried uploads and reports are applied once
+        run_key = f"{WORKER_ID}:{job_id}:{uuid.uuid4().hex}"
         print(f"Claiming job {job_id}", file=sys.stderr, flush=True)
 
         # Claim
         claim_r = requests.post(
             f"{MANAGER_URL}/jobs/{job_id}/claim",
             params={"worker_id": WORKER_ID},
+            headers=trace_headers(trace_id),
             timeout=5,
         )
         if claim_r.status_code != 200:
@@ -132,35 +218,66 @@ while True:
         ws = create_workspace(job_id)
 
         # GENERATE
-        prompt = f"Implement task for job {job_id}. Context: {job}"
-        # In real usage, we'd fetch PRD details using job['project_id'] etc.
+        with timer.stage("context"):
+            ctx = fetch_context(job_id, trace_id)
+        prompt = build_prompt(job, ctx)
 
-        out = {"output": "Adapter not loaded"}
+        out = {"output": "", "error": "Adapter not loaded", "error_type": "AdapterNotLoaded"}
         if adapter:
-            out = adapter.generate(prompt, context={"job": job})
+            with timer.stage("adapter", backend=MODEL_BACKEND) as attrs:
+                try:
+                    out = adapter.generate(prompt, context={"job": job, **ctx})
+                except Exception as e:
+                    out = {"output": "", "error": str(e), "error_type": type(e).__name__}
+                if out.get("error"):
+                    attrs["error"] = out.get("error_type") or "error"
+
+        if out.get("error"):
+            # the Manager decides between retry with backoff and failing the job
+            print(f"Job {job_id} failed: {out['error']}", file=sys.stderr, flush=True)
+            report(
+                job_id,
+                False,
+                {
+                    "worker": WORKER_ID,
+                    "error": str(out["error"])[:2000],
+                    "error_type": out.get("error_type"),
+                    "status_code": out.get("status_code"),
+                },
+                spans=timer.spans,
+                trace_id=trace_id,
+                idempotency_key=f"{run_key}:complete",
+            )
+            continue
 
         # Write Output
         (ws / "result.txt").write_text(out["output"])
 
         # Upload Artifact
         try:
-            requests.post(
-                f"{MANAGER_URL}/models/{MODEL_BACKEND}/artifact",
-                json={
-                    "job_id": job_id,
-                    "artifact_type": "result",
-                    "artifact": {
-                        "output": out["output"],
-                        "explanation": out.get("explanation"),
+            with timer.stage("artifact_upload"):
+                requests.post(
+                    f"{MANAGER_URL}/models/{MODEL_BACKEND}/artifact",
+                    json={
+                        "job_id": job_id,
+                        "artifact_type": "result",
+                        "artifact": {
+                            "output": out["output"],
+                            "explanation": out.get("explanation"),
+                        },
                     },
-                },
-                timeout=10,
-            )
+                    headers={
+                        **trace_headers(trace_id),
+                        **idempotency_headers(f"{run_key}:artifact"),
+                    },
+                    timeout=10,
+                )
         except Exception as e:
             print(f"Artifact upload failed: {e}", file=sys.stderr)
 
         # Snapshot
-        snap_path = snapshot(job_id)
+        with timer.stage("snapshot"):
+            snap_path = snapshot(job_id)
 
         # Report
         report(
@@ -171,6 +288,9 @@ while True:
                 "worker": WORKER_ID,
                 "output_snippet": str(out.get("output"))[:100],
             },
+            spans=timer.spans,
+            trace_id=trace_id,
+            idempotency_key=f"{run_key}:complete",
         )
         print(f"Job {job_id} reporting complete", file=sys.stderr, flush=True)
 
@@ -1,15 +1,37 @@
 import requests
 import os
+import time
 
 MANAGER_URL = os.getenv("MANAGER_URL", "http://manager:8000")
+TRACE_HEADER = "X-Aura-Trace-Id"
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPORT_ATTEMPTS = int(os.getenv("WORKER_REPORT_ATTEMPTS", "3"))
 
 
-def report(job_id, success, details):
-    try:
-        requests.post(
-            f"{MANAGER_URL}/jobs/{job_id}/complete",
-            json={"success": success, "details": details},
-            timeout=15,
-        )
-    except Exception as e:
-        print(f"Failed to report job {job_id}: {e}")
+def trace_headers(trace_id):
+    return {TRACE_HEADER: trace_id} if trace_id else {}
+
+
+def idempotency_headers(key):
+    return {IDEMPOTENCY_HEADER: key} if key else {}
+
+
+def report(job_id, success, details, spans=None, trace_id=None, idempotency_key=None):
+    # retries carry the same key, so the Manager completes the job only once
+    attempts = REPORT_ATTEMPTS if idempotency_key else 1
+    for attempt in range(attempts):
+        try:
+            r = requests.post(
+                f"{MANAGER_URL}/jobs/{job_id}/complete",
+                json={"success": success, "details": details, "spans": spans or []},
+                headers={**trace_headers(trace_id), **idempotency_headers(idempotency_key)},
+                timeout=15,
+            )
+            # 409: the first attempt is still being processed
+            if r.status_code != 409 and r.status_code < 500:
+                return
+            print(f"Report for job {job_id} got {r.status_code}")
+        except Exception as e:
+            print(f"Failed to report job {job_id}: {e}")
+        if attempt + 1 < attempts:
+            time.sleep(2 ** attempt)